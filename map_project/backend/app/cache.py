@@ -0,0 +1,113 @@
+"""
+In-process caches for derived data (map tiles, per-owner spatial indexes).
+
+Tiles are keyed on the owner's data version read from the database
+(crud.get_owner_data_version), so a tile is never served once any worker has
+committed a change to the owner's DataObjects; stale entries simply age out
+of the LRU.
+
+Spatial indexes are updated in place by crud on creation and dropped on
+deletion, following the in-process version bumped by invalidate_owner: they
+only see the writes of their own process. With several workers, set
+POINT_INDEX_CACHE_SIZE=0 so that proximity queries go to the database.
+An index costs roughly 60 bytes per point when its points are packed into a
+few grid cells, and up to ~300 bytes when they are spread one per cell, so
+the cache is bounded by its total number of points (POINT_INDEX_CACHE_POINTS,
+about 300 MB per worker at most by default) as well as by owner count.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+TILE_CACHE_SIZE = int(os.getenv("TILE_CACHE_SIZE", "1024"))
+# Number of owners whose in-memory spatial index is kept (0 disables it)
+POINT_INDEX_CACHE_SIZE = int(os.getenv("POINT_INDEX_CACHE_SIZE", "32"))
+# Total points held across those indexes, per worker (see the memory cost above)
+POINT_INDEX_CACHE_POINTS = int(os.getenv("POINT_INDEX_CACHE_POINTS", "1000000"))
+
+
+class LRUCache:
+    """
+    A small thread-safe least-recently-used cache, bounded by entry count
+    and, if `weight` is given, by the total weight of its entries. Weights
+    are re-read on each store, since entries may grow in place.
+    """
+
+    def __init__(self, maxsize: int, max_weight: int = 0, weight: Optional[Callable[[Any], int]] = None):
+        self.maxsize = maxsize
+        self.max_weight = max_weight
+        self.weight = weight
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if self.weight is not None and self.weight(value) > self.max_weight:
+                # Would evict everything else and still not fit
+                self._data.pop(key, None)
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            if self.weight is not None:
+                total = sum(self.weight(entry) for entry in self._data.values())
+                while total > self.max_weight:
+                    _, evicted = self._data.popitem(last=False)
+                    total -= self.weight(evicted)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_owner_versions: Dict[int, int] = {}
+_owner_versions_lock = threading.Lock()
+
+def owner_version(owner_id: int) -> int:
+    return _owner_versions.get(owner_id, 0)
+
+def invalidate_owner(owner_id: int) -> None:
+    """Mark the in-process entries derived from this owner's data (point indexes) as stale."""
+    with _owner_versions_lock:
+        _owner_versions[owner_id] = _owner_versions.get(owner_id, 0) + 1
+
+def set_if_unchanged(cache: "LRUCache", owner_id: int, version: int, value: Any) -> bool:
+    """
+    Store `value`, built from the owner's data as of `version`, unless the
+    data changed since. Atomic with invalidate_owner: a write that misses the
+    entry (not stored yet) has bumped the version, so the entry is not stored.
+    A write committed before the build but applied after the store finds the
+    entry already holding its data, so in-place updates must be idempotent.
+    """
+    with _owner_versions_lock:
+        if _owner_versions.get(owner_id, 0) != version:
+            return False
+        cache.set(owner_id, value)
+        return True
+
+
+tile_cache = LRUCache(TILE_CACHE_SIZE)
+# owner_id -> point_index.PointIndex, updated in place by crud rather than versioned
+point_index_cache = LRUCache(POINT_INDEX_CACHE_SIZE, POINT_INDEX_CACHE_POINTS, weight=len)
+
+def clear_all() -> None:
+    tile_cache.clear()
+    point_index_cache.clear()
@@ -0,0 +1,162 @@
+"""
+Response compression negotiated from Accept-Encoding: zstd when the client
+accepts it and `zstandard` is installed, else gzip.
+
+Responses smaller than the threshold go out as-is. Streamed responses
+(StreamingResponse exports) are compressed chunk by chunk, each chunk flushed so
+the client can decode it as soon as it arrives. Responses that already have a
+Content-Encoding, and already-compressed media types, are left untouched.
+
+Environment variables:
+    COMPRESSION_MINIMUM_SIZE: smallest body compressed, in bytes (default 1024).
+    GZIP_LEVEL: gzip level, 1-9 (default 6).
+    ZSTD_LEVEL: zstd level, 1-22 (default 3).
+"""
+import os
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import zstandard
+except ImportError: # Optional: gzip only without it
+    zstandard = None
+
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+
+ZSTD = "zstd"
+GZIP = "gzip"
+
+# Media types not worth compressing again (or meant to be streamed uncompressed)
+EXCLUDED_CONTENT_TYPES = (
+    "image/", "video/", "audio/",
+    "application/zip", "application/gzip", "application/zstd",
+    "application/vnd.apache.parquet", # Compressed per column chunk
+    "text/event-stream",
+)
+
+
+def negotiate_encoding(accept_encoding: str, zstd_available: bool = True) -> Optional[str]:
+    """
+    The encoding to use for this Accept-Encoding header: the highest q-value
+    among zstd and gzip (zstd on ties; "*" covers both), or None for identity.
+    """
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+
+    candidates = [ZSTD, GZIP] if zstd_available else [GZIP]
+    best, best_quality = None, 0.0
+    for coding in candidates:
+        quality = qualities.get(coding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class _GzipCompressor:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31) # 31: gzip container
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+class _ZstdCompressor:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        flush_mode = zstandard.COMPRESSOBJ_FLUSH_FINISH if final else zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        return self._compressor.compress(data) + self._compressor.flush(flush_mode)
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MINIMUM_SIZE,
+        gzip_level: int = GZIP_LEVEL,
+        zstd_level: int = ZSTD_LEVEL
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), zstandard is not None)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressingResponder(self, encoding, send).run(scope, receive)
+
+    def compressor(self, encoding: str):
+        if encoding == ZSTD:
+            return _ZstdCompressor(self.zstd_level)
+        return _GzipCompressor(self.gzip_level)
+
+
+class _CompressingResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start_message: Optional[Message] = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def run(self, scope: Scope, receive: Receive) -> None:
+        await self.middleware.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk tells whether to compress
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start_message is not None:
+            start_message, self.start_message = self.start_message, None
+            headers = MutableHeaders(raw=start_message["headers"])
+            self.passthrough = (
+                "content-encoding" in headers
+                or headers.get("content-type", "").startswith(EXCLUDED_CONTENT_TYPES)
+                or (not more_body and len(body) < self.middleware.minimum_size)
+            )
+            if not self.passthrough:
+                self.compressor = self.middleware.compressor(self.encoding)
+                body = self.compressor.compress(body, final=not more_body)
+                headers["Content-Encoding"] = self.encoding
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await self.send(start_message)
+        elif not self.passthrough:
+            body = self.compressor.compress(body, final=not more_body)
+
+        await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
@@ -1,11 +1,13 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_ # For combining filters
-from . import models, schemas, utils # Added utils import
+from sqlalchemy.orm import Session, joinedload, raiseload, selectinload, undefer, undefer_group
+from sqlalchemy import Integer, and_, or_, cast, func, insert, literal, select, union_all # For combining filters
+from . import models, schemas, utils, mvt, cache, geometry, spatial # Added utils import
+from .point_index import PointIndex
 from .security import get_password_hash
 from datetime import date, datetime
 from typing import Optional, List, Tuple, Any, Dict # Added Tuple, Any, Dict
 from sqlalchemy.exc import IntegrityError # For handling favorite already exists
 import json # For data_values merge logic
+import math
 
 # --- User CRUD operations ---
 def get_user_by_name(db: Session, name: str) -> models.User | None:
@@ -14,6 +16,13 @@ def get_user_by_name(db: Session, name: str) -> models.User | None:
 def get_user(db: Session, user_id: int) -> models.User | None:
     return db.query(models.User).filter(models.User.id == user_id).first()
 
+def get_user_profile(db: Session, user_id: int) -> models.User | None:
+    """The user with its questionnaire and favorite counts loaded in the same query."""
+    return db.query(models.User)\
+        .options(undefer_group("profile_counts"))\
+        .filter(models.User.id == user_id)\
+        .first()
+
 def create_user(db: Session, user: schemas.UserCreate) -> models.User:
     hashed_password = get_password_hash(user.password)
     db_user = models.User(name=user.name, hashed_password=hashed_password)
@@ -28,25 +37,94 @@ def get_users(db: Session, skip: int = 0, limit: int = 100) -> list[models.User]
 
 # --- Questionnaire CRUD operations ---
 def create_questionnaire(db: Session, questionnaire: schemas.QuestionnaireCreate, owner_id: int) -> models.Questionnaire:
-    # Separate elements from questionnaire data
-    elements_data = questionnaire.elements
+    # One INSERT for the questionnaire, one bulk INSERT for its elements, one commit
     questionnaire_data = questionnaire.model_dump(exclude={"elements"})
-
     db_questionnaire = models.Questionnaire(**questionnaire_data, owner_id=owner_id)
     db.add(db_questionnaire)
-    db.commit() # Commit to get db_questionnaire.id
+    db.flush() # Assigns db_questionnaire.id
+    questionnaire_id = db_questionnaire.id
+    _insert_questionnaire_elements(db, questionnaire_id, questionnaire.elements)
+    db.commit()
+    return get_questionnaire(db, questionnaire_id, for_response=True)
 
-    for element_data in elements_data:
-        create_questionnaire_element(db, element_data, questionnaire_id=db_questionnaire.id)
+# Loader options, declared per read path so that serializing a response never
+# lazy loads row by row: what a schema serializes is loaded up front
+# (selectinload: one extra query for the whole page), any other relationship
+# raises instead of issuing hidden queries.
+def _questionnaire_response_options():
+    return (
+        selectinload(models.Questionnaire.elements),
+        undefer(models.Questionnaire.submission_count),
+        raiseload("*"),
+    )
 
-    db.refresh(db_questionnaire)
-    return db_questionnaire
+def _data_object_response_options():
+    # schemas.DataObject has no nested relationships
+    return (raiseload("*"),)
+
+def get_questionnaire(db: Session, questionnaire_id: int, for_response: bool = False) -> models.Questionnaire | None:
+    """
+    Only the questionnaire row by default, which is all ownership and password
+    checks need; `for_response` also loads what schemas.Questionnaire serializes.
+    """
+    query = db.query(models.Questionnaire).filter(models.Questionnaire.id == questionnaire_id)
+    if for_response:
+        query = query.options(*_questionnaire_response_options())
+    return query.first()
+
+def get_questionnaires_by_owner(
+    db: Session,
+    owner_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[int] = None
+) -> list[models.Questionnaire]:
+    # Keyset pagination on (owner_id, id): `after_id` is the last id of the previous page
+    query = db.query(models.Questionnaire)\
+        .options(*_questionnaire_response_options())\
+        .filter(models.Questionnaire.owner_id == owner_id)
+    if after_id is not None:
+        query = query.filter(models.Questionnaire.id > after_id)
+    return query.order_by(models.Questionnaire.id).offset(skip).limit(limit).all()
 
-def get_questionnaire(db: Session, questionnaire_id: int) -> models.Questionnaire | None:
-    return db.query(models.Questionnaire).filter(models.Questionnaire.id == questionnaire_id).first()
+def get_questionnaire_data_objects(db: Session, questionnaire_id: int, skip: int = 0, limit: int = 100) -> List[models.DataObject]:
+    return db.query(models.DataObject)\
+        .options(*_data_object_response_options())\
+        .filter(models.DataObject.questionnaire_id == questionnaire_id)\
+        .order_by(models.DataObject.id)\
+        .offset(skip).limit(limit).all()
 
-def get_questionnaires_by_owner(db: Session, owner_id: int, skip: int = 0, limit: int = 100) -> list[models.Questionnaire]:
-    return db.query(models.Questionnaire).filter(models.Questionnaire.owner_id == owner_id).offset(skip).limit(limit).all()
+def get_questionnaires_data_objects(
+    db: Session,
+    questionnaire_ids: List[int],
+    skip: int = 0,
+    limit: int = 100
+) -> Dict[int, List[models.DataObject]]:
+    """
+    The same page of DataObjects for each of several questionnaires, in a
+    single query: rows are numbered per questionnaire with a window function.
+    """
+    if not questionnaire_ids or limit <= 0:
+        return {questionnaire_id: [] for questionnaire_id in questionnaire_ids}
+    if len(questionnaire_ids) == 1:
+        # A plain LIMIT stops early, where the window numbers every row
+        return {questionnaire_ids[0]: get_questionnaire_data_objects(db, questionnaire_ids[0], skip=skip, limit=limit)}
+    row_number = func.row_number().over(
+        partition_by=models.DataObject.questionnaire_id, order_by=models.DataObject.id
+    ).label("row_number")
+    numbered = select(models.DataObject.id, row_number)\
+        .where(models.DataObject.questionnaire_id.in_(questionnaire_ids))\
+        .subquery()
+    page = select(numbered.c.id)\
+        .where(numbered.c.row_number > skip)\
+        .where(numbered.c.row_number <= skip + limit)
+    data_objects = {questionnaire_id: [] for questionnaire_id in questionnaire_ids}
+    for obj in db.query(models.DataObject)\
+            .options(*_data_object_response_options())\
+            .filter(models.DataObject.id.in_(page))\
+            .order_by(models.DataObject.questionnaire_id, models.DataObject.id):
+        data_objects[obj.questionnaire_id].append(obj)
+    return data_objects
 
 def update_questionnaire(db: Session, questionnaire_id: int, questionnaire_update: schemas.QuestionnaireUpdate) -> models.Questionnaire | None:
     db_questionnaire = get_questionnaire(db, questionnaire_id)
@@ -55,14 +133,18 @@ def update_questionnaire(db: Session, questionnaire_id: int, questionnaire_updat
         for key, value in update_data.items():
             setattr(db_questionnaire, key, value)
         db.commit()
-        db.refresh(db_questionnaire)
+        return get_questionnaire(db, questionnaire_id, for_response=True)
     return db_questionnaire
 
 def delete_questionnaire(db: Session, questionnaire_id: int) -> models.Questionnaire | None:
     db_questionnaire = get_questionnaire(db, questionnaire_id)
     if db_questionnaire:
+        # Tombstones for the DataObjects deleted by the cascade, in the same transaction
+        _add_tombstones(db, db_questionnaire.owner_id, models.DataObject.questionnaire_id == questionnaire_id)
         db.delete(db_questionnaire)
         db.commit()
+        cache.invalidate_owner(db_questionnaire.owner_id)
+        cache.point_index_cache.pop(db_questionnaire.owner_id)
     return db_questionnaire
 
 
@@ -74,6 +156,33 @@ def create_questionnaire_element(db: Session, element: schemas.QuestionElementCr
     db.refresh(db_element)
     return db_element
 
+def replace_questionnaire_elements(
+    db: Session,
+    questionnaire_id: int,
+    elements: List[schemas.QuestionElementCreate]
+) -> models.Questionnaire | None:
+    """
+    Replace all the elements of a questionnaire in one transaction: one
+    DELETE, one bulk INSERT, one commit. Submitted data_values are keyed by
+    label, so they are unaffected.
+    """
+    if get_questionnaire(db, questionnaire_id) is None:
+        return None
+    db.query(models.QuestionElement)\
+        .filter(models.QuestionElement.questionnaire_id == questionnaire_id)\
+        .delete(synchronize_session="fetch")
+    _insert_questionnaire_elements(db, questionnaire_id, elements)
+    db.commit()
+    return get_questionnaire(db, questionnaire_id, for_response=True)
+
+def _insert_questionnaire_elements(db: Session, questionnaire_id: int, elements: List[schemas.QuestionElementCreate]) -> None:
+    # A single executemany: no ids are read back, they are loaded with the questionnaire
+    if elements:
+        db.execute(
+            insert(models.QuestionElement),
+            [{**element.model_dump(), "questionnaire_id": questionnaire_id} for element in elements]
+        )
+
 def get_questionnaire_element(db: Session, element_id: int) -> models.QuestionElement | None:
     return db.query(models.QuestionElement).filter(models.QuestionElement.id == element_id).first()
 
@@ -97,25 +206,216 @@ def delete_questionnaire_element(db: Session, element_id: int) -> models.Questio
 
 # --- DataObject CRUD operations ---
 def create_data_object(db: Session, data: schemas.DataObjectCreate, questionnaire_id: int) -> models.DataObject:
-    db_data_object = models.DataObject(**data.model_dump(), questionnaire_id=questionnaire_id)
+    grid_lat, grid_lon = utils.grid_cell(data.latitude, data.longitude)
+    db_data_object = models.DataObject(
+        **data.model_dump(),
+        questionnaire_id=questionnaire_id,
+        grid_lat=grid_lat,
+        grid_lon=grid_lon,
+        change_seq=_next_change_seq(db, _questionnaire_owner_id(questionnaire_id))
+    )
     db.add(db_data_object)
     db.commit()
     db.refresh(db_data_object)
+    _data_objects_created(db, questionnaire_id, [db_data_object])
     return db_data_object
 
+BATCH_CREATED = "created"
+BATCH_DUPLICATE = "duplicate"
+BATCH_INVALID = "invalid"
 
-# --- Nearby DataObjects ---
-def get_nearby_data_objects(
+def create_data_objects_batch(
+    db: Session,
+    items: List[schemas.DataObjectBatchItem],
+    questionnaire_id: int,
+    _retry: bool = True
+) -> List[Tuple[str, Optional[int], Optional[models.DataObject], Optional[str]]]:
+    """
+    Submit many DataObjects to a questionnaire in one transaction: one lookup
+    of the idempotency keys already used, one bulk INSERT, one commit.
+    Returns a (status, id, data_object, error) tuple per item, in order:
+    created items come with their new DataObject, items whose key was already
+    used (before or earlier in the batch) as duplicates with the existing id
+    only, invalid items are skipped.
+    """
+    keys = {item.idempotency_key for item in items if item.idempotency_key is not None}
+    existing_ids = dict(
+        db.query(models.DataObject.idempotency_key, models.DataObject.id)
+        .filter(models.DataObject.questionnaire_id == questionnaire_id)
+        .filter(models.DataObject.idempotency_key.in_(keys))
+        .all()
+    ) if keys else {}
+
+    rows = []
+    row_by_key: Dict[str, int] = {}
+    # Per item: (status, id of an existing DataObject, position in rows, error)
+    outcomes: List[Tuple[str, Optional[int], Optional[int], Optional[str]]] = []
+    for item in items:
+        error = _data_object_error(item)
+        key = item.idempotency_key
+        if error is not None:
+            outcomes.append((BATCH_INVALID, None, None, error))
+        elif key in existing_ids:
+            outcomes.append((BATCH_DUPLICATE, existing_ids[key], None, None))
+        elif key in row_by_key:
+            outcomes.append((BATCH_DUPLICATE, None, row_by_key[key], None))
+        else:
+            if key is not None:
+                row_by_key[key] = len(rows)
+            grid_lat, grid_lon = utils.grid_cell(item.latitude, item.longitude)
+            rows.append({**item.model_dump(), "questionnaire_id": questionnaire_id, "grid_lat": grid_lat, "grid_lon": grid_lon})
+            outcomes.append((BATCH_CREATED, None, len(rows) - 1, None))
+
+    new_ids: List[int] = []
+    if rows:
+        # The whole batch is one change for delta sync
+        change_seq = _next_change_seq(db, _questionnaire_owner_id(questionnaire_id))
+        for row in rows:
+            row["change_seq"] = change_seq
+        try:
+            new_ids = db.scalars(
+                insert(models.DataObject).returning(models.DataObject.id, sort_by_parameter_order=True),
+                rows
+            ).all()
+            db.commit()
+        except IntegrityError:
+            # A concurrent retry committed one of the keys first: it is a duplicate now
+            db.rollback()
+            if not _retry:
+                raise
+            return create_data_objects_batch(db, items, questionnaire_id, _retry=False)
+
+    ids = [new_ids[position] if position is not None else obj_id for _, obj_id, position, _ in outcomes]
+    created = _get_data_objects_in_order(db, new_ids)
+    if created:
+        _data_objects_created(db, questionnaire_id, created)
+    created_by_id = {obj.id: obj for obj in created}
+    return [
+        (status, obj_id, created_by_id.get(obj_id) if status == BATCH_CREATED else None, error)
+        for (status, _, _, error), obj_id in zip(outcomes, ids)
+    ]
+
+def _data_object_error(data: schemas.DataObjectCreate) -> Optional[str]:
+    if (data.latitude is None) != (data.longitude is None):
+        return "latitude and longitude must be given together"
+    if data.latitude is not None and not (-90.0 <= data.latitude <= 90.0 and -180.0 <= data.longitude <= 180.0):
+        return "Coordinates out of range"
+    return None
+
+def _data_objects_created(db: Session, questionnaire_id: int, data_objects: List[models.DataObject]) -> None:
+    # Keep in-process caches in line with committed DataObjects
+    owner_id = db.query(models.Questionnaire.owner_id).filter(models.Questionnaire.id == questionnaire_id).scalar()
+    if owner_id is not None:
+        _owner_data_objects_created(owner_id, data_objects)
+
+def _owner_data_objects_created(owner_id: int, data_objects: List[models.DataObject]) -> None:
+    cache.invalidate_owner(owner_id)
+    point_index = cache.point_index_cache.get(owner_id)
+    if point_index is not None:
+        # The index may have been built after the commit and already hold them: add skips those
+        for data_object in data_objects:
+            point_index.add(data_object.id, data_object.latitude, data_object.longitude)
+
+
+# --- Change tracking (delta sync) ---
+def _next_change_seq(db: Session, owner_id) -> int:
+    """
+    Take the next value of the global change sequence for the current
+    transaction, which changes DataObjects of `owner_id` (an id, or a SQL
+    expression of it). The counter row stays locked until commit, so values
+    are committed in increasing order (see models.ChangeSequence), and the
+    owner's data version moves to the new value in the same transaction.
+    """
+    db.query(models.ChangeSequence).filter(models.ChangeSequence.id == 1)\
+        .update({models.ChangeSequence.value: models.ChangeSequence.value + 1}, synchronize_session=False)
+    change_seq = db.query(models.ChangeSequence.value).filter(models.ChangeSequence.id == 1).scalar()
+    db.query(models.User).filter(models.User.id == owner_id)\
+        .update({models.User.data_change_seq: change_seq}, synchronize_session=False)
+    return change_seq
+
+def _questionnaire_owner_id(questionnaire_id: int):
+    # For statements that need the owner without loading the questionnaire
+    return select(models.Questionnaire.owner_id).where(models.Questionnaire.id == questionnaire_id).scalar_subquery()
+
+def _add_tombstones(db: Session, owner_id: int, data_object_filter) -> None:
+    # One INSERT ... SELECT for all the DataObjects about to be deleted
+    change_seq = _next_change_seq(db, owner_id)
+    db.execute(
+        insert(models.DataObjectTombstone).from_select(
+            ["data_object_id", "owner_id", "questionnaire_id", "change_seq"],
+            select(models.DataObject.id, models.Questionnaire.owner_id, models.DataObject.questionnaire_id, literal(change_seq))
+            .join(models.Questionnaire, models.DataObject.questionnaire_id == models.Questionnaire.id)
+            .where(data_object_filter)
+        )
+    )
+
+def get_owner_data_version(db: Session, owner_id: int) -> int:
+    """
+    The last change sequence value of the owner's DataObjects, tombstones
+    included: it moves with every committed creation, update, merge or
+    deletion, whichever process made it. A primary key lookup of
+    User.data_change_seq, kept by _next_change_seq.
+    """
+    return db.query(func.coalesce(models.User.data_change_seq, 0)).filter(models.User.id == owner_id).scalar() or 0
+
+def get_data_object_changes(
     db: Session,
     current_user: models.User,
-    source_data_object_id: int,
-    max_distance_meters: float,
-    skip: int = 0,
-    limit: int = 100
-) -> List[models.DataObject]:
+    since: Tuple[int, int] = (0, 0),
+    limit: int = 1000
+) -> Tuple[List[models.DataObject], List[int], Tuple[int, int], bool]:
+    """
+    The user's DataObjects inserted, merged, updated or deleted after the
+    (change_seq, id) watermark `since`, at most `limit` changes in sequence
+    order. Returns the current state of the upserted objects, the ids of the
+    deleted ones, the watermark to resume from and whether more changes remain.
+    """
+    since_seq, since_id = since
+    after_watermark = [
+        models.DataObject.change_seq > since_seq,
+        and_(models.DataObject.change_seq == since_seq, models.DataObject.id > since_id),
+    ]
+    if since_seq == 0:
+        # Rows the migration has not given a sequence value yet count as sequence 0
+        after_watermark.append(and_(models.DataObject.change_seq.is_(None), models.DataObject.id > since_id))
+    upserts = select(
+        func.coalesce(models.DataObject.change_seq, 0).label("change_seq"),
+        models.DataObject.id.label("data_object_id"),
+        literal(False).label("deleted")
+    ).join(models.Questionnaire).where(
+        models.Questionnaire.owner_id == current_user.id,
+        or_(*after_watermark)
+    )
+    tombstones = select(
+        models.DataObjectTombstone.change_seq,
+        models.DataObjectTombstone.data_object_id,
+        literal(True)
+    ).where(
+        models.DataObjectTombstone.owner_id == current_user.id,
+        or_(
+            models.DataObjectTombstone.change_seq > since_seq,
+            and_(models.DataObjectTombstone.change_seq == since_seq, models.DataObjectTombstone.data_object_id > since_id)
+        )
+    )
+    changes = union_all(upserts, tombstones).subquery()
+    rows = db.query(changes.c.change_seq, changes.c.data_object_id, changes.c.deleted)\
+        .order_by(changes.c.change_seq, changes.c.data_object_id)\
+        .limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # The last change of an object wins (SQLite can reuse the id of a deleted row)
+    latest = {row.data_object_id: bool(row.deleted) for row in rows}
+    upserted = _get_data_objects_in_order(db, [obj_id for obj_id, deleted in latest.items() if not deleted])
+    deleted_ids = [obj_id for obj_id, deleted in latest.items() if deleted]
+    watermark = (rows[-1].change_seq, rows[-1].data_object_id) if rows else since
+    return upserted, deleted_ids, watermark, has_more
 
+
+# --- Nearby DataObjects ---
+def _get_owned_source_point(db: Session, current_user: models.User, source_data_object_id: int) -> Tuple[float, float]:
     # Get source object and verify ownership and coordinates
-    source_do = db.query(models.DataObject)\
+    source_do = db.query(models.DataObject.latitude, models.DataObject.longitude)\
         .join(models.Questionnaire)\
         .filter(models.DataObject.id == source_data_object_id)\
         .filter(models.Questionnaire.owner_id == current_user.id)\
@@ -125,66 +425,315 @@ def get_nearby_data_objects(
         raise ValueError("Source DataObject not found or not owned by user.")
     if source_do.latitude is None or source_do.longitude is None:
         raise ValueError("Source DataObject does not have valid coordinates.")
+    return source_do.latitude, source_do.longitude
 
-    # Get all other data objects owned by the user with valid coordinates
-    potential_matches = db.query(models.DataObject)\
+def _find_within_radius(
+    db: Session,
+    owner_id: int,
+    latitude: float,
+    longitude: float,
+    max_distance_meters: float,
+    exclude_id: Optional[int] = None
+) -> List[Tuple[float, int]]:
+    """
+    Return (distance, id) for the owner's DataObjects within
+    `max_distance_meters` of a point, closest first (id breaks ties).
+    """
+    backend = spatial.backend_for(db)
+    if backend is None and cache.POINT_INDEX_CACHE_SIZE > 0:
+        return _get_owner_point_index(db, owner_id).within_radius(
+            latitude, longitude, max_distance_meters, exclude_id=exclude_id
+        )
+    if backend == spatial.POSTGIS:
+        distance = spatial.postgis_distance(latitude, longitude)
+        query = db.query(distance, models.DataObject.id)\
+            .join(models.Questionnaire)\
+            .filter(models.Questionnaire.owner_id == owner_id)\
+            .filter(spatial.postgis_within_radius(latitude, longitude, max_distance_meters))
+        if exclude_id is not None:
+            query = query.filter(models.DataObject.id != exclude_id)
+        return [(row[0], row[1]) for row in query.order_by(distance, models.DataObject.id)]
+
+    # Only look at the grid cells and lat/lon box overlapping the search radius,
+    # and only fetch (id, lat, lon) so candidates never become ORM objects
+    min_lat, max_lat, lon_ranges = utils.bounding_box(latitude, longitude, max_distance_meters)
+    query = db.query(models.DataObject.id, models.DataObject.latitude, models.DataObject.longitude)\
         .join(models.Questionnaire)\
+        .filter(models.Questionnaire.owner_id == owner_id)
+    if backend == spatial.SPATIALITE:
+        query = query.filter(spatial.bounding_box_filter(backend, models.DataObject.id, min_lat, max_lat, lon_ranges))
+    else:
+        (min_grid_lat, max_grid_lat), grid_lon_ranges = utils.grid_cell_ranges(latitude, longitude, max_distance_meters)
+        # Rows without a grid cell yet (see migrations.py) are left to the lat/lon box
+        query = query.filter(or_(
+            models.DataObject.grid_lat.is_(None),
+            and_(
+                models.DataObject.grid_lat.between(min_grid_lat, max_grid_lat),
+                or_(*(models.DataObject.grid_lon.between(west, east) for west, east in grid_lon_ranges))
+            )
+        ))
+    query = query\
+        .filter(models.DataObject.latitude.between(min_lat, max_lat))\
+        .filter(or_(*(models.DataObject.longitude.between(west, east) for west, east in lon_ranges)))
+    if exclude_id is not None:
+        query = query.filter(models.DataObject.id != exclude_id)
+    candidates = query.all()
+
+    distances = utils.haversine_distances(
+        latitude, longitude,
+        [candidate.latitude for candidate in candidates],
+        [candidate.longitude for candidate in candidates]
+    )
+    nearby = [
+        (distance, candidate.id)
+        for distance, candidate in zip(distances.tolist(), candidates)
+        if distance <= max_distance_meters
+    ]
+    nearby.sort()
+    return nearby
+
+def _get_owner_point_index(db: Session, owner_id: int) -> PointIndex:
+    # Built from a single (id, lat, lon) query the first time the owner runs a proximity query
+    point_index = cache.point_index_cache.get(owner_id)
+    if point_index is None:
+        # Read before the query: a DataObject committed while the index is being
+        # built moves the version, and the index (which may lack it) is not cached
+        version = cache.owner_version(owner_id)
+        points = db.query(models.DataObject.id, models.DataObject.latitude, models.DataObject.longitude)\
+            .join(models.Questionnaire)\
+            .filter(models.Questionnaire.owner_id == owner_id)\
+            .filter(models.DataObject.latitude.isnot(None))\
+            .filter(models.DataObject.longitude.isnot(None))
+        point_index = PointIndex(points)
+        cache.set_if_unchanged(cache.point_index_cache, owner_id, version, point_index)
+    return point_index
+
+def get_nearby_data_objects(
+    db: Session,
+    current_user: models.User,
+    source_data_object_id: int,
+    max_distance_meters: float,
+    skip: int = 0,
+    limit: int = 100
+) -> List[models.DataObject]:
+    latitude, longitude = _get_owned_source_point(db, current_user, source_data_object_id)
+    nearby = _find_within_radius(
+        db, current_user.id, latitude, longitude, max_distance_meters, exclude_id=source_data_object_id
+    )
+    # Paginate after the exact distance sort
+    page_ids = [candidate_id for _, candidate_id in nearby[skip : skip + limit]]
+    return _get_data_objects_in_order(db, page_ids)
+
+# First radius tried by get_nearest_data_objects, doubled until k objects are found
+NEAREST_INITIAL_RADIUS_METERS = 1000.0
+
+def get_nearest_data_objects(
+    db: Session,
+    current_user: models.User,
+    k: int,
+    source_data_object_id: Optional[int] = None,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None
+) -> List[Tuple[models.DataObject, float]]:
+    """
+    Return the k DataObjects closest to a source object (excluded from the
+    results) or to an arbitrary point, as (object, distance in meters) pairs
+    sorted by distance.
+    """
+    if source_data_object_id is not None:
+        latitude, longitude = _get_owned_source_point(db, current_user, source_data_object_id)
+    elif latitude is None or longitude is None:
+        raise ValueError("Either a source DataObject or both latitude and longitude must be provided.")
+
+    if spatial.backend_for(db) == spatial.POSTGIS:
+        # Index-driven kNN: ORDER BY <-> LIMIT k walks the GiST index
+        distance = spatial.postgis_distance(latitude, longitude)
+        query = db.query(distance, models.DataObject.id)\
+            .join(models.Questionnaire)\
+            .filter(models.Questionnaire.owner_id == current_user.id)\
+            .filter(models.DataObject.latitude.isnot(None))\
+            .filter(models.DataObject.longitude.isnot(None))
+        if source_data_object_id is not None:
+            query = query.filter(models.DataObject.id != source_data_object_id)
+        nearest = [(row[0], row[1]) for row in query.order_by(spatial.postgis_nearest_order(latitude, longitude)).limit(k)]
+        nearest.sort()
+        objects = _get_data_objects_in_order(db, [obj_id for _, obj_id in nearest])
+        distances = {obj_id: distance for distance, obj_id in nearest}
+        return [(obj, distances[obj.id]) for obj in objects]
+
+    # Grow the search radius until it holds k objects. Every object within the
+    # radius is a candidate, so the k closest of them are the k nearest overall.
+    radius = NEAREST_INITIAL_RADIUS_METERS
+    while True:
+        nearest = _find_within_radius(
+            db, current_user.id, latitude, longitude, radius, exclude_id=source_data_object_id
+        )
+        if len(nearest) >= k or radius >= math.pi * utils.EARTH_RADIUS_METERS:
+            break
+        radius *= 2 if nearest else 4
+
+    nearest = nearest[:k]
+    objects = _get_data_objects_in_order(db, [obj_id for _, obj_id in nearest])
+    distances = {obj_id: distance for distance, obj_id in nearest}
+    return [(obj, distances[obj.id]) for obj in objects]
+
+def find_duplicate_groups(
+    db: Session,
+    current_user: models.User,
+    max_distance_meters: float,
+    questionnaire_id: Optional[int] = None
+) -> List[List[Tuple[int, int]]]:
+    """
+    Find groups of the user's geolocated DataObjects lying within
+    `max_distance_meters` of each other. Each group is a list of
+    (data_object_id, questionnaire_id) sorted by id; groups are ordered by
+    their first id.
+    """
+    query = db.query(
+        models.DataObject.id,
+        models.DataObject.questionnaire_id,
+        models.DataObject.latitude,
+        models.DataObject.longitude
+    ).join(models.Questionnaire)\
         .filter(models.Questionnaire.owner_id == current_user.id)\
-        .filter(models.DataObject.id != source_data_object_id)\
         .filter(models.DataObject.latitude.isnot(None))\
-        .filter(models.DataObject.longitude.isnot(None))\
-        .all() # Fetch all to filter in Python; for large DBs, use geospatial queries
-
-    nearby_objects = []
-    for candidate_do in potential_matches:
-        distance = utils.haversine_distance(
-            source_do.latitude, source_do.longitude,
-            candidate_do.latitude, candidate_do.longitude
-        )
-        if distance <= max_distance_meters:
-            nearby_objects.append(candidate_do)
+        .filter(models.DataObject.longitude.isnot(None))
+    query = _filter_data_objects(query, questionnaire_id=questionnaire_id)
+    rows = query.order_by(models.DataObject.id).all()
+
+    groups = utils.group_close_points(
+        [row.latitude for row in rows],
+        [row.longitude for row in rows],
+        max_distance_meters
+    )
+    # Rows are sorted by id, so sorting indices sorts ids
+    groups = sorted(sorted(group) for group in groups)
+    return [[(rows[i].id, rows[i].questionnaire_id) for i in group] for group in groups]
 
-    # Apply pagination to the Python list of nearby objects
-    return nearby_objects[skip : skip + limit]
+def _get_data_objects_in_order(db: Session, data_object_ids: List[int]) -> List[models.DataObject]:
+    if not data_object_ids:
+        return []
+    objects_by_id = {
+        obj.id: obj
+        for obj in db.query(models.DataObject)
+            .options(*_data_object_response_options())
+            .filter(models.DataObject.id.in_(data_object_ids)).all()
+    }
+    return [objects_by_id[obj_id] for obj_id in data_object_ids if obj_id in objects_by_id]
 
 
 # --- User Favorites CRUD operations ---
+# Favorites are rows of the association table, written and read directly:
+# the favorite_data_objects relationship is never loaded, whatever its size.
+_favorites = models.user_favorite_data_objects
+
 def add_favorite(db: Session, user_id: int, data_object_id: int) -> models.User | None:
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    data_object = db.query(models.DataObject).join(models.Questionnaire)\
-        .filter(models.DataObject.id == data_object_id)\
-        .filter(models.Questionnaire.owner_id == user_id)\
-        .first() # Ensure user can only favorite their own questionnaire's data
-
-    if user and data_object:
-        # Check if already favorited to prevent duplicate entries if DB doesn't handle it
-        if data_object not in user.favorite_data_objects:
-            user.favorite_data_objects.append(data_object)
-            try:
-                db.commit()
-                db.refresh(user)
-            except IntegrityError: # Should not happen if check above is done, but as fallback
-                db.rollback()
-                # Already favorited, or other integrity issue
-        return user
-    return None # User or (valid/owned) DataObject not found
-
-def remove_favorite(db: Session, user_id: int, data_object_id: int) -> models.User | None:
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    data_object = db.query(models.DataObject).filter(models.DataObject.id == data_object_id).first()
-
-    if user and data_object and data_object in user.favorite_data_objects:
-        user.favorite_data_objects.remove(data_object)
+    """Favorite one of the user's DataObjects (idempotent). Returns the user's profile, None if not found."""
+    if not add_favorites(db, user_id, [data_object_id]):
+        return None # DataObject not found or not owned
+    return get_user_profile(db, user_id)
+
+def add_favorites(db: Session, user_id: int, data_object_ids: List[int], commit: bool = True) -> List[int]:
+    """
+    Favorite many of the user's DataObjects: one query for the ids the user
+    owns, one INSERT ... SELECT skipping those already favorited. Returns the
+    owned ids, all of which are favorites afterwards.
+    With commit=False the caller commits, and retries on IntegrityError
+    (see update_favorites).
+    """
+    if not data_object_ids:
+        return []
+    # Users can only favorite their own questionnaires' data
+    owned_ids = set(db.scalars(
+        select(models.DataObject.id)
+        .join(models.Questionnaire, models.DataObject.questionnaire_id == models.Questionnaire.id)
+        .where(models.DataObject.id.in_(data_object_ids))
+        .where(models.Questionnaire.owner_id == user_id)
+    ))
+    if not owned_ids:
+        return []
+    insert_favorites = insert(_favorites).from_select(
+        ["user_id", "data_object_id"],
+        select(literal(user_id), models.DataObject.id)
+        .where(models.DataObject.id.in_(owned_ids))
+        .where(
+            ~select(_favorites.c.data_object_id)
+            .where(_favorites.c.user_id == user_id)
+            .where(_favorites.c.data_object_id == models.DataObject.id)
+            .exists()
+        )
+    )
+    if not commit:
+        db.execute(insert_favorites)
+    else:
+        try:
+            db.execute(insert_favorites)
+            db.commit()
+        except IntegrityError:
+            # A concurrent request inserted some of the same rows first: add the rest
+            db.rollback()
+            db.execute(insert_favorites)
+            db.commit()
+    return [obj_id for obj_id in dict.fromkeys(data_object_ids) if obj_id in owned_ids]
+
+def remove_favorite(db: Session, user_id: int, data_object_id: int) -> bool:
+    """Returns False when the DataObject was not a favorite."""
+    return bool(remove_favorites(db, user_id, [data_object_id]))
+
+def remove_favorites(db: Session, user_id: int, data_object_ids: List[int], commit: bool = True) -> List[int]:
+    """Unfavorite many DataObjects with one DELETE. Returns the ids that were favorites."""
+    if not data_object_ids:
+        return []
+    removed_ids = set(db.scalars(
+        _favorites.delete()
+        .where(_favorites.c.user_id == user_id)
+        .where(_favorites.c.data_object_id.in_(data_object_ids))
+        .returning(_favorites.c.data_object_id)
+    ))
+    if commit:
         db.commit()
-        db.refresh(user)
-        return user
-    return None # User not found, or DataObject not found/not a favorite
+    return [obj_id for obj_id in dict.fromkeys(data_object_ids) if obj_id in removed_ids]
 
-def get_user_favorites(db: Session, user_id: int) -> List[models.DataObject]:
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if user:
-        return user.favorite_data_objects
-    return []
+def update_favorites(
+    db: Session,
+    user_id: int,
+    add_ids: List[int],
+    remove_ids: List[int],
+    _retry: bool = True
+) -> Tuple[List[int], List[int]]:
+    """
+    Add and remove favorites in a single transaction, so that a failure
+    leaves them all unchanged. Returns the (added, removed) ids, as
+    add_favorites and remove_favorites do.
+    """
+    try:
+        added = add_favorites(db, user_id, add_ids, commit=False)
+        removed = remove_favorites(db, user_id, remove_ids, commit=False)
+        db.commit()
+    except IntegrityError:
+        # A concurrent request inserted some of the same favorites first: run it again
+        db.rollback()
+        if not _retry:
+            raise
+        return update_favorites(db, user_id, add_ids, remove_ids, _retry=False)
+    return added, removed
+
+def get_user_favorites(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[int] = None
+) -> List[models.DataObject]:
+    # Page through the association table (primary key (user_id, data_object_id)) instead of
+    # loading the whole relationship. Keyset pagination: `after_id` is the last id of the previous page
+    query = db.query(models.DataObject)\
+        .options(*_data_object_response_options())\
+        .join(_favorites, _favorites.c.data_object_id == models.DataObject.id)\
+        .filter(_favorites.c.user_id == user_id)
+    if after_id is not None:
+        query = query.filter(_favorites.c.data_object_id > after_id)
+    return query.order_by(_favorites.c.data_object_id).offset(skip).limit(limit).all()
 
 
 # --- DataObject Merge Operation ---
@@ -198,106 +747,152 @@ def merge_data_objects(
     new_latitude: Optional[float] = None,
     new_longitude: Optional[float] = None
 ) -> models.DataObject | None:
-    if not object_ids or len(object_ids) < 2:
-        # Need at least two objects to merge
+    merge_request = schemas.DataObjectMergeRequest(
+        data_object_ids=object_ids,
+        target_questionnaire_id=target_questionnaire_id,
+        new_submitter_name=new_submitter_name,
+        new_additional_info=new_additional_info,
+        new_latitude=new_latitude,
+        new_longitude=new_longitude
+    )
+    try:
+        return merge_data_object_groups(db, user, [merge_request])[0]
+    except ValueError:
         return None
 
-    # Verify target questionnaire belongs to the user
-    target_questionnaire = db.query(models.Questionnaire)\
-        .filter(models.Questionnaire.id == target_questionnaire_id)\
-        .filter(models.Questionnaire.owner_id == user.id)\
-        .first()
-    if not target_questionnaire:
-        return None # Target questionnaire not found or not owned by user
-
-    # Fetch and verify all source DataObjects belong to the user
-    source_objects: List[models.DataObject] = []
-    for obj_id in object_ids:
-        obj = db.query(models.DataObject).join(models.Questionnaire)\
-            .filter(models.DataObject.id == obj_id)\
-            .filter(models.Questionnaire.owner_id == user.id)\
-            .first()
-        if not obj:
-            return None # One of the source objects not found or not owned
-        source_objects.append(obj)
-
-    if not source_objects: # Should be caught by len < 2, but as safeguard
-        return None
+# Ids per IN list, well below the bound parameter limits of SQLite and PostgreSQL
+MERGE_IN_CHUNK_SIZE = 5000
 
-    # --- Simplified Merge Logic ---
-    merged_data_values: Dict[str, Any] = {}
-    all_keys = set()
-    for obj in source_objects:
-        all_keys.update(obj.data_values.keys())
+def merge_data_object_groups(
+    db: Session,
+    user: models.User,
+    merge_requests: List[schemas.DataObjectMergeRequest]
+) -> List[models.DataObject]:
+    """
+    Merge many groups of DataObjects in one transaction: the target
+    questionnaires and all the source objects are loaded with one IN query
+    each (sources locked until commit, so a concurrent update cannot slip in
+    between reading and merging), each group is merged in a single pass over
+    its objects, and the merged objects go in with one bulk INSERT.
+    Sources are kept. Raises ValueError if any group cannot be merged, in
+    which case nothing is written. Returns the merged objects in order.
+    """
+    for index, merge_request in enumerate(merge_requests):
+        if len(merge_request.data_object_ids) < 2:
+            raise ValueError(f"Group {index}: at least two DataObject IDs must be provided for merging")
+
+    target_ids = {merge_request.target_questionnaire_id for merge_request in merge_requests}
+    owned_targets = {
+        questionnaire_id
+        for (questionnaire_id,) in db.query(models.Questionnaire.id)
+            .filter(models.Questionnaire.id.in_(target_ids))
+            .filter(models.Questionnaire.owner_id == user.id)
+    }
+    source_ids = sorted({obj_id for merge_request in merge_requests for obj_id in merge_request.data_object_ids})
+    sources_by_id: Dict[int, models.DataObject] = {}
+    for chunk_start in range(0, len(source_ids), MERGE_IN_CHUNK_SIZE):
+        sources_by_id.update(
+            (obj.id, obj)
+            for obj in db.query(models.DataObject)
+                .options(*_data_object_response_options())
+                .join(models.Questionnaire)
+                .filter(models.DataObject.id.in_(source_ids[chunk_start:chunk_start + MERGE_IN_CHUNK_SIZE]))
+                .filter(models.Questionnaire.owner_id == user.id)
+                .with_for_update(of=models.DataObject)
+        )
+
+    rows = []
+    for index, merge_request in enumerate(merge_requests):
+        if merge_request.target_questionnaire_id not in owned_targets:
+            raise ValueError(f"Group {index}: target questionnaire not found or not owned by user")
+        missing = [obj_id for obj_id in merge_request.data_object_ids if obj_id not in sources_by_id]
+        if missing:
+            raise ValueError(f"Group {index}: DataObject(s) not found or not owned by user: {missing}")
+        rows.append(_merged_row(user, [sources_by_id[obj_id] for obj_id in merge_request.data_object_ids], merge_request))
+
+    # One change for delta sync, like a batch submission
+    change_seq = _next_change_seq(db, user.id)
+    for row in rows:
+        row["change_seq"] = change_seq
+    merged_ids = db.scalars(
+        insert(models.DataObject).returning(models.DataObject.id, sort_by_parameter_order=True),
+        rows
+    ).all()
+    owner_id = user.id # Read before commit expires the user
+    db.commit()
+
+    merged_objects = _get_data_objects_in_order(db, merged_ids)
+    _owner_data_objects_created(owner_id, merged_objects)
+    return merged_objects
 
-    for key in all_keys:
-        values = [obj.data_values.get(key) for obj in source_objects if obj.data_values.get(key) is not None]
-        if not values:
-            continue
+def _merged_row(user: models.User, source_objects: List[models.DataObject], merge_request: schemas.DataObjectMergeRequest) -> Dict[str, Any]:
+    # Non-null values per key, in source order, gathered in one pass
+    values_by_key: Dict[str, List[Any]] = {}
+    for obj in source_objects:
+        for key, value in obj.data_values.items():
+            if value is not None:
+                values_by_key.setdefault(key, []).append(value)
 
-        # Attempt to determine type for merging (simplified)
+    # --- Simplified Merge Logic ---
+    merged_data_values: Dict[str, Any] = {}
+    for key, values in values_by_key.items():
         first_value = values[0]
         if isinstance(first_value, (int, float)):
             numeric_values = [v for v in values if isinstance(v, (int, float))]
-            if numeric_values:
-                merged_data_values[key] = sum(numeric_values) / len(numeric_values)
+            merged_data_values[key] = sum(numeric_values) / len(numeric_values)
         elif isinstance(first_value, str):
             merged_data_values[key] = " | ".join(str(v) for v in values)
-        else: # list, dict, bool, etc. - take first or stringify
-            merged_data_values[key] = values[0]
-
-
-    # Coordinates
-    final_latitude = new_latitude
-    final_longitude = new_longitude
-    if final_latitude is None or final_longitude is None: # One is None, try to calculate average
-        lats = [obj.latitude for obj in source_objects if obj.latitude is not None]
-        lons = [obj.longitude for obj in source_objects if obj.longitude is not None]
-        if lats and lons: # Ensure we have some coordinates to average
-             if final_latitude is None: final_latitude = sum(lats) / len(lats) if lats else None
-             if final_longitude is None: final_longitude = sum(lons) / len(lons) if lons else None
-        elif lats and final_latitude is None: # Only lats available
-            final_latitude = sum(lats) / len(lats)
-        elif lons and final_longitude is None: # Only lons available
-            final_longitude = sum(lons) / len(lons)
-        # If no source coordinates and no new_coordinates, they remain None
+        else: # list, dict, bool, etc. - take first
+            merged_data_values[key] = first_value
 
+    # Coordinates: given ones win, missing ones are the average of the sources'
+    final_latitude = merge_request.new_latitude
+    final_longitude = merge_request.new_longitude
+    lats = [obj.latitude for obj in source_objects if obj.latitude is not None]
+    lons = [obj.longitude for obj in source_objects if obj.longitude is not None]
+    if final_latitude is None and lats:
+        final_latitude = sum(lats) / len(lats)
+    if final_longitude is None and lons:
+        final_longitude = sum(lons) / len(lons)
 
     # Submitter name and additional info
-    final_submitter_name = new_submitter_name if new_submitter_name is not None else f"Merged by {user.name}"
+    final_submitter_name = merge_request.new_submitter_name if merge_request.new_submitter_name is not None else f"Merged by {user.name}"
 
-    source_ids_str = ", ".join(map(str, object_ids))
+    source_ids_str = ", ".join(map(str, merge_request.data_object_ids))
+    new_additional_info = merge_request.new_additional_info
     final_additional_info = new_additional_info if new_additional_info is not None else f"Merged from DataObjects: [{source_ids_str}]"
     if new_additional_info and "%IDS%" in new_additional_info: # Allow placeholder for IDs
         final_additional_info = new_additional_info.replace("%IDS%", source_ids_str)
 
-
-    merged_do_schema = schemas.DataObjectCreate(
-        submitter_name=final_submitter_name,
-        latitude=final_latitude,
-        longitude=final_longitude,
-        data_values=merged_data_values, # This is already a dict
-        additional_info=final_additional_info
-    )
-
-    # Create new DataObject
-    # The create_data_object function expects a schema object.
-    return create_data_object(db=db, data=merged_do_schema, questionnaire_id=target_questionnaire_id)
+    grid_lat, grid_lon = utils.grid_cell(final_latitude, final_longitude)
+    return {
+        "questionnaire_id": merge_request.target_questionnaire_id,
+        "submitter_name": final_submitter_name,
+        "latitude": final_latitude,
+        "longitude": final_longitude,
+        "data_values": merged_data_values,
+        "additional_info": final_additional_info,
+        "grid_lat": grid_lat,
+        "grid_lon": grid_lon,
+    }
 
 def get_data_object(db: Session, data_object_id: int) -> models.DataObject | None:
-    return db.query(models.DataObject).filter(models.DataObject.id == data_object_id).first()
+    # The owner id comes along for the router's ownership check
+    return db.query(models.DataObject)\
+        .options(
+            joinedload(models.DataObject.questionnaire).load_only(models.Questionnaire.owner_id),
+            *_data_object_response_options()
+        )\
+        .filter(models.DataObject.id == data_object_id)\
+        .first()
 
-def get_data_objects(
-    db: Session,
-    current_user: models.User,
-    skip: int = 0,
-    limit: int = 100,
+def _filter_data_objects(
+    query,
     questionnaire_id: Optional[int] = None,
     start_date: Optional[date] = None,
-    end_date: Optional[date] = None
-) -> List[models.DataObject]:
-    query = db.query(models.DataObject).join(models.Questionnaire).filter(models.Questionnaire.owner_id == current_user.id)
-
+    end_date: Optional[date] = None,
+    viewport: Optional[Tuple[float, float, float, float]] = None
+):
     if questionnaire_id:
         query = query.filter(models.DataObject.questionnaire_id == questionnaire_id)
     if start_date:
@@ -308,8 +903,270 @@ def get_data_objects(
         # If submission_date is DateTime, ensure comparison is correct or cast column to date.
         # For now, using direct comparison. Consider time part if submission_date is DateTime.
         query = query.filter(models.DataObject.submission_date <= end_date)
+    if viewport:
+        # (min_lat, min_lon, max_lat, max_lon); min_lon > max_lon means the viewport crosses the antimeridian
+        min_lat, min_lon, max_lat, max_lon = viewport
+        lon_ranges = [(min_lon, max_lon)] if min_lon <= max_lon else [(min_lon, 180.0), (-180.0, max_lon)]
+        backend = spatial.backend_for(query.session)
+        if backend:
+            query = query.filter(spatial.bounding_box_filter(backend, models.DataObject.id, min_lat, max_lat, lon_ranges))
+        query = query.filter(models.DataObject.latitude.between(min_lat, max_lat))
+        query = query.filter(or_(*(models.DataObject.longitude.between(west, east) for west, east in lon_ranges)))
+    return query
+
+def get_data_objects(
+    db: Session,
+    current_user: models.User,
+    skip: int = 0,
+    limit: int = 100,
+    questionnaire_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    viewport: Optional[Tuple[float, float, float, float]] = None,
+    polygon: Optional[geometry.PreparedPolygon] = None,
+    after_id: Optional[int] = None
+) -> List[models.DataObject]:
+    if polygon is not None:
+        # Prefilter on the polygon's bounding box in SQL, then run the exact
+        # point-in-polygon test on (id, lat, lon) tuples only
+        query = db.query(models.DataObject.id, models.DataObject.latitude, models.DataObject.longitude)\
+            .join(models.Questionnaire).filter(models.Questionnaire.owner_id == current_user.id)
+        query = _filter_data_objects(query, questionnaire_id, start_date, end_date, viewport)
+        query = _filter_data_objects(query, viewport=polygon.bounds)
+        candidates = query.order_by(models.DataObject.id).all()
+        inside = polygon.contains(
+            [candidate.latitude for candidate in candidates],
+            [candidate.longitude for candidate in candidates]
+        )
+        inside_ids = [candidate.id for candidate, is_inside in zip(candidates, inside.tolist()) if is_inside]
+        return _get_data_objects_in_order(db, inside_ids[skip : skip + limit])
+
+    query = db.query(models.DataObject).options(*_data_object_response_options())\
+        .join(models.Questionnaire).filter(models.Questionnaire.owner_id == current_user.id)
+    query = _filter_data_objects(query, questionnaire_id, start_date, end_date, viewport)
+    # Keyset pagination on id: a stable order between pages (and when panning
+    # back and forth), and constant time per page however deep
+    if after_id is not None:
+        query = query.filter(models.DataObject.id > after_id)
+
+    return query.order_by(models.DataObject.id).offset(skip).limit(limit).all()
+
+# Columns of an exported DataObject (see export.py), in output order
+EXPORT_COLUMNS = (
+    models.DataObject.id,
+    models.DataObject.questionnaire_id,
+    models.DataObject.submitter_name,
+    models.DataObject.submission_date,
+    models.DataObject.updated_at,
+    models.DataObject.latitude,
+    models.DataObject.longitude,
+    models.DataObject.data_values,
+    models.DataObject.additional_info,
+)
+
+def iter_data_object_rows(
+    db: Session,
+    owner_id: int,
+    questionnaire_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    viewport: Optional[Tuple[float, float, float, float]] = None,
+    batch_size: int = 1000
+):
+    """
+    Yield the owner's DataObjects as plain EXPORT_COLUMNS rows in id order,
+    fetched `batch_size` at a time (a server-side cursor where the driver
+    supports it): no ORM objects, and never the whole result in memory.
+    The query only runs once iteration starts.
+    """
+    query = db.query(*EXPORT_COLUMNS).join(models.Questionnaire).filter(models.Questionnaire.owner_id == owner_id)
+    query = _filter_data_objects(query, questionnaire_id, start_date, end_date, viewport)
+    yield from query.order_by(models.DataObject.id).execution_options(yield_per=batch_size)
+
+def _grid_cell_column(grid_column, degrees_column):
+    # The persisted cell, or the cell computed from the coordinate for rows the
+    # migration has not backfilled yet (see migrations.py). The offset keeps the
+    # value positive, where truncating to an integer floors.
+    computed = cast(degrees_column / utils.GRID_CELL_DEGREES + utils.GRID_CELL_OFFSET, Integer) - utils.GRID_CELL_OFFSET
+    return func.coalesce(grid_column, computed)
+
+def _grid_block_columns(factor: int, prefix: str):
+    # Offsetting the (possibly negative) grid cells makes integer division
+    # floor on every backend, so a block is a square of factor x factor cells.
+    grid_lat = _grid_cell_column(models.DataObject.grid_lat, models.DataObject.latitude)
+    grid_lon = _grid_cell_column(models.DataObject.grid_lon, models.DataObject.longitude)
+    block_lat = ((grid_lat + utils.GRID_CELL_OFFSET) // factor).label(f"{prefix}_lat")
+    block_lon = ((grid_lon + utils.GRID_CELL_OFFSET) // factor).label(f"{prefix}_lon")
+    return block_lat, block_lon
+
+def get_data_object_heatmap(
+    db: Session,
+    current_user: models.User,
+    cell_size_degrees: float,
+    questionnaire_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    viewport: Optional[Tuple[float, float, float, float]] = None
+) -> Tuple[float, List[Dict[str, Any]]]:
+    """
+    Count the user's geolocated DataObjects per square cell of
+    `cell_size_degrees` (rounded to a whole number of grid cells), in a
+    single GROUP BY. Returns the cell size used and one dict per non-empty
+    cell with the coordinates of its center and its count.
+    """
+    factor = max(1, round(cell_size_degrees / utils.GRID_CELL_DEGREES))
+    cell_size = factor * utils.GRID_CELL_DEGREES
+    cell_lat, cell_lon = _grid_block_columns(factor, "cell")
+
+    query = db.query(cell_lat, cell_lon, func.count(models.DataObject.id))\
+        .join(models.Questionnaire)\
+        .filter(models.Questionnaire.owner_id == current_user.id)\
+        .filter(models.DataObject.latitude.isnot(None))\
+        .filter(models.DataObject.longitude.isnot(None))
+    query = _filter_data_objects(query, questionnaire_id, start_date, end_date, viewport)
+    rows = query.group_by(cell_lat, cell_lon).order_by(cell_lat, cell_lon).all()
+
+    cells = []
+    for block_lat, block_lon, count in rows:
+        south = (block_lat * factor - utils.GRID_CELL_OFFSET) * utils.GRID_CELL_DEGREES
+        west = (block_lon * factor - utils.GRID_CELL_OFFSET) * utils.GRID_CELL_DEGREES
+        cells.append({
+            "latitude": round(min(south + cell_size / 2, 90.0), 6),
+            "longitude": round(min(west + cell_size / 2, 180.0), 6),
+            "count": count,
+        })
+    return cell_size, cells
+
+def get_data_object_clusters(
+    db: Session,
+    current_user: models.User,
+    viewport: Tuple[float, float, float, float],
+    zoom: int,
+    questionnaire_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    sample_size: int = 5
+) -> List[Dict[str, Any]]:
+    """
+    Aggregate the user's DataObjects inside `viewport` into clusters of grid
+    cells sized for `zoom`, or larger if the viewport would hold more than
+    utils.MAX_VIEWPORT_CLUSTERS of them. Returns one dict per cluster with
+    its centroid, count and up to `sample_size` ids.
+    """
+    factor = utils.viewport_cluster_grid_factor(zoom, viewport)
+    cluster_lat, cluster_lon = _grid_block_columns(factor, "cluster")
+
+    def owned(*columns):
+        query = db.query(*columns).join(models.Questionnaire).filter(models.Questionnaire.owner_id == current_user.id)
+        return _filter_data_objects(query, questionnaire_id, start_date, end_date, viewport)
+
+    aggregates = owned(
+        cluster_lat, cluster_lon,
+        func.count(models.DataObject.id),
+        func.avg(models.DataObject.latitude),
+        func.avg(models.DataObject.longitude)
+    ).group_by(cluster_lat, cluster_lon).all()
+
+    # A few ids per cluster, picked in the database with a window function
+    row_number = func.row_number().over(
+        partition_by=(cluster_lat, cluster_lon), order_by=models.DataObject.id
+    ).label("row_number")
+    numbered = owned(models.DataObject.id, cluster_lat, cluster_lon, row_number).subquery()
+    samples: Dict[Tuple[int, int], List[int]] = {}
+    for obj_id, key_lat, key_lon in db.query(numbered.c.id, numbered.c.cluster_lat, numbered.c.cluster_lon)\
+            .filter(numbered.c.row_number <= sample_size)\
+            .order_by(numbered.c.id):
+        samples.setdefault((key_lat, key_lon), []).append(obj_id)
+
+    clusters = [
+        {
+            "latitude": latitude,
+            "longitude": longitude,
+            "count": count,
+            "sample_ids": samples.get((key_lat, key_lon), []),
+        }
+        for key_lat, key_lon, count, latitude, longitude in aggregates
+    ]
+    clusters.sort(key=lambda cluster: -cluster["count"])
+    return clusters
+
+# Beyond this many points, a tile carries clusters instead (see get_data_object_tile)
+TILE_MAX_POINTS = 2000
+
+def get_data_object_tile(
+    db: Session,
+    current_user: models.User,
+    z: int,
+    x: int,
+    y: int,
+    questionnaire_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> bytes:
+    """
+    Encode the user's geolocated DataObjects falling in web mercator tile
+    z/x/y as a Mapbox Vector Tile with a single "data_objects" point layer.
+    A tile holding more than TILE_MAX_POINTS of them gets a "clusters" layer
+    instead, one point per cluster (sized for z, see get_data_object_clusters)
+    with its count, so that its size stays bounded.
+    Tiles are cached under the owner's data version (get_owner_data_version),
+    which is read from the database so that a write made by any worker is seen.
+    """
+    cache_key = (
+        current_user.id, get_owner_data_version(db, current_user.id),
+        questionnaire_id, start_date, end_date, z, x, y
+    )
+    tile = cache.tile_cache.get(cache_key)
+    if tile is not None:
+        return tile
+
+    min_lat, min_lon, max_lat, max_lon = mvt.tile_bounds(z, x, y)
+    last_tile = 2 ** z - 1
+
+    def owned(*columns):
+        query = db.query(*columns).join(models.Questionnaire).filter(models.Questionnaire.owner_id == current_user.id)
+        query = _filter_data_objects(query, questionnaire_id, start_date, end_date, viewport=(min_lat, min_lon, max_lat, max_lon))
+        # Half-open like the tile grid (see mvt.tile_pixel): a point on the edge shared
+        # with the tile to the east or to the south belongs to that tile only
+        if x < last_tile:
+            query = query.filter(models.DataObject.longitude < max_lon)
+        if y < last_tile:
+            query = query.filter(models.DataObject.latitude > min_lat)
+        return query
+
+    rows = owned(
+        models.DataObject.id,
+        models.DataObject.latitude,
+        models.DataObject.longitude,
+        models.DataObject.questionnaire_id,
+        models.DataObject.submitter_name,
+        models.DataObject.submission_date
+    ).limit(TILE_MAX_POINTS + 1).all()
 
-    return query.offset(skip).limit(limit).all()
+    if len(rows) <= TILE_MAX_POINTS:
+        features = []
+        for obj_id, latitude, longitude, obj_questionnaire_id, submitter_name, submission_date in rows:
+            px, py = mvt.tile_pixel(z, x, y, latitude, longitude)
+            features.append((obj_id, px, py, {
+                "questionnaire_id": obj_questionnaire_id,
+                "submitter_name": submitter_name,
+                "submission_date": submission_date.isoformat() if submission_date else None,
+            }))
+        tile = mvt.encode_tile({"data_objects": features})
+    else:
+        cluster_lat, cluster_lon = _grid_block_columns(utils.cluster_grid_factor(z), "cluster")
+        aggregates = owned(
+            func.count(models.DataObject.id),
+            func.avg(models.DataObject.latitude),
+            func.avg(models.DataObject.longitude)
+        ).group_by(cluster_lat, cluster_lon).order_by(cluster_lat, cluster_lon)
+        features = []
+        for feature_id, (count, latitude, longitude) in enumerate(aggregates, start=1):
+            px, py = mvt.tile_pixel(z, x, y, latitude, longitude)
+            features.append((feature_id, px, py, {"count": count}))
+        tile = mvt.encode_tile({"clusters": features})
+    cache.tile_cache.set(cache_key, tile)
+    return tile
 
 def update_data_object(
     db: Session,
@@ -326,10 +1183,12 @@ def update_data_object(
         # Only additional_info is updatable for now as per DataObjectUpdate schema
         if data_update.additional_info is not None: # Check if it was provided
             db_data_object.additional_info = data_update.additional_info
+            db_data_object.change_seq = _next_change_seq(db, current_user.id)
         # If other fields were in DataObjectUpdate, update them similarly:
         # update_data = data_update.model_dump(exclude_unset=True)
         # for key, value in update_data.items():
         #     setattr(db_data_object, key, value)
         db.commit()
         db.refresh(db_data_object)
+        cache.invalidate_owner(current_user.id)
     return db_data_object
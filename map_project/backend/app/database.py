@@ -3,6 +3,8 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session # Added Session for type hint
 import os # For environment variable
 
+from . import spatial
+
 # Default database URL
 DATABASE_URL_DEFAULT = "sqlite:///./sql_app.db"
 # Get database URL from environment variable or use default
@@ -14,6 +16,8 @@ connect_args = {"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswit
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args=connect_args
 )
+# Load SpatiaLite on SQLite connections when it is installed (see spatial.py)
+spatial.load_spatialite_on_connect(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -0,0 +1,260 @@
+"""
+Streamed exports of DataObjects.
+
+The writers take the plain rows yielded by crud.iter_data_object_rows and
+yield encoded chunks of about `batch_size` rows for a StreamingResponse, so an
+export of any size runs in constant memory.
+
+Columnar exports (CSV, and Parquet / Arrow IPC when pyarrow is installed)
+flatten `data_values` into one typed column per QuestionElement label.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError: # Optional: only needed for the Parquet and Arrow formats
+    pyarrow = None
+
+# Rows serialized per streamed chunk
+EXPORT_BATCH_SIZE = 1000
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+GEOJSON_MEDIA_TYPE = "application/geo+json"
+
+# Columnar formats: media type and whether pyarrow is needed
+COLUMNAR_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", False),
+    "parquet": ("application/vnd.apache.parquet", True),
+    "arrow": ("application/vnd.apache.arrow.stream", True),
+}
+
+
+def close_session_after(db, chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """
+    Wrap the chunks of a StreamingResponse reading from `db`. get_db has already
+    closed the session when a streamed body is sent: the export query runs
+    lazily on a new connection, released here after the last chunk.
+    """
+    try:
+        yield from chunks
+    finally:
+        db.close()
+
+def row_to_dict(row) -> Dict[str, Any]:
+    """Same fields and formats as schemas.DataObject."""
+    return {
+        "id": row.id,
+        "questionnaire_id": row.questionnaire_id,
+        "submitter_name": row.submitter_name,
+        "submission_date": row.submission_date.isoformat() if row.submission_date else None,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+        "latitude": row.latitude,
+        "longitude": row.longitude,
+        "data_values": row.data_values,
+        "additional_info": row.additional_info,
+    }
+
+def row_to_feature(row) -> Dict[str, Any]:
+    properties = row_to_dict(row)
+    latitude, longitude = properties.pop("latitude"), properties.pop("longitude")
+    has_point = latitude is not None and longitude is not None
+    return {
+        "type": "Feature",
+        "id": row.id,
+        "geometry": {"type": "Point", "coordinates": [longitude, latitude]} if has_point else None,
+        "properties": properties,
+    }
+
+def _dumps(value: Dict[str, Any]) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+def _encoded_batches(rows: Iterable, to_dict, batch_size: int) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        batch.append(_dumps(to_dict(row)))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def iter_ndjson(rows: Iterable, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """One JSON object per line."""
+    for batch in _encoded_batches(rows, row_to_dict, batch_size):
+        yield ("\n".join(batch) + "\n").encode()
+
+def iter_geojson(rows: Iterable, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """A FeatureCollection of Point features (null geometry without coordinates)."""
+    yield b'{"type":"FeatureCollection","features":[\n'
+    separator = ""
+    for batch in _encoded_batches(rows, row_to_feature, batch_size):
+        yield (separator + ",\n".join(batch)).encode()
+        separator = ",\n"
+    yield b"\n]}\n"
+
+
+# --- Columnar exports ---
+STRING, NUMBER, DATE = "string", "number", "date"
+
+# Column type per QuestionElement.field_type (anything else is exported as text)
+FIELD_TYPE_COLUMNS = {
+    "number": NUMBER,
+    "coordinates_lat": NUMBER,
+    "coordinates_lon": NUMBER,
+    "date": DATE,
+}
+# Element types whose answer is stored on the DataObject itself, not in data_values
+ROOT_FIELD_TYPES = {"map_coordinates"}
+
+# (name, type) of the columns every export starts with
+BASE_COLUMNS = (
+    ("id", "int"),
+    ("submitter_name", STRING),
+    ("submission_date", "timestamp"),
+    ("latitude", NUMBER),
+    ("longitude", NUMBER),
+    ("additional_info", STRING),
+)
+
+
+def columnar_layout(elements: Sequence) -> List[Tuple[str, str, Optional[str]]]:
+    """
+    (column name, column type, data_values key) for an export of a
+    questionnaire with these QuestionElements: the base columns, then one
+    column per distinct element label, in element order. A label clashing
+    with a base column gets a "data_" prefix.
+    """
+    layout = [(name, column_type, None) for name, column_type in BASE_COLUMNS]
+    names = {name for name, _ in BASE_COLUMNS}
+    labels = set()
+    for element in elements:
+        if element.field_type in ROOT_FIELD_TYPES or element.label in labels:
+            continue
+        labels.add(element.label)
+        name = element.label if element.label not in names else f"data_{element.label}"
+        names.add(name)
+        layout.append((name, FIELD_TYPE_COLUMNS.get(element.field_type, STRING), element.label))
+    return layout
+
+def _to_number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_date(value):
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+def _to_string(value):
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+_CONVERTERS = {NUMBER: _to_number, DATE: _to_date, STRING: _to_string}
+
+def _column_values(layout, rows) -> List[list]:
+    """The batch as one list of typed values per column (None when missing or unparseable)."""
+    columns = [
+        [row.id for row in rows],
+        [row.submitter_name for row in rows],
+        [row.submission_date for row in rows],
+        [row.latitude for row in rows],
+        [row.longitude for row in rows],
+        [row.additional_info for row in rows],
+    ]
+    for _, column_type, key in layout[len(BASE_COLUMNS):]:
+        columns.append([_answer(row.data_values, key, _CONVERTERS[column_type]) for row in rows])
+    return columns
+
+def _answer(data_values, key, convert):
+    value = data_values.get(key) if isinstance(data_values, dict) else None
+    return convert(value) if value is not None else None
+
+def _row_batches(rows: Iterable, batch_size: int) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _csv_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def iter_csv(layout, rows: Iterable, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """CSV with a header row; empty cells for missing values."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _, _ in layout])
+    for batch in _row_batches(rows, batch_size):
+        columns = _column_values(layout, batch)
+        writer.writerows([_csv_value(value) for value in record] for record in zip(*columns))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode() # Header only: no rows
+
+def _arrow_schema(layout):
+    arrow_types = {
+        "int": pyarrow.int64(),
+        "timestamp": pyarrow.timestamp("us", tz="UTC"), # submission_date is stored in UTC
+        NUMBER: pyarrow.float64(),
+        DATE: pyarrow.date32(),
+        STRING: pyarrow.string(),
+    }
+    return pyarrow.schema([(name, arrow_types[column_type]) for name, column_type, _ in layout])
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file collecting what a pyarrow writer emits, drained after each batch."""
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+def iter_arrow(layout, rows: Iterable, format: str = "parquet", batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """Parquet (one row group per batch) or Arrow IPC stream (one record batch per batch)."""
+    if pyarrow is None:
+        raise RuntimeError("pyarrow is required for Parquet and Arrow exports")
+    schema = _arrow_schema(layout)
+    sink = _ChunkSink()
+    if format == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(sink, schema)
+        write = writer.write_table
+        wrap = pyarrow.Table.from_arrays
+    else:
+        writer = pyarrow.ipc.new_stream(sink, schema)
+        write = writer.write_batch
+        wrap = pyarrow.RecordBatch.from_arrays
+    for batch in _row_batches(rows, batch_size):
+        write(wrap(_column_values(layout, batch), schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
@@ -0,0 +1,71 @@
+"""
+Fast JSON path for large list responses.
+
+By default FastAPI validates an endpoint's return value against its
+response_model, dumps it to Python objects, then encodes those with the
+stdlib json module. List endpoints that opt in by returning
+`list_response(schema, objects, response)` skip that pipeline and encode the
+ORM objects straight to JSON bytes, with the same fields and formats:
+
+* "orjson": read the schema's fields off the objects and encode them with
+  orjson (no Pydantic models built at all; for flat schemas such as
+  schemas.DataObject, whose fields are plain attributes);
+* "pydantic": validate once with a TypeAdapter and encode with its Rust
+  `dump_json`.
+
+Environment variables:
+    FAST_JSON: "auto" (default) for orjson when installed, else "pydantic";
+        "orjson" or "pydantic" to pick one; "off" for FastAPI's default path.
+"""
+import os
+from functools import lru_cache
+from typing import List, Optional, Sequence, Type
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError: # Optional: the TypeAdapter path is used instead
+    orjson = None
+
+FAST_JSON = os.getenv("FAST_JSON", "auto")
+
+
+def list_response(schema: Type[BaseModel], objects: Sequence, response: Optional[Response] = None):
+    """
+    A JSON response for `objects` serialized as List[schema], carrying over
+    the headers already set on the endpoint's injected `response`. With
+    FAST_JSON=off the objects are returned as-is for FastAPI to serialize.
+    """
+    mode = _mode()
+    if mode == "off":
+        return objects
+    if mode == "orjson":
+        content = orjson.dumps(
+            [{field: getattr(obj, field) for field in _field_names(schema)} for obj in objects],
+            # Same datetime format as Pydantic ("Z" for UTC)
+            option=orjson.OPT_UTC_Z
+        )
+    else:
+        adapter = _list_adapter(schema)
+        content = adapter.dump_json(adapter.validate_python(objects, from_attributes=True))
+    headers = None
+    if response is not None:
+        headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    return Response(content=content, media_type="application/json", headers=headers)
+
+def _mode() -> str:
+    if FAST_JSON == "auto":
+        return "orjson" if orjson is not None else "pydantic"
+    if FAST_JSON == "orjson" and orjson is None:
+        return "pydantic"
+    return FAST_JSON
+
+@lru_cache(maxsize=None)
+def _field_names(schema: Type[BaseModel]) -> tuple:
+    return tuple(schema.model_fields)
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
@@ -0,0 +1,104 @@
+"""
+GeoJSON polygon filtering for DataObjects.
+
+Polygons are parsed once into flat NumPy edge arrays ("prepared") and cached,
+so repeated queries against the same district or patrol zone only pay for a
+vectorized point-in-polygon test. Coordinates are GeoJSON [longitude, latitude]
+pairs; polygons crossing the antimeridian must be split, as RFC 7946 requires.
+"""
+import json
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+# Points are tested against all edges in chunks to bound the N x E matrices
+_CHUNK_SIZE = 4096
+
+
+class PreparedPolygon:
+    """A Polygon or MultiPolygon ready for fast containment tests."""
+
+    def __init__(self, polygons: List[List[np.ndarray]]):
+        # One (x1, y1, x2, y2) edge array per polygon, holes included: with the
+        # even-odd rule a point inside a hole crosses the boundary an even number of times.
+        self._edges = []
+        for rings in polygons:
+            edges = np.concatenate([np.column_stack((ring[:-1], ring[1:])) for ring in rings])
+            self._edges.append(edges)
+        all_points = np.concatenate([ring for rings in polygons for ring in rings])
+        self.min_lon, self.min_lat = all_points.min(axis=0).tolist()
+        self.max_lon, self.max_lat = all_points.max(axis=0).tolist()
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """(min_lat, min_lon, max_lat, max_lon), the same order as a viewport."""
+        return self.min_lat, self.min_lon, self.max_lat, self.max_lon
+
+    def contains(self, lats: ArrayLike, lons: ArrayLike) -> np.ndarray:
+        """Return a boolean mask of the points inside the polygon."""
+        px = np.asarray(lons, dtype=np.float64)
+        py = np.asarray(lats, dtype=np.float64)
+        inside = np.zeros(px.shape, dtype=bool)
+        for start in range(0, len(px), _CHUNK_SIZE):
+            x = px[start:start + _CHUNK_SIZE, np.newaxis]
+            y = py[start:start + _CHUNK_SIZE, np.newaxis]
+            for edges in self._edges:
+                x1, y1, x2, y2 = edges[:, 0], edges[:, 1], edges[:, 2], edges[:, 3]
+                straddles = (y1 > y) != (y2 > y)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    crossing_x = (x2 - x1) * (y - y1) / (y2 - y1) + x1
+                crossings = np.count_nonzero(straddles & (x < crossing_x), axis=1)
+                inside[start:start + _CHUNK_SIZE] |= (crossings % 2 == 1)
+        return inside
+
+
+def prepare_polygon(geometry: Dict[str, Any]) -> PreparedPolygon:
+    """
+    Parse a GeoJSON Polygon or MultiPolygon geometry (a bare geometry or a
+    Feature wrapping one). Raises ValueError if it is not a valid polygon.
+    Prepared polygons are cached, keyed on the geometry's JSON.
+    """
+    if isinstance(geometry, dict) and geometry.get("type") == "Feature":
+        geometry = geometry.get("geometry")
+    try:
+        key = json.dumps(geometry, sort_keys=True)
+    except (TypeError, ValueError):
+        raise ValueError("Geometry must be a GeoJSON object.")
+    return _prepare_polygon_cached(key)
+
+@lru_cache(maxsize=128)
+def _prepare_polygon_cached(geometry_json: str) -> PreparedPolygon:
+    geometry = json.loads(geometry_json)
+    if not isinstance(geometry, dict):
+        raise ValueError("Geometry must be a GeoJSON object.")
+    if geometry.get("type") == "Polygon":
+        polygons = [geometry.get("coordinates")]
+    elif geometry.get("type") == "MultiPolygon":
+        polygons = geometry.get("coordinates")
+    else:
+        raise ValueError("Geometry must be a GeoJSON Polygon or MultiPolygon.")
+    if not isinstance(polygons, list) or not polygons:
+        raise ValueError("Polygon coordinates are missing.")
+    return PreparedPolygon([[_parse_ring(ring) for ring in _as_list(rings)] for rings in polygons])
+
+def _as_list(value: Any) -> list:
+    if not isinstance(value, list) or not value:
+        raise ValueError("Polygon coordinates are missing.")
+    return value
+
+def _parse_ring(ring: Any) -> np.ndarray:
+    try:
+        points = np.asarray(ring, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError("Polygon rings must be lists of [longitude, latitude] positions.")
+    if points.ndim != 2 or points.shape[0] < 4 or points.shape[1] < 2:
+        raise ValueError("Polygon rings must be lists of at least 4 [longitude, latitude] positions.")
+    points = points[:, :2]
+    if not np.all(np.isfinite(points)):
+        raise ValueError("Polygon coordinates must be finite numbers.")
+    if not np.array_equal(points[0], points[-1]):
+        # Be lenient with unclosed rings
+        points = np.vstack((points, points[:1]))
+    return points
@@ -1,14 +1,22 @@
 from fastapi import FastAPI
 from .database import engine, Base
 from . import models # Import models to ensure they are registered with Base
+from . import spatial, migrations
+from .compression import CompressionMiddleware
 
 # Create database tables
 # In a production app, you might want to use Alembic for migrations
 models.Base.metadata.create_all(bind=engine)
+# Columns added to existing tables since, with their backfill (idempotent)
+migrations.upgrade_schema(engine)
+# Geometry column and spatial index, when the database supports them
+spatial.setup_spatial_backend(engine)
 
 from .routers import auth, users, questionnaires, data # Added data router
 
 app = FastAPI(title="Map Project API")
+# zstd or gzip, negotiated per request (thresholds and levels: see compression.py)
+app.add_middleware(CompressionMiddleware)
 
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
@@ -0,0 +1,105 @@
+"""
+In-place upgrade of databases created before the current schema.
+
+`Base.metadata.create_all` creates missing tables but never alters existing
+ones, so columns added to `dataobjects` and `users` since a database was
+created are added here, along with their indexes, and existing rows are
+backfilled:
+
+* grid_lat/grid_lon: the grid cell of the row's coordinates (utils.grid_cell)
+* updated_at: the submission date
+* change_seq: one new value of the change sequence for all of them, so that
+  a client's first delta sync returns them
+* users.data_change_seq: the last change_seq of the user's DataObjects and
+  tombstones
+
+Every step only touches what is missing, so `upgrade_schema` is idempotent
+and safe to run at each startup (after create_all).
+"""
+from sqlalchemy import bindparam, case, func, inspect, select, update
+from sqlalchemy.engine import Engine
+
+from . import models, utils
+
+# Columns added to dataobjects after its first release, in order
+ADDED_DATAOBJECT_COLUMNS = ("grid_lat", "grid_lon", "updated_at", "change_seq", "idempotency_key")
+ADDED_USER_COLUMNS = ("data_change_seq",)
+
+BACKFILL_BATCH_SIZE = 1000
+
+# Backfilling is not a change of the row: keep updated_at from its onupdate
+_KEEP_UPDATED_AT = {"updated_at": models.DataObject.__table__.c.updated_at}
+
+
+def upgrade_schema(engine: Engine) -> None:
+    table = models.DataObject.__table__
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for added_table, added_columns in ((table, ADDED_DATAOBJECT_COLUMNS), (models.User.__table__, ADDED_USER_COLUMNS)):
+            existing = {column["name"] for column in inspector.get_columns(added_table.name)}
+            for name in added_columns:
+                if name not in existing:
+                    # No server default: SQLite cannot add a column with a non-constant one
+                    column_type = added_table.c[name].type.compile(dialect=engine.dialect)
+                    connection.exec_driver_sql(f"ALTER TABLE {added_table.name} ADD COLUMN {name} {column_type}")
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+        connection.execute(
+            update(table).where(table.c.updated_at.is_(None)).values(updated_at=table.c.submission_date)
+        )
+        _backfill_grid_cells(connection)
+        _backfill_change_seq(connection)
+        _backfill_owner_data_versions(connection)
+
+def _backfill_grid_cells(connection) -> None:
+    table = models.DataObject.__table__
+    missing = select(table.c.id, table.c.latitude, table.c.longitude)\
+        .where(table.c.grid_lat.is_(None))\
+        .where(table.c.latitude.isnot(None))\
+        .where(table.c.longitude.isnot(None))\
+        .order_by(table.c.id)\
+        .limit(BACKFILL_BATCH_SIZE)
+    set_cells = update(table).where(table.c.id == bindparam("row_id"))\
+        .values(grid_lat=bindparam("cell_lat"), grid_lon=bindparam("cell_lon"), **_KEEP_UPDATED_AT)
+    # Computed in Python so that cells match utils.grid_cell exactly
+    while True:
+        rows = connection.execute(missing).all()
+        if not rows:
+            return
+        cells = []
+        for row in rows:
+            cell_lat, cell_lon = utils.grid_cell(row.latitude, row.longitude)
+            cells.append({"row_id": row.id, "cell_lat": cell_lat, "cell_lon": cell_lon})
+        connection.execute(set_cells, cells)
+
+def _backfill_change_seq(connection) -> None:
+    table = models.DataObject.__table__
+    if connection.execute(select(table.c.id).where(table.c.change_seq.is_(None)).limit(1)).first() is None:
+        return
+    sequence = models.ChangeSequence.__table__
+    connection.execute(update(sequence).where(sequence.c.id == 1).values(value=sequence.c.value + 1))
+    change_seq = connection.execute(select(sequence.c.value).where(sequence.c.id == 1)).scalar_one()
+    connection.execute(update(table).where(table.c.change_seq.is_(None)).values(change_seq=change_seq, **_KEEP_UPDATED_AT))
+
+def _backfill_owner_data_versions(connection) -> None:
+    users = models.User.__table__
+    data_objects = models.DataObject.__table__
+    questionnaires = models.Questionnaire.__table__
+    tombstones = models.DataObjectTombstone.__table__
+    last_data_object = func.coalesce(
+        select(func.max(data_objects.c.change_seq))
+        .select_from(data_objects.join(questionnaires))
+        .where(questionnaires.c.owner_id == users.c.id)
+        .scalar_subquery(),
+        0
+    )
+    last_tombstone = func.coalesce(
+        select(func.max(tombstones.c.change_seq))
+        .where(tombstones.c.owner_id == users.c.id)
+        .scalar_subquery(),
+        0
+    )
+    # The greater of the two (no portable two-argument max)
+    last_change = case((last_tombstone > last_data_object, last_tombstone), else_=last_data_object)
+    connection.execute(update(users).where(users.c.data_change_seq.is_(None)).values(data_change_seq=last_change))
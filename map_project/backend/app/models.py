@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Float, JSON, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Float, JSON, Table, Index, select, event, DDL
+from sqlalchemy.orm import relationship, column_property
 from sqlalchemy.sql import func
 from .database import Base
 
@@ -17,6 +17,9 @@ class User(Base):
     name = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
+    # Version of the user's DataObjects: the last change_seq taken for them, tombstones
+    # included, set in the same transaction as the change (see crud._next_change_seq)
+    data_change_seq = Column(Integer, nullable=True)
 
     questionnaires = relationship("Questionnaire", back_populates="owner")
     favorite_data_objects = relationship(
@@ -35,9 +38,14 @@ class Questionnaire(Base):
     owner_id = Column(Integer, ForeignKey("users.id"))
 
     owner = relationship("User", back_populates="questionnaires")
-    elements = relationship("QuestionElement", back_populates="questionnaire", cascade="all, delete-orphan")
+    elements = relationship("QuestionElement", back_populates="questionnaire", cascade="all, delete-orphan", order_by="QuestionElement.id")
     data_objects = relationship("DataObject", back_populates="questionnaire", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Listings by owner, keyset-paginated on id
+        Index("ix_questionnaires_owner_id_id", "owner_id", "id"),
+    )
+
 class QuestionElement(Base):
     __tablename__ = "questionelements" # Changed from questionelements to questionelements
 
@@ -60,6 +68,14 @@ class DataObject(Base):
     longitude = Column(Float, nullable=True)
     data_values = Column(JSON, nullable=False) # Stores answers to QuestionElements
     additional_info = Column(String, nullable=True) # Info added later
+    # Spatial grid cell (see utils.grid_cell), kept in sync with latitude/longitude by crud
+    grid_lat = Column(Integer, nullable=True)
+    grid_lon = Column(Integer, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Value of the global change sequence (see ChangeSequence) at the last insert or update, set by crud
+    change_seq = Column(Integer, nullable=True)
+    # Client-generated key of a batch submission item, so that retries do not create duplicates
+    idempotency_key = Column(String, nullable=True)
 
     questionnaire = relationship("Questionnaire", back_populates="data_objects")
     favorited_by_users = relationship(
@@ -67,3 +83,77 @@ class DataObject(Base):
         secondary=user_favorite_data_objects,
         back_populates="favorite_data_objects"
     )
+
+    __table_args__ = (
+        # Per-questionnaire counts and listings, keyset-paginated on id
+        Index("ix_dataobjects_questionnaire_id_id", "questionnaire_id", "id"),
+        # Delta sync: an owner's changes since a watermark
+        Index("ix_dataobjects_questionnaire_id_change_seq", "questionnaire_id", "change_seq"),
+        # One DataObject per idempotency key and questionnaire (NULL keys are not compared)
+        Index("ix_dataobjects_questionnaire_id_idempotency_key", "questionnaire_id", "idempotency_key", unique=True),
+        Index("ix_dataobjects_grid", "grid_lat", "grid_lon"),
+        Index("ix_dataobjects_lat_lon", "latitude", "longitude"),
+    )
+
+class DataObjectTombstone(Base):
+    """Left behind by a deleted DataObject so that delta sync can report the deletion."""
+    __tablename__ = "dataobject_tombstones"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    data_object_id = Column(Integer, nullable=False)
+    # Copied from the questionnaire, which is usually deleted along with the object
+    owner_id = Column(Integer, nullable=False)
+    questionnaire_id = Column(Integer, nullable=False)
+    change_seq = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_dataobject_tombstones_owner_id_change_seq", "owner_id", "change_seq"),
+    )
+
+class ChangeSequence(Base):
+    """
+    Single-row counter behind DataObject.change_seq. Writers increment it in
+    their transaction, which keeps the row locked until commit: sequence
+    values become visible in increasing order, so a client can resume from
+    the last value it has seen.
+    """
+    __tablename__ = "change_sequence"
+
+    id = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+# The counter row exists as soon as the table does
+event.listen(
+    ChangeSequence.__table__, "after_create",
+    DDL("INSERT INTO change_sequence (id, value) VALUES (1, 0)")
+)
+
+# Number of DataObjects submitted to a questionnaire. Deferred: only loaded
+# by the read paths that return it (see crud), as a correlated COUNT subquery.
+Questionnaire.submission_count = column_property(
+    select(func.count(DataObject.id))
+    .where(DataObject.questionnaire_id == Questionnaire.id)
+    .correlate_except(DataObject)
+    .scalar_subquery(),
+    deferred=True
+)
+
+# Profile counters for /users/me, deferred in one group so that a profile read
+# loads both with the user row instead of walking the relationships.
+User.questionnaire_count = column_property(
+    select(func.count(Questionnaire.id))
+    .where(Questionnaire.owner_id == User.id)
+    .correlate_except(Questionnaire)
+    .scalar_subquery(),
+    deferred=True,
+    group="profile_counts"
+)
+User.favorite_count = column_property(
+    select(func.count(user_favorite_data_objects.c.data_object_id))
+    .where(user_favorite_data_objects.c.user_id == User.id)
+    .correlate_except(user_favorite_data_objects)
+    .scalar_subquery(),
+    deferred=True,
+    group="profile_counts"
+)
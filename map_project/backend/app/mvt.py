@@ -0,0 +1,127 @@
+"""
+Minimal Mapbox Vector Tile (MVT 2.1) encoder for point layers.
+
+Only what the map needs is implemented: one or more layers of point features
+with a handful of scalar properties, encoded straight to protobuf bytes.
+See https://github.com/mapbox/vector-tile-spec/tree/master/2.1
+"""
+import math
+import struct
+from typing import Any, Dict, Iterable, List, Tuple
+
+EXTENT = 4096
+MAX_MERCATOR_LAT = 85.0511287798
+
+# Protobuf wire types
+_VARINT = 0
+_FIXED64 = 1
+_LENGTH_DELIMITED = 2
+
+_GEOM_TYPE_POINT = 1
+_CMD_MOVE_TO_ONE = (1 & 0x7) | (1 << 3)
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """Return (min_lat, min_lon, max_lat, max_lon) of a web mercator tile."""
+    n = 2 ** z
+    min_lon = x / n * 360.0 - 180.0
+    max_lon = (x + 1) / n * 360.0 - 180.0
+    max_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    min_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return min_lat, min_lon, max_lat, max_lon
+
+def tile_pixel(z: int, x: int, y: int, lat: float, lon: float, extent: int = EXTENT) -> Tuple[int, int]:
+    """Project a point to integer coordinates inside tile z/x/y (0..extent)."""
+    n = 2 ** z
+    lat = max(min(lat, MAX_MERCATOR_LAT), -MAX_MERCATOR_LAT)
+    world_x = (lon + 180.0) / 360.0 * n
+    sin_lat = math.sin(math.radians(lat))
+    world_y = (0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * n
+    return int(round((world_x - x) * extent)), int(round((world_y - y) * extent))
+
+
+def encode_tile(layers: Dict[str, Iterable[Tuple[int, int, int, Dict[str, Any]]]], extent: int = EXTENT) -> bytes:
+    """
+    Encode a tile. `layers` maps a layer name to (id, px, py, properties)
+    point features, where px/py are tile coordinates (see tile_pixel).
+    Properties with a None value are omitted.
+    """
+    tile = bytearray()
+    for name, features in layers.items():
+        _write_bytes(tile, 3, _encode_layer(name, features, extent))
+    return bytes(tile)
+
+def _encode_layer(name: str, features: Iterable[Tuple[int, int, int, Dict[str, Any]]], extent: int) -> bytes:
+    keys: Dict[str, int] = {}
+    values: Dict[Tuple[type, Any], int] = {}
+    layer = bytearray()
+    _write_varint_field(layer, 15, 2) # version
+    _write_bytes(layer, 1, name.encode("utf-8"))
+
+    for feature_id, px, py, properties in features:
+        tags: List[int] = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value), value), len(values)))
+
+        feature = bytearray()
+        _write_varint_field(feature, 1, feature_id)
+        if tags:
+            _write_bytes(feature, 2, _packed(tags))
+        _write_varint_field(feature, 3, _GEOM_TYPE_POINT)
+        _write_bytes(feature, 4, _packed([_CMD_MOVE_TO_ONE, _zigzag(px), _zigzag(py)]))
+        _write_bytes(layer, 2, feature)
+
+    for key in keys:
+        _write_bytes(layer, 3, key.encode("utf-8"))
+    for (_, value) in values:
+        _write_bytes(layer, 4, _encode_value(value))
+    _write_varint_field(layer, 5, extent)
+    return bytes(layer)
+
+def _encode_value(value: Any) -> bytes:
+    out = bytearray()
+    if isinstance(value, bool):
+        _write_varint_field(out, 7, int(value))
+    elif isinstance(value, int):
+        if value >= 0:
+            _write_varint_field(out, 5, value) # uint_value
+        else:
+            _write_varint_field(out, 6, _zigzag(value)) # sint_value
+    elif isinstance(value, float):
+        _write_key(out, 3, _FIXED64)
+        out += struct.pack("<d", value) # double_value
+    else:
+        _write_bytes(out, 1, str(value).encode("utf-8")) # string_value
+    return bytes(out)
+
+
+# --- Protobuf primitives ---
+def _zigzag(n: int) -> int:
+    return (n << 1) ^ (n >> 63)
+
+def _write_varint(out: bytearray, n: int) -> None:
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+def _write_key(out: bytearray, field_number: int, wire_type: int) -> None:
+    _write_varint(out, (field_number << 3) | wire_type)
+
+def _write_varint_field(out: bytearray, field_number: int, n: int) -> None:
+    _write_key(out, field_number, _VARINT)
+    _write_varint(out, n)
+
+def _write_bytes(out: bytearray, field_number: int, data: bytes) -> None:
+    _write_key(out, field_number, _LENGTH_DELIMITED)
+    _write_varint(out, len(data))
+    out += data
+
+def _packed(numbers: List[int]) -> bytes:
+    out = bytearray()
+    for n in numbers:
+        _write_varint(out, n)
+    return bytes(out)
@@ -0,0 +1,63 @@
+"""
+Opaque cursors for keyset pagination of list endpoints, and sync tokens for
+the delta sync endpoint (GET /data/changes).
+
+Lists are ordered by id: a page's cursor encodes the last id it returned, and
+the next page is `WHERE id > :last_id ORDER BY id LIMIT :limit`, which the
+(filter column, id) indexes serve in constant time however deep the page. The
+cursor is returned in the `X-Next-Cursor` response header so that the body
+stays a plain list; the header is absent on the last page.
+"""
+import base64
+import binascii
+import json
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response, status
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode(payload: Dict[str, Any]) -> str:
+    data = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def _decode_ints(token: str, keys: Tuple[str, ...], what: str) -> Tuple[int, ...]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid {what}")
+    values = tuple(payload.get(key) for key in keys) if isinstance(payload, dict) else (None,)
+    if not all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+        raise ValueError(f"Invalid {what}")
+    return values
+
+def encode_cursor(last_id: int) -> str:
+    return _encode({"id": last_id})
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """The last id of the previous page, or None for the first page. Raises ValueError."""
+    if not cursor:
+        return None
+    return _decode_ints(cursor, ("id",), "cursor")[0]
+
+def encode_sync_token(change_seq: int, last_id: int) -> str:
+    return _encode({"seq": change_seq, "id": last_id})
+
+def decode_sync_token(token: Optional[str]) -> Tuple[int, int]:
+    """The (change_seq, id) watermark of a sync token; (0, 0), i.e. everything, without one. Raises ValueError."""
+    if not token:
+        return (0, 0)
+    return _decode_ints(token, ("seq", "id"), "sync token")
+
+def cursor_after_id(cursor: Optional[str] = None) -> Optional[int]:
+    """Dependency decoding the `cursor` query parameter of a list endpoint (400 if invalid)."""
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+def set_next_cursor(response: Response, items: Sequence, limit: int) -> None:
+    """Point to the next page when this one is full (items are ordered by id)."""
+    if limit and len(items) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(items[-1].id)
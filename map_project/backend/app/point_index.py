@@ -0,0 +1,92 @@
+"""
+In-memory spatial index of one owner's geolocated DataObjects.
+
+Coordinates are held in compact typed arrays (8 bytes per id, latitude and
+longitude) and bucketed on the same grid as the `grid_lat`/`grid_lon`
+columns, so a radius query touches only the cells overlapping the search
+circle and computes the exact distances in one vectorized call.
+Indexes are built lazily by crud, kept up to date as objects are created and
+held in an LRU cache across owners (see cache.point_index_cache).
+"""
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from . import utils
+
+
+class PointIndex:
+    def __init__(self, points: Iterable[Tuple[int, float, float]] = ()):
+        self._ids = array("q")
+        self._lats = array("d")
+        self._lons = array("d")
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        self._lock = threading.Lock()
+        for obj_id, latitude, longitude in points:
+            self._add(obj_id, latitude, longitude)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, obj_id: int, latitude: Optional[float], longitude: Optional[float]) -> None:
+        """
+        Add a point, unless its id is already there: an index built right after
+        the object's commit holds it before crud's post-commit add runs.
+        """
+        if latitude is None or longitude is None:
+            return
+        with self._lock:
+            # Coordinates of an id never change, so a copy of it can only be in this cell
+            positions = self._cells.get(utils.grid_cell(latitude, longitude))
+            if positions and (np.frombuffer(self._ids, dtype=np.int64)[positions] == obj_id).any():
+                return
+            self._add(obj_id, latitude, longitude)
+
+    def _add(self, obj_id: int, latitude: float, longitude: float) -> None:
+        self._cells.setdefault(utils.grid_cell(latitude, longitude), []).append(len(self._ids))
+        self._ids.append(obj_id)
+        self._lats.append(latitude)
+        self._lons.append(longitude)
+
+    def within_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_meters: float,
+        exclude_id: Optional[int] = None
+    ) -> List[Tuple[float, int]]:
+        """
+        Return (distance, id) for the points within `radius_meters`,
+        closest first (id breaks ties).
+        """
+        (min_grid_lat, max_grid_lat), grid_lon_ranges = utils.grid_cell_ranges(latitude, longitude, radius_meters)
+        with self._lock:
+            cells_in_range = (max_grid_lat - min_grid_lat + 1) * sum(east - west + 1 for west, east in grid_lon_ranges)
+            positions: List[int] = []
+            if cells_in_range <= len(self._cells):
+                for grid_lat in range(min_grid_lat, max_grid_lat + 1):
+                    for west, east in grid_lon_ranges:
+                        for grid_lon in range(west, east + 1):
+                            positions.extend(self._cells.get((grid_lat, grid_lon), ()))
+            else:
+                # Huge radius: cheaper to walk the occupied cells than the ones in range
+                for (grid_lat, grid_lon), cell_positions in self._cells.items():
+                    if min_grid_lat <= grid_lat <= max_grid_lat and \
+                            any(west <= grid_lon <= east for west, east in grid_lon_ranges):
+                        positions.extend(cell_positions)
+            if not positions:
+                return []
+            selected = np.asarray(positions, dtype=np.int64)
+            ids = np.frombuffer(self._ids, dtype=np.int64)[selected]
+            lats = np.frombuffer(self._lats, dtype=np.float64)[selected]
+            lons = np.frombuffer(self._lons, dtype=np.float64)[selected]
+
+        distances = utils.haversine_distances(latitude, longitude, lats, lons)
+        keep = distances <= radius_meters
+        if exclude_id is not None:
+            keep &= ids != exclude_id
+        distances, ids = distances[keep], ids[keep]
+        order = np.lexsort((ids, distances))
+        return list(zip(distances[order].tolist(), ids[order].tolist()))
@@ -1,24 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from datetime import date # For date query parameters
+from types import SimpleNamespace
 
-from .. import crud, models, schemas
+from .. import crud, models, schemas, geometry, pagination, export, fast_json
 from ..database import SessionLocal # Or from .auth import get_db
 from ..routers.auth import get_current_active_user, get_db # Reusing get_db
 
 router = APIRouter()
 
+# Upper bound on the number of points returned for a single map viewport
+MAX_VIEWPORT_LIMIT = 1000
+
 @router.get("/", response_model=List[schemas.DataObject])
 def list_data_objects(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     questionnaire_id: Optional[int] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
+    # Viewport (map bounds) filter; all four must be given together.
+    # min_lon > max_lon is accepted for viewports crossing the antimeridian.
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lon: Optional[float] = Query(None, ge=-180, le=180),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lon: Optional[float] = Query(None, ge=-180, le=180),
+    # Keyset pagination: `cursor` query parameter, from the X-Next-Cursor header of the previous page
+    after_id: Optional[int] = Depends(pagination.cursor_after_id),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
+    viewport = _viewport_or_none(min_lat, min_lon, max_lat, max_lon)
+    if viewport:
+        limit = min(limit, MAX_VIEWPORT_LIMIT)
+
     data_objects = crud.get_data_objects(
         db,
         current_user=current_user,
@@ -26,9 +44,209 @@ def list_data_objects(
         limit=limit,
         questionnaire_id=questionnaire_id,
         start_date=start_date,
+        end_date=end_date,
+        viewport=viewport,
+        after_id=after_id
+    )
+    pagination.set_next_cursor(response, data_objects, limit)
+    return fast_json.list_response(schemas.DataObject, data_objects, response)
+
+@router.post("/within/", response_model=List[schemas.DataObject])
+def list_data_objects_within_area(
+    area_query: schemas.DataObjectAreaQuery,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    # POST because polygons (districts, patrol zones) easily exceed URL length limits
+    try:
+        polygon = geometry.prepare_polygon(area_query.geometry)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return crud.get_data_objects(
+        db,
+        current_user=current_user,
+        skip=skip,
+        limit=limit,
+        questionnaire_id=area_query.questionnaire_id,
+        start_date=area_query.start_date,
+        end_date=area_query.end_date,
+        polygon=polygon
+    )
+
+@router.get("/clusters/", response_model=List[schemas.DataObjectCluster])
+def list_data_object_clusters(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    zoom: int = Query(..., ge=0, le=22),
+    questionnaire_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    sample_size: int = Query(5, ge=0, le=50),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    # Server-side clustering: the payload depends on the viewport and zoom, not on the dataset size
+    return crud.get_data_object_clusters(
+        db,
+        current_user=current_user,
+        viewport=_viewport_or_none(min_lat, min_lon, max_lat, max_lon),
+        zoom=zoom,
+        questionnaire_id=questionnaire_id,
+        start_date=start_date,
+        end_date=end_date,
+        sample_size=sample_size
+    )
+
+@router.get("/heatmap/", response_model=schemas.DataObjectHeatmap)
+def get_data_object_heatmap(
+    cell_size_deg: float = Query(0.1, ge=0.01, le=90),
+    questionnaire_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lon: Optional[float] = Query(None, ge=-180, le=180),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lon: Optional[float] = Query(None, ge=-180, le=180),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    # Density counts per cell, aggregated in SQL on the persisted grid cells
+    cell_size, cells = crud.get_data_object_heatmap(
+        db,
+        current_user=current_user,
+        cell_size_degrees=cell_size_deg,
+        questionnaire_id=questionnaire_id,
+        start_date=start_date,
+        end_date=end_date,
+        viewport=_viewport_or_none(min_lat, min_lon, max_lat, max_lon)
+    )
+    return {"cell_size_deg": cell_size, "cells": cells}
+
+@router.get("/duplicates/", response_model=List[schemas.DataObjectMergeRequest])
+def list_duplicate_candidates(
+    distance_m: float = Query(50.0, gt=0, le=10000),
+    questionnaire_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    # Owner-wide duplicate detection: groups of objects within distance_m of each other,
+    # each ready to be sent as-is to POST /data/merge/ (merged into the oldest object's questionnaire)
+    groups = crud.find_duplicate_groups(
+        db,
+        current_user=current_user,
+        max_distance_meters=distance_m,
+        questionnaire_id=questionnaire_id
+    )
+    return [
+        schemas.DataObjectMergeRequest(
+            data_object_ids=[obj_id for obj_id, _ in group],
+            target_questionnaire_id=group[0][1]
+        )
+        for group in groups[skip : skip + limit]
+    ]
+
+@router.get("/tiles/{z}/{x}/{y}.mvt", response_class=Response)
+def get_data_object_tile(
+    z: int,
+    x: int,
+    y: int,
+    questionnaire_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    if not 0 <= z <= 22 or not 0 <= x < 2 ** z or not 0 <= y < 2 ** z:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tile not found")
+    tile = crud.get_data_object_tile(
+        db,
+        current_user=current_user,
+        z=z, x=x, y=y,
+        questionnaire_id=questionnaire_id,
+        start_date=start_date,
         end_date=end_date
     )
-    return data_objects
+    return Response(content=tile, media_type="application/vnd.mapbox-vector-tile")
+
+# Declared before /{data_object_id}, which would otherwise capture "changes"
+@router.get("/changes", response_model=schemas.DataObjectChanges)
+def list_data_object_changes(
+    since: Optional[str] = None, # next_since of the previous call; omit for a full initial sync
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    # Delta sync: only what was inserted, merged, updated or deleted since the token
+    try:
+        watermark = pagination.decode_sync_token(since)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    upserted, deleted_ids, (change_seq, last_id), has_more = crud.get_data_object_changes(
+        db, current_user=current_user, since=watermark, limit=limit
+    )
+    return {
+        "upserted": upserted,
+        "deleted": deleted_ids,
+        "next_since": pagination.encode_sync_token(change_seq, last_id),
+        "has_more": has_more,
+    }
+
+# Declared before /{data_object_id}, which would otherwise capture "export"
+@router.get("/export", response_class=StreamingResponse)
+def export_data_objects(
+    format: str = Query("ndjson", pattern="^(ndjson|geojson)$"),
+    # Same filters as GET /data/
+    questionnaire_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lon: Optional[float] = Query(None, ge=-180, le=180),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lon: Optional[float] = Query(None, ge=-180, le=180),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    # Streamed in id order from a server-side cursor, whatever the number of rows
+    rows = crud.iter_data_object_rows(
+        db,
+        owner_id=current_user.id,
+        questionnaire_id=questionnaire_id,
+        start_date=start_date,
+        end_date=end_date,
+        viewport=_viewport_or_none(min_lat, min_lon, max_lat, max_lon),
+        batch_size=export.EXPORT_BATCH_SIZE
+    )
+    if format == "geojson":
+        chunks, media_type = export.iter_geojson(rows), export.GEOJSON_MEDIA_TYPE
+    else:
+        chunks, media_type = export.iter_ndjson(rows), export.NDJSON_MEDIA_TYPE
+    return StreamingResponse(
+        export.close_session_after(db, chunks),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="data_objects.{format}"'}
+    )
+
+def _viewport_or_none(
+    min_lat: Optional[float],
+    min_lon: Optional[float],
+    max_lat: Optional[float],
+    max_lon: Optional[float]
+) -> Optional[Tuple[float, float, float, float]]:
+    bounds = (min_lat, min_lon, max_lat, max_lon)
+    if all(bound is None for bound in bounds):
+        return None
+    if any(bound is None for bound in bounds):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="min_lat, min_lon, max_lat and max_lon must be provided together.")
+    if min_lat > max_lat:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="min_lat must not be greater than max_lat.")
+    return bounds
 
 @router.get("/{data_object_id}", response_model=schemas.DataObject)
 def read_data_object(
@@ -93,6 +311,24 @@ def merge_multiple_data_objects(
 
     return merged_data_object
 
+# Dedup sessions: merge every group found by GET /data/duplicates/ at once
+MERGE_BATCH_MAX_GROUPS = 10000
+
+@router.post("/merge/batch", response_model=List[schemas.DataObject], status_code=status.HTTP_201_CREATED)
+def merge_data_object_groups(
+    merge_requests: List[schemas.DataObjectMergeRequest],
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    # All groups or none: the merged objects come back in the order of the groups
+    if len(merge_requests) > MERGE_BATCH_MAX_GROUPS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {MERGE_BATCH_MAX_GROUPS} groups per batch")
+    try:
+        merged_objects = crud.merge_data_object_groups(db, user=current_user, merge_requests=merge_requests)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return merged_objects
+
 @router.get("/nearby_suggestions/", response_model=List[schemas.DataObject])
 def get_nearby_data_object_suggestions(
     source_data_object_id: int,
@@ -111,7 +347,34 @@ def get_nearby_data_object_suggestions(
             skip=skip,
             limit=limit
         )
-        return nearby_objects
+        return fast_json.list_response(schemas.DataObject, nearby_objects)
     except ValueError as e:
         # Catch specific errors raised by CRUD function for bad input
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/nearest/", response_model=List[schemas.DataObjectWithDistance])
+def get_nearest_data_objects(
+    source_data_object_id: Optional[int] = None,
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    k: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    try:
+        nearest = crud.get_nearest_data_objects(
+            db=db,
+            current_user=current_user,
+            k=k,
+            source_data_object_id=source_data_object_id,
+            latitude=latitude,
+            longitude=longitude
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    # Rows carrying the DataObject fields plus the distance, serialized in one pass
+    rows = [
+        SimpleNamespace(**{field: getattr(obj, field) for field in schemas.DataObject.model_fields}, distance_m=distance)
+        for obj, distance in nearest
+    ]
+    return fast_json.list_response(schemas.DataObjectWithDistance, rows)
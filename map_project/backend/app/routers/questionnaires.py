@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header # Added Header
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, Header # Added Header
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 
-from .. import crud, models, schemas
+from .. import crud, models, schemas, pagination, export
 from ..database import SessionLocal
 # Updated imports from .auth
 from .auth import get_current_active_user, get_current_user_optional, get_db
@@ -19,21 +20,66 @@ def create_new_questionnaire(
 ):
     return crud.create_questionnaire(db=db, questionnaire=questionnaire, owner_id=current_user.id)
 
-@router.get("/{questionnaire_id}", response_model=schemas.Questionnaire)
+# Questionnaire responses are summaries (elements + submission_count) unless
+# include=data_objects asks for a page of submissions (data_skip/data_limit)
+QuestionnaireResponse = Union[schemas.Questionnaire, schemas.QuestionnaireWithDataObjects]
+
+def _questionnaire_response(
+    db: Session,
+    db_questionnaire: models.Questionnaire,
+    include: Optional[str],
+    data_skip: int,
+    data_limit: int
+) -> schemas.Questionnaire:
+    return _questionnaire_responses(db, [db_questionnaire], include, data_skip, data_limit)[0]
+
+def _questionnaire_responses(
+    db: Session,
+    db_questionnaires: List[models.Questionnaire],
+    include: Optional[str],
+    data_skip: int,
+    data_limit: int
+) -> List[schemas.Questionnaire]:
+    summaries = [schemas.Questionnaire.model_validate(q) for q in db_questionnaires]
+    if "data_objects" not in _parse_include(include):
+        return summaries
+    # One query for the pages of every questionnaire
+    data_objects = crud.get_questionnaires_data_objects(
+        db, questionnaire_ids=[q.id for q in db_questionnaires], skip=data_skip, limit=data_limit
+    )
+    return [
+        schemas.QuestionnaireWithDataObjects(
+            **summary.model_dump(),
+            data_objects=[schemas.DataObject.model_validate(obj) for obj in data_objects[summary.id]]
+        )
+        for summary in summaries
+    ]
+
+def _parse_include(include: Optional[str]) -> set:
+    fields = {field.strip() for field in (include or "").split(",") if field.strip()}
+    unknown = fields - {"data_objects"}
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown include field(s): {', '.join(sorted(unknown))}")
+    return fields
+
+@router.get("/{questionnaire_id}", response_model=QuestionnaireResponse)
 async def read_questionnaire_public( # Renamed for clarity, marked async
     questionnaire_id: int,
+    include: Optional[str] = None,
+    data_skip: int = 0,
+    data_limit: int = Query(100, ge=0, le=1000),
     db: Session = Depends(get_db),
     # Allow optional JWT authentication
     current_user: Optional[models.User] = Depends(get_current_user_optional),
     x_questionnaire_password: Optional[str] = Header(None, alias="X-Questionnaire-Password")
 ):
-    db_questionnaire = crud.get_questionnaire(db, questionnaire_id=questionnaire_id)
+    db_questionnaire = crud.get_questionnaire(db, questionnaire_id=questionnaire_id, for_response=True)
     if db_questionnaire is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Questionnaire not found")
 
     # If the user is authenticated and is the owner, grant access
     if current_user and db_questionnaire.owner_id == current_user.id:
-        return db_questionnaire
+        return _questionnaire_response(db, db_questionnaire, include, data_skip, data_limit)
 
     # If the questionnaire has a password, it must be verified
     if db_questionnaire.password: # Assumes plaintext password as per subtask decision
@@ -42,19 +88,32 @@ async def read_questionnaire_public( # Renamed for clarity, marked async
         if x_questionnaire_password != db_questionnaire.password:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid password for this questionnaire")
 
+    # Only the owner may list submissions
+    if "data_objects" in _parse_include(include):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only the owner can include data objects")
+
     # If questionnaire has no password, or if correct password was provided, allow access
     # Also covers the case where owner is accessing (already returned)
-    return db_questionnaire
+    return _questionnaire_response(db, db_questionnaire, None, data_skip, data_limit)
 
-@router.get("/", response_model=List[schemas.Questionnaire])
+@router.get("/", response_model=List[QuestionnaireResponse])
 def read_user_questionnaires(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=0, le=1000),
+    include: Optional[str] = None,
+    data_skip: int = 0,
+    data_limit: int = Query(100, ge=0, le=1000),
+    # Keyset pagination: `cursor` query parameter, from the X-Next-Cursor header of the previous page
+    after_id: Optional[int] = Depends(pagination.cursor_after_id),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    questionnaires = crud.get_questionnaires_by_owner(db, owner_id=current_user.id, skip=skip, limit=limit)
-    return questionnaires
+    questionnaires = crud.get_questionnaires_by_owner(
+        db, owner_id=current_user.id, skip=skip, limit=limit, after_id=after_id
+    )
+    pagination.set_next_cursor(response, questionnaires, limit)
+    return _questionnaire_responses(db, questionnaires, include, data_skip, data_limit)
 
 @router.put("/{questionnaire_id}", response_model=schemas.Questionnaire)
 def update_existing_questionnaire(
@@ -102,6 +161,21 @@ def create_new_element_for_questionnaire(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to add elements to this questionnaire")
     return crud.create_questionnaire_element(db=db, element=element, questionnaire_id=questionnaire_id)
 
+@router.put("/{questionnaire_id}/elements/", response_model=schemas.Questionnaire)
+def replace_elements_of_questionnaire(
+    questionnaire_id: int,
+    elements: List[schemas.QuestionElementCreate],
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    # The whole form at once, in order, instead of one request per element
+    db_questionnaire = crud.get_questionnaire(db, questionnaire_id=questionnaire_id)
+    if db_questionnaire is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Questionnaire not found")
+    if db_questionnaire.owner_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to modify elements of this questionnaire")
+    return crud.replace_questionnaire_elements(db=db, questionnaire_id=questionnaire_id, elements=elements)
+
 @router.put("/{questionnaire_id}/elements/{element_id}", response_model=schemas.QuestionElement)
 def update_existing_element(
     questionnaire_id: int, # Used to verify ownership via questionnaire
@@ -156,6 +230,55 @@ def submit_data_to_questionnaire(
     db: Session = Depends(get_db),
     x_questionnaire_password: Optional[str] = Header(None, alias="X-Questionnaire-Password") # For questionnaire password
 ):
+    db_questionnaire = _get_questionnaire_for_submission(db, questionnaire_id, x_questionnaire_password)
+
+    # Basic validation: check if all keys in data_values correspond to actual question element labels or IDs
+    # This is a simplified validation. A more robust one would check types, options, etc.
+    # For now, we just ensure the keys are plausible.
+    # Example: Collect all element labels/ids for validation
+    # valid_element_keys = {el.label for el in db_questionnaire.elements} | {str(el.id) for el in db_questionnaire.elements}
+    # for key in data.data_values.keys():
+    #     if key not in valid_element_keys:
+    #         raise HTTPException(status_code=400, detail=f"Invalid data key: {key}")
+
+    return crud.create_data_object(db=db, data=data, questionnaire_id=questionnaire_id)
+
+# Offline collection: upload everything gathered in the field in one request
+BATCH_SUBMIT_MAX_ITEMS = 1000
+
+@router.post("/{questionnaire_id}/submit/batch", response_model=List[schemas.DataObjectBatchItemResult])
+def submit_data_batch_to_questionnaire(
+    questionnaire_id: int,
+    items: List[schemas.DataObjectBatchItem],
+    db: Session = Depends(get_db),
+    x_questionnaire_password: Optional[str] = Header(None, alias="X-Questionnaire-Password")
+):
+    if len(items) > BATCH_SUBMIT_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BATCH_SUBMIT_MAX_ITEMS} items per batch"
+        )
+    # Checked once for the whole batch
+    _get_questionnaire_for_submission(db, questionnaire_id, x_questionnaire_password)
+    results = crud.create_data_objects_batch(db, items=items, questionnaire_id=questionnaire_id)
+    return [
+        schemas.DataObjectBatchItemResult(
+            index=index,
+            status=item_status,
+            id=data_object_id,
+            # Only created objects are echoed: submitters are anonymous, and a
+            # duplicate key may have been used by someone else
+            data_object=schemas.DataObject.model_validate(data_object) if data_object is not None else None,
+            error=error
+        )
+        for index, (item_status, data_object_id, data_object, error) in enumerate(results)
+    ]
+
+def _get_questionnaire_for_submission(
+    db: Session,
+    questionnaire_id: int,
+    x_questionnaire_password: Optional[str]
+) -> models.Questionnaire:
     db_questionnaire = crud.get_questionnaire(db, questionnaire_id=questionnaire_id)
     if db_questionnaire is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Questionnaire not found")
@@ -173,14 +296,35 @@ def submit_data_to_questionnaire(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Incorrect password for questionnaire submission"
             )
+    return db_questionnaire
 
-    # Basic validation: check if all keys in data_values correspond to actual question element labels or IDs
-    # This is a simplified validation. A more robust one would check types, options, etc.
-    # For now, we just ensure the keys are plausible.
-    # Example: Collect all element labels/ids for validation
-    # valid_element_keys = {el.label for el in db_questionnaire.elements} | {str(el.id) for el in db_questionnaire.elements}
-    # for key in data.data_values.keys():
-    #     if key not in valid_element_keys:
-    #         raise HTTPException(status_code=400, detail=f"Invalid data key: {key}")
 
-    return crud.create_data_object(db=db, data=data, questionnaire_id=questionnaire_id)
+# --- Columnar Export Endpoint ---
+
+@router.get("/{questionnaire_id}/export", response_class=StreamingResponse)
+def export_questionnaire_data(
+    questionnaire_id: int,
+    format: str = Query("csv", pattern="^(csv|parquet|arrow)$"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    # One row per DataObject, one typed column per QuestionElement label, streamed in chunks
+    db_questionnaire = crud.get_questionnaire(db, questionnaire_id=questionnaire_id, for_response=True)
+    if db_questionnaire is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Questionnaire not found")
+    if db_questionnaire.owner_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to export this questionnaire")
+    media_type, needs_pyarrow = export.COLUMNAR_FORMATS[format]
+    if needs_pyarrow and export.pyarrow is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"The {format} format requires pyarrow on the server")
+
+    layout = export.columnar_layout(db_questionnaire.elements)
+    rows = crud.iter_data_object_rows(
+        db, owner_id=current_user.id, questionnaire_id=questionnaire_id, batch_size=export.EXPORT_BATCH_SIZE
+    )
+    chunks = export.iter_csv(layout, rows) if format == "csv" else export.iter_arrow(layout, rows, format=format)
+    return StreamingResponse(
+        export.close_session_after(db, chunks),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="questionnaire_{questionnaire_id}.{format}"'}
+    )
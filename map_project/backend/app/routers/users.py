@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from .. import crud, models, schemas
+from .. import crud, models, schemas, pagination, fast_json
 from ..database import get_db # Import get_db from database.py
 from .auth import get_current_active_user
 
@@ -25,15 +25,47 @@ def create_new_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     return created_user
 
 @router.get("/me", response_model=schemas.User)
-async def read_users_me(current_user: models.User = Depends(get_current_active_user)):
-    # The user object from get_current_active_user might not have all relationships loaded by default.
-    # Depending on how User schema is (e.g. if it expects favorite_data_objects to be populated),
-    # we might need to refresh the user object from DB or ensure get_current_active_user does.
-    # For now, assuming the current_user object is sufficient or User schema handles lazy loading.
-    # To be safe, one might do: db_user = crud.get_user(db, current_user.id) and return db_user.
-    # However, User schema now includes favorite_data_objects: List[DataObject] = []
-    # SQLAlchemy lazy loading should handle this if accessed.
-    return current_user
+def read_users_me(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    # Profile with counts only, loaded in a single query whatever the size of the account.
+    # Owned questionnaires and favorites are paginated below.
+    return crud.get_user_profile(db, user_id=current_user.id)
+
+@router.get("/me/questionnaires/", response_model=List[schemas.Questionnaire])
+def get_my_questionnaires(
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(100, ge=0, le=1000),
+    after_id: Optional[int] = Depends(pagination.cursor_after_id),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    questionnaires = crud.get_questionnaires_by_owner(db, owner_id=current_user.id, skip=skip, limit=limit, after_id=after_id)
+    pagination.set_next_cursor(response, questionnaires, limit)
+    return questionnaires
+
+# Before /me/favorites/{data_object_id}, which would capture it
+FAVORITES_BULK_MAX_IDS = 10000
+
+@router.post("/me/favorites/bulk", response_model=schemas.FavoritesBulkResult)
+def update_favorites_in_bulk(
+    update: schemas.FavoritesBulkUpdate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    if len(update.add) + len(update.remove) > FAVORITES_BULK_MAX_IDS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {FAVORITES_BULK_MAX_IDS} ids per request")
+    if set(update.add) & set(update.remove):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The same DataObject cannot be both added and removed")
+    added, removed = crud.update_favorites(db=db, user_id=current_user.id, add_ids=update.add, remove_ids=update.remove)
+    added_ids = set(added)
+    return {
+        "added": added,
+        "removed": removed,
+        "not_found": [obj_id for obj_id in dict.fromkeys(update.add) if obj_id not in added_ids]
+    }
 
 @router.post("/me/favorites/{data_object_id}", response_model=schemas.User)
 def add_data_object_to_favorites(
@@ -41,21 +73,25 @@ def add_data_object_to_favorites(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
+    # Returns the profile with the updated favorite_count; the favorites themselves are paginated below
     updated_user = crud.add_favorite(db=db, user_id=current_user.id, data_object_id=data_object_id)
     if not updated_user:
         raise HTTPException(status_code=404, detail="DataObject not found or not accessible to user")
-    return updated_user # User schema should now show the updated favorites
+    return updated_user
 
 @router.get("/me/favorites/", response_model=List[schemas.DataObject])
 def get_my_favorites(
-    db: Session = Depends(get_db), # Not strictly needed by crud.get_user_favorites if current_user has them
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(100, ge=0, le=1000),
+    # Keyset pagination: `cursor` query parameter, from the X-Next-Cursor header of the previous page
+    after_id: Optional[int] = Depends(pagination.cursor_after_id),
+    db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    # crud.get_user_favorites expects user_id, but current_user from Depends is already the model.
-    # If current_user.favorite_data_objects is already populated by SQLAlchemy's lazy loading
-    # upon User schema serialization, this can be direct.
-    # Let's assume crud.get_user_favorites is the safer way if direct access isn't populated.
-    return crud.get_user_favorites(db=db, user_id=current_user.id)
+    favorites = crud.get_user_favorites(db=db, user_id=current_user.id, skip=skip, limit=limit, after_id=after_id)
+    pagination.set_next_cursor(response, favorites, limit)
+    return fast_json.list_response(schemas.DataObject, favorites, response)
 
 
 @router.delete("/me/favorites/{data_object_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -64,8 +100,8 @@ def remove_data_object_from_favorites(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    user = crud.remove_favorite(db=db, user_id=current_user.id, data_object_id=data_object_id)
-    if not user:
+    removed = crud.remove_favorite(db=db, user_id=current_user.id, data_object_id=data_object_id)
+    if not removed:
         # This could mean data object wasn't found, or wasn't a favorite.
         # For DELETE, idempotency often means returning 204 even if it wasn't there.
         # However, if we want to be strict:
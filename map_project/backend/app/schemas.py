@@ -1,6 +1,6 @@
 from pydantic import BaseModel, ConfigDict
 from typing import Optional, List, Dict, Any, Tuple
-from datetime import datetime
+from datetime import date, datetime
 
 # --- Token Schemas ---
 class Token(BaseModel):
@@ -42,6 +42,10 @@ class DataObjectBase(BaseModel): # Ensuring this is the version used
 class DataObjectCreate(DataObjectBase):
     pass
 
+class DataObjectBatchItem(DataObjectCreate):
+    # Client-generated (e.g. a UUID): resubmitting the same key returns the existing DataObject
+    idempotency_key: Optional[str] = None
+
 class DataObjectUpdate(BaseModel):
     additional_info: Optional[str] = None
 
@@ -57,9 +61,48 @@ class DataObject(DataObjectBase):
     id: int
     questionnaire_id: int
     submission_date: datetime
+    updated_at: Optional[datetime] = None
     # additional_info is inherited from DataObjectBase
     model_config = ConfigDict(from_attributes=True)
 
+class DataObjectBatchItemResult(BaseModel):
+    index: int # Position of the item in the submitted batch
+    status: str # "created", "duplicate" (idempotency key already used) or "invalid"
+    id: Optional[int] = None # Of the created, or previously created, DataObject
+    # Only for created items: a duplicate key may have been used by another submitter
+    data_object: Optional[DataObject] = None
+    error: Optional[str] = None # Why an invalid item was rejected
+
+class DataObjectAreaQuery(BaseModel):
+    geometry: Dict[str, Any] # GeoJSON Polygon or MultiPolygon (or a Feature wrapping one)
+    questionnaire_id: Optional[int] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+class DataObjectWithDistance(DataObject):
+    distance_m: float
+
+class DataObjectChanges(BaseModel):
+    upserted: List[DataObject] # Inserted, merged or updated since the token: current state
+    deleted: List[int] # Ids of deleted DataObjects
+    next_since: str # Token for the next call
+    has_more: bool # More changes are waiting: call again right away with next_since
+
+class DataObjectCluster(BaseModel):
+    latitude: float # Centroid
+    longitude: float
+    count: int
+    sample_ids: List[int]
+
+class HeatmapCell(BaseModel):
+    latitude: float # Cell center
+    longitude: float
+    count: int
+
+class DataObjectHeatmap(BaseModel):
+    cell_size_deg: float
+    cells: List[HeatmapCell]
+
 
 # --- Questionnaire Schemas ---
 class QuestionnaireBase(BaseModel):
@@ -79,9 +122,13 @@ class Questionnaire(QuestionnaireBase):
     id: int
     owner_id: int
     elements: List[QuestionElement] = []
-    data_objects: List[DataObject] = []
+    submission_count: int = 0
     model_config = ConfigDict(from_attributes=True)
 
+class QuestionnaireWithDataObjects(Questionnaire):
+    # Only returned when explicitly requested (include=data_objects), one page at a time
+    data_objects: List[DataObject] = []
+
 
 # --- User Schemas ---
 class UserBase(BaseModel):
@@ -93,6 +140,18 @@ class UserCreate(UserBase):
 class User(UserBase):
     id: int
     is_active: bool
-    questionnaires: List[Questionnaire] = []
-    favorite_data_objects: List[DataObject] = []
+    # Counts only: owned questionnaires and favorites have their own paginated endpoints
+    questionnaire_count: int = 0
+    favorite_count: int = 0
     model_config = ConfigDict(from_attributes=True)
+
+
+# --- Favorites Schemas ---
+class FavoritesBulkUpdate(BaseModel):
+    add: List[int] = []
+    remove: List[int] = []
+
+class FavoritesBulkResult(BaseModel):
+    added: List[int] # Favorites after the call, whether or not they already were
+    removed: List[int] # Were favorites and no longer are
+    not_found: List[int] # Ids to add that do not exist or belong to another user
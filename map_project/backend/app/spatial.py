@@ -0,0 +1,163 @@
+"""
+Optional spatial database backend for DataObject coordinates.
+
+When the database supports it (PostgreSQL with the PostGIS extension, or
+SQLite with the SpatiaLite extension loadable), a `geom` point column and a
+spatial index are added to `dataobjects`, kept in sync with the
+latitude/longitude columns by the database itself, and crud pushes radius,
+nearest-neighbour and bounding-box queries down to spatial functions.
+Everywhere else the plain float-column path (grid cells + lat/lon index) is
+used, so the ORM models do not know about `geom`.
+
+Environment variables:
+    SPATIAL_BACKEND: "auto" (default) to detect support, "off" to disable it.
+    SPATIALITE_LIBRARY: SpatiaLite extension to load (default "mod_spatialite").
+"""
+import os
+import weakref
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event, func, literal_column, select, text, or_, column, table
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+SPATIAL_BACKEND = os.getenv("SPATIAL_BACKEND", "auto")
+SPATIALITE_LIBRARY = os.getenv("SPATIALITE_LIBRARY", "mod_spatialite")
+
+POSTGIS = "postgis"
+SPATIALITE = "spatialite"
+
+# Backend enabled by setup_spatial_backend, per engine
+_backends: "weakref.WeakKeyDictionary[Engine, Optional[str]]" = weakref.WeakKeyDictionary()
+
+_geom = literal_column("dataobjects.geom")
+_spatial_index = table(
+    "SpatialIndex",
+    column("rowid"), column("f_table_name"), column("f_geometry_column"), column("search_frame")
+)
+
+
+def load_spatialite_on_connect(engine: Engine) -> None:
+    """Try to load SpatiaLite on every new SQLite connection of `engine`."""
+    if engine.dialect.name != "sqlite" or SPATIAL_BACKEND == "off":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _load_spatialite(dbapi_connection, connection_record):
+        try:
+            dbapi_connection.enable_load_extension(True)
+            dbapi_connection.load_extension(SPATIALITE_LIBRARY)
+            dbapi_connection.enable_load_extension(False)
+        except Exception:
+            # Python built without extension support, or SpatiaLite not installed
+            pass
+
+def setup_spatial_backend(engine: Engine) -> Optional[str]:
+    """
+    Add the geometry column, spatial index and sync triggers to `dataobjects`
+    if the engine supports it (idempotent; call after create_all). Returns the
+    enabled backend name, or None when the float-column path stays in use.
+    """
+    backend = None
+    if SPATIAL_BACKEND != "off":
+        with engine.begin() as connection:
+            if engine.dialect.name == "postgresql" and _has_postgis(connection):
+                _setup_postgis(connection)
+                backend = POSTGIS
+            elif engine.dialect.name == "sqlite" and _has_spatialite(connection):
+                _setup_spatialite(connection)
+                backend = SPATIALITE
+    _backends[engine] = backend
+    return backend
+
+def backend_for(db: Session) -> Optional[str]:
+    """The spatial backend enabled for the engine behind this session, if any."""
+    bind = db.get_bind()
+    return _backends.get(getattr(bind, "engine", bind))
+
+
+# --- Query helpers used by crud ---
+def point(latitude: float, longitude: float):
+    return func.ST_SetSRID(func.ST_MakePoint(longitude, latitude), 4326)
+
+def postgis_distance(latitude: float, longitude: float):
+    """Geodesic distance in meters from `dataobjects.geom` to a point (PostGIS)."""
+    return func.ST_Distance(func.geography(_geom), func.geography(point(latitude, longitude)))
+
+def postgis_within_radius(latitude: float, longitude: float, radius_meters: float):
+    """Index-backed radius filter on the geography expression index (PostGIS)."""
+    return func.ST_DWithin(func.geography(_geom), func.geography(point(latitude, longitude)), radius_meters)
+
+def postgis_nearest_order(latitude: float, longitude: float):
+    """Index-backed nearest-neighbour ordering (PostGIS)."""
+    return func.geography(_geom).op("<->")(func.geography(point(latitude, longitude)))
+
+def bounding_box_filter(backend: str, id_column, min_lat: float, max_lat: float, lon_ranges: List[Tuple[float, float]]):
+    """
+    Spatial-index filter for points inside a lat/lon box given as (west, east)
+    longitude ranges (split at the antimeridian by the caller).
+    """
+    if backend == POSTGIS:
+        return or_(*(
+            _geom.op("&&")(func.ST_MakeEnvelope(west, min_lat, east, max_lat, 4326))
+            for west, east in lon_ranges
+        ))
+    # SpatiaLite: look the box up in the R*Tree through the SpatialIndex virtual table
+    return or_(*(
+        id_column.in_(
+            select(_spatial_index.c.rowid)
+            .where(_spatial_index.c.f_table_name == "dataobjects")
+            .where(_spatial_index.c.f_geometry_column == "geom")
+            .where(_spatial_index.c.search_frame == func.BuildMbr(west, min_lat, east, max_lat, 4326))
+        )
+        for west, east in lon_ranges
+    ))
+
+
+# --- Backend setup ---
+_SPATIALITE_POINT = (
+    "CASE WHEN NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL "
+    "THEN MakePoint(NEW.longitude, NEW.latitude, 4326) END"
+)
+
+def _has_postgis(connection) -> bool:
+    return connection.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'postgis'")).first() is not None
+
+def _has_spatialite(connection) -> bool:
+    try:
+        connection.execute(text("SELECT spatialite_version()"))
+        return True
+    except Exception:
+        return False
+
+def _setup_postgis(connection) -> None:
+    # A generated column needs no application code to stay in sync
+    connection.execute(text(
+        "ALTER TABLE dataobjects ADD COLUMN IF NOT EXISTS geom geometry(Point, 4326) "
+        "GENERATED ALWAYS AS (CASE WHEN latitude IS NOT NULL AND longitude IS NOT NULL "
+        "THEN ST_SetSRID(ST_MakePoint(longitude, latitude), 4326) END) STORED"
+    ))
+    # Planar index for bounding boxes, geography index for distances and kNN
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_dataobjects_geom ON dataobjects USING GIST (geom)"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_dataobjects_geog ON dataobjects USING GIST (geography(geom))"))
+
+def _setup_spatialite(connection) -> None:
+    if connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'spatial_ref_sys'")).first() is None:
+        connection.execute(text("SELECT InitSpatialMetadata(1)"))
+    columns = {row[1] for row in connection.execute(text("PRAGMA table_info(dataobjects)"))}
+    if "geom" not in columns:
+        connection.execute(text("SELECT AddGeometryColumn('dataobjects', 'geom', 4326, 'POINT', 'XY')"))
+        connection.execute(text("SELECT CreateSpatialIndex('dataobjects', 'geom')"))
+    connection.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS dataobjects_geom_insert AFTER INSERT ON dataobjects "
+        "BEGIN UPDATE dataobjects SET geom = " + _SPATIALITE_POINT + " WHERE id = NEW.id; END"
+    ))
+    connection.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS dataobjects_geom_update AFTER UPDATE OF latitude, longitude ON dataobjects "
+        "BEGIN UPDATE dataobjects SET geom = " + _SPATIALITE_POINT + " WHERE id = NEW.id; END"
+    ))
+    # Backfill rows created before the column existed
+    connection.execute(text(
+        "UPDATE dataobjects SET geom = MakePoint(longitude, latitude, 4326) "
+        "WHERE geom IS NULL AND latitude IS NOT NULL AND longitude IS NOT NULL"
+    ))
@@ -1,23 +1,327 @@
+import itertools
 import math
 
+import numpy as np
+from numpy.typing import ArrayLike
+
+EARTH_RADIUS_METERS = 6371000  # Radius of the Earth in meters
+
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
     Calculate the great circle distance in meters between two points
     on the earth (specified in decimal degrees).
     """
-    R = 6371000  # Radius of the Earth in meters
+    return float(haversine_distances(lat1, lon1, lat2, lon2))
+
+def haversine_distances(lat: float, lon: float, lats: ArrayLike, lons: ArrayLike) -> np.ndarray:
+    """
+    Calculate the great circle distances in meters from one point to N points.
+    `lats`/`lons` are array-likes of decimal degrees; returns a float64 array
+    with the same shape.
+    """
+    phi1 = math.radians(lat)
+    phi2 = np.radians(np.asarray(lats, dtype=np.float64))
+    delta_lambda = np.radians(np.asarray(lons, dtype=np.float64)) - math.radians(lon)
+    return _haversine(phi1, math.cos(phi1), phi2, delta_lambda)
+
+def haversine_pairwise(lats1: ArrayLike, lons1: ArrayLike, lats2: ArrayLike, lons2: ArrayLike) -> np.ndarray:
+    """
+    Calculate the N x M matrix of great circle distances in meters between
+    N points (`lats1`/`lons1`) and M points (`lats2`/`lons2`).
+    """
+    phi1 = np.radians(np.asarray(lats1, dtype=np.float64))[:, np.newaxis]
+    lambda1 = np.radians(np.asarray(lons1, dtype=np.float64))[:, np.newaxis]
+    phi2 = np.radians(np.asarray(lats2, dtype=np.float64))[np.newaxis, :]
+    lambda2 = np.radians(np.asarray(lons2, dtype=np.float64))[np.newaxis, :]
+    return _haversine(phi1, np.cos(phi1), phi2, lambda2 - lambda1)
+
+def _haversine(phi1, cos_phi1, phi2, delta_lambda) -> np.ndarray:
+    # Haversine formula, with arcsin instead of atan2 (same result, fewer ufunc calls)
+    a = np.sin((phi2 - phi1) / 2.0)**2 + \
+        cos_phi1 * np.cos(phi2) * np.sin(delta_lambda / 2.0)**2
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+# --- Spatial grid index ---
+# DataObjects are bucketed into fixed-size lat/lon cells (roughly 1.1 km of
+# latitude per cell). The cell of each object is persisted alongside its
+# coordinates so proximity queries only need to look at the cells overlapping
+# the search radius instead of scanning every geolocated object.
+GRID_CELL_DEGREES = 0.01
+GRID_LON_CELLS = int(round(360 / GRID_CELL_DEGREES))
+# Added to grid cells before integer division so they are never negative
+GRID_CELL_OFFSET = GRID_LON_CELLS
+# Map clusters are sized to roughly a quarter of a 256px web map tile
+CLUSTERS_PER_TILE = 4
+# At most this many clusters per viewport, whatever the zoom sent along with it
+MAX_VIEWPORT_CLUSTERS = 4096
+METERS_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_METERS / 180
+
+def grid_cell(lat: float | None, lon: float | None) -> tuple[int | None, int | None]:
+    """
+    Return the (grid_lat, grid_lon) cell containing a point, or (None, None)
+    if the point has no coordinates.
+    """
+    if lat is None or lon is None:
+        return None, None
+    # Normalise longitude to [-180, 180) so the same place always lands in the same cell
+    lon = ((lon + 180.0) % 360.0) - 180.0
+    return math.floor(lat / GRID_CELL_DEGREES), math.floor(lon / GRID_CELL_DEGREES)
+
+def bounding_box(lat: float, lon: float, radius_meters: float) -> tuple[float, float, list[tuple[float, float]]]:
+    """
+    Return the lat/lon box enclosing a circle of `radius_meters` around a point,
+    as (min_lat, max_lat, lon_ranges). `lon_ranges` holds one inclusive
+    (west, east) range, or two when the circle crosses the antimeridian, and
+    spans every longitude when the circle reaches a pole.
+    """
+    delta_lat = radius_meters / METERS_PER_DEGREE_LAT
+    min_lat = max(lat - delta_lat, -90.0)
+    max_lat = min(lat + delta_lat, 90.0)
+
+    # Longitude degrees shrink with latitude, so widen the span using the
+    # latitude closest to a pole within the box.
+    widest_lat = max(abs(min_lat), abs(max_lat))
+    if widest_lat >= 90.0:
+        return min_lat, max_lat, [(-180.0, 180.0)]
+    delta_lon = delta_lat / math.cos(math.radians(widest_lat))
+    if delta_lon >= 180.0:
+        return min_lat, max_lat, [(-180.0, 180.0)]
+
+    lon = ((lon + 180.0) % 360.0) - 180.0
+    west = lon - delta_lon
+    east = lon + delta_lon
+    if west < -180.0:
+        return min_lat, max_lat, [(west + 360.0, 180.0), (-180.0, east)]
+    if east > 180.0:
+        return min_lat, max_lat, [(west, 180.0), (-180.0, east - 360.0)]
+    return min_lat, max_lat, [(west, east)]
+
+def grid_cell_ranges(lat: float, lon: float, radius_meters: float) -> tuple[tuple[int, int], list[tuple[int, int]]]:
+    """
+    Return the cells overlapping a circle of `radius_meters` around a point, as
+    an inclusive grid_lat range and a list of inclusive grid_lon ranges
+    (see bounding_box for the antimeridian and pole handling).
+    """
+    min_lat, max_lat, lon_ranges = bounding_box(lat, lon, radius_meters)
+    last_lon_cell = GRID_LON_CELLS // 2 - 1
+    lat_range = (math.floor(min_lat / GRID_CELL_DEGREES), math.floor(max_lat / GRID_CELL_DEGREES))
+    cell_ranges = [
+        (math.floor(west / GRID_CELL_DEGREES), min(math.floor(east / GRID_CELL_DEGREES), last_lon_cell))
+        for west, east in lon_ranges
+    ]
+    return lat_range, cell_ranges
+
+def cluster_grid_factor(zoom: int) -> int:
+    """
+    Return how many grid cells (per side) make up one map cluster at a given
+    web map zoom level. Never less than 1: at high zoom, clusters are grid cells.
+    """
+    cluster_degrees = 360.0 / (2 ** zoom) / CLUSTERS_PER_TILE
+    return max(1, int(cluster_degrees // GRID_CELL_DEGREES))
+
+def viewport_cluster_grid_factor(zoom: int, viewport: tuple[float, float, float, float]) -> int:
+    """
+    Return cluster_grid_factor(zoom), coarsened if needed so that at most
+    MAX_VIEWPORT_CLUSTERS clusters overlap `viewport` (min_lat, min_lon,
+    max_lat, max_lon; min_lon > max_lon crosses the antimeridian), as when
+    a high zoom comes with a continent-wide viewport.
+    """
+    min_lat, min_lon, max_lat, max_lon = viewport
+    lat_span = max_lat - min_lat
+    lon_span = max_lon - min_lon if min_lon <= max_lon else max_lon - min_lon + 360.0
+    factor = cluster_grid_factor(zoom)
+    while True:
+        cluster_degrees = factor * GRID_CELL_DEGREES
+        # Clusters overlapping the viewport, at most (one more per side of the antimeridian)
+        cluster_count = (math.floor(lat_span / cluster_degrees) + 2) * (math.floor(lon_span / cluster_degrees) + 3)
+        if cluster_count <= MAX_VIEWPORT_CLUSTERS:
+            return factor
+        factor = max(factor + 1, math.ceil(factor * math.sqrt(cluster_count / MAX_VIEWPORT_CLUSTERS)))
+
+# Point pairs compared per vectorized step of group_close_points, which bounds its memory
+GROUPING_CHUNK_PAIRS = 1 << 19
+# Cell pairs with more point pairs than this are compared one at a time, skipping
+# those already connected, instead of all together
+_CROWDED_CELL_PAIRS = 1024
+_CELL_DTYPE = np.dtype([("x", np.int64), ("y", np.int64), ("z", np.int64)])
+
+def group_close_points(lats: ArrayLike, lons: ArrayLike, max_distance_meters: float) -> list[list[int]]:
+    """
+    Group points lying within `max_distance_meters` of each other (single
+    linkage: A-B and B-C close puts A, B and C in the same group).
+    Returns lists of indices into `lats`/`lons`, only for groups of 2+ points,
+    each sorted, ordered by their first index.
+
+    Points are bucketed on a 3D grid over the unit sphere whose cell diagonal
+    is the threshold, so points sharing a cell are connected without computing
+    any distance, and stacked points cost linear time. Points of nearby cells
+    are compared (at most GROUPING_CHUNK_PAIRS pairs at a time, until a close
+    pair connects the two cells) and the connected components of the cells are
+    found with vectorized label propagation.
+    Working in 3D avoids any special case at the antimeridian or the poles.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    point_count = len(lats)
+    if point_count < 2:
+        return []
+
+    # A chord is never longer than the great circle arc, and grows with it:
+    # points within the distance are the points within this chord.
+    chord = 2 * math.sin(min(max_distance_meters / (2 * EARTH_RADIUS_METERS), math.pi / 2))
+    phi = np.radians(lats)
+    lam = np.radians(lons)
+    xyz = np.column_stack((np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)))
+    if chord > 0:
+        cells = np.floor(xyz / (chord / math.sqrt(3))).astype(np.int64)
+    else:
+        # Only identical points are close: one cell per distinct point
+        cells = xyz.view(np.int64)
+
+    axis_values = [np.unique(cells[:, axis]) for axis in range(3)]
+    cell_keys, first_point, cell_of = np.unique(_cell_keys(cells, axis_values), return_index=True, return_inverse=True)
+    cell_of = cell_of.ravel()
+    cell_count = len(cell_keys)
+    sizes = np.bincount(cell_of, minlength=cell_count)
+    starts = np.cumsum(sizes) - sizes
+    sorted_xyz = xyz[np.argsort(cell_of, kind="stable")]
+
+    if chord > 0:
+        first, second = _nearby_cell_pairs(cell_keys, cells[first_point], axis_values, sorted_xyz, starts, chord)
+    else:
+        first = second = np.empty(0, dtype=np.int64)
+    small = sizes[first] * sizes[second] <= _CROWDED_CELL_PAIRS
+    connected = _close_cell_pairs(sorted_xyz, starts, sizes, first[small], second[small], chord)
+    labels = _connected_components(cell_count, first[small][connected], second[small][connected])
+    # Pairs of crowded cells, one at a time, skipped once their cells are connected
+    for a, b in zip(first[~small].tolist(), second[~small].tolist()):
+        root_a, root_b = _root(labels, a), _root(labels, b)
+        if root_a != root_b and _any_close(
+            sorted_xyz[starts[a]:starts[a] + sizes[a]], sorted_xyz[starts[b]:starts[b] + sizes[b]], chord
+        ):
+            labels[max(root_a, root_b)] = min(root_a, root_b)
+    point_labels = _flatten_labels(labels)[cell_of]
+
+    members = np.flatnonzero(np.bincount(point_labels, minlength=cell_count)[point_labels] > 1)
+    if not len(members):
+        return []
+    first_member = np.full(cell_count, point_count)
+    np.minimum.at(first_member, point_labels[members], members)
+    members = members[np.argsort(first_member[point_labels[members]], kind="stable")]
+    boundaries = np.flatnonzero(np.diff(point_labels[members])) + 1
+    return [group.tolist() for group in np.split(members, boundaries)]
+
+def _cell_keys(cells: np.ndarray, axis_values: list[np.ndarray]) -> np.ndarray:
+    # One sortable key per (x, y, z) cell: an int64 packing the cell's rank
+    # among the occupied values of each axis, or a record of the three
+    # coordinates when that would not fit
+    if math.prod(len(values) for values in axis_values) >= 2 ** 63:
+        keys = np.empty(len(cells), dtype=_CELL_DTYPE)
+        keys["x"], keys["y"], keys["z"] = cells.T
+        return keys
+    return _pack_keys([_axis_ranks(values, cells[:, axis]) for axis, values in enumerate(axis_values)], axis_values)
+
+def _axis_ranks(values: np.ndarray, coordinates: np.ndarray) -> np.ndarray:
+    # Rank of each coordinate among the occupied values of its axis, -1 if not occupied
+    ranks = np.minimum(np.searchsorted(values, coordinates), len(values) - 1)
+    ranks[values[ranks] != coordinates] = -1
+    return ranks
+
+def _pack_keys(ranks: list[np.ndarray], axis_values: list[np.ndarray]) -> np.ndarray:
+    # -1 for cells with an unoccupied coordinate: no point lies there
+    keys = np.zeros(len(ranks[0]), dtype=np.int64)
+    for axis_ranks, values in zip(ranks, axis_values):
+        keys = keys * len(values) + axis_ranks
+    keys[np.any(np.column_stack(ranks) < 0, axis=1)] = -1
+    return keys
+
+def _nearby_cell_pairs(cell_keys, cell_coordinates, axis_values, sorted_xyz, starts, chord) -> tuple[np.ndarray, np.ndarray]:
+    # Pairs of distinct cells (each pair once) whose points' bounding boxes are within the chord.
+    # Cells are chord / sqrt(3) wide, so close points are at most 2 cells apart on each axis.
+    packed = cell_keys.dtype == np.int64
+    if packed:
+        shifted_ranks = [
+            {step: _axis_ranks(values, cell_coordinates[:, axis] + step) for step in range(-2, 3)}
+            for axis, values in enumerate(axis_values)
+        ]
+    firsts, seconds = [], []
+    for offset in itertools.product(range(-2, 3), repeat=3):
+        if offset <= (0, 0, 0):
+            continue
+        if packed:
+            neighbours = _pack_keys([shifted_ranks[axis][step] for axis, step in enumerate(offset)], axis_values)
+            # Shifting keeps the order of the keys, so the occupied ones are searched in sorted order (fast)
+            candidates = np.flatnonzero(neighbours >= 0)
+        else:
+            neighbours = _cell_keys(cell_coordinates + np.array(offset), axis_values)
+            candidates = np.arange(len(neighbours))
+        neighbours = neighbours[candidates]
+        index = np.searchsorted(cell_keys, neighbours)
+        found = index < len(cell_keys)
+        found[found] = cell_keys[index[found]] == neighbours[found]
+        firsts.append(candidates[found])
+        seconds.append(index[found])
+    first = np.concatenate(firsts)
+    second = np.concatenate(seconds)
+
+    low = np.minimum.reduceat(sorted_xyz, starts, axis=0)
+    high = np.maximum.reduceat(sorted_xyz, starts, axis=0)
+    gap = np.maximum(0.0, np.maximum(low[first] - high[second], low[second] - high[first]))
+    reachable = np.einsum("ij,ij->i", gap, gap) <= chord * chord
+    return first[reachable], second[reachable]
+
+def _close_cell_pairs(sorted_xyz, starts, sizes, first, second, chord) -> np.ndarray:
+    # Whether each cell pair holds a close pair of points, comparing all their
+    # points in batches of pairs of at most GROUPING_CHUNK_PAIRS point pairs
+    close = np.zeros(len(first), dtype=bool)
+    work = sizes[first] * sizes[second]
+    work_ends = np.cumsum(work)
+    batch_start = 0
+    while batch_start < len(first):
+        done = work_ends[batch_start - 1] if batch_start else 0
+        batch_end = max(int(np.searchsorted(work_ends, done + GROUPING_CHUNK_PAIRS, side="right")), batch_start + 1)
+        batch = np.arange(batch_start, batch_end)
+        pair = np.repeat(batch, work[batch])
+        # Position of each point pair within its cell pair, row-major
+        position = np.arange(len(pair)) - np.repeat(work_ends[batch] - work[batch] - done, work[batch])
+        columns = sizes[second[pair]]
+        difference = sorted_xyz[starts[first[pair]] + position // columns] - sorted_xyz[starts[second[pair]] + position % columns]
+        close[pair[np.einsum("ij,ij->i", difference, difference) <= chord * chord]] = True
+        batch_start = batch_end
+    return close
+
+def _any_close(here: np.ndarray, there: np.ndarray, chord: float) -> bool:
+    rows = max(1, GROUPING_CHUNK_PAIRS // len(there))
+    for start in range(0, len(here), rows):
+        difference = here[start:start + rows, np.newaxis, :] - there[np.newaxis, :, :]
+        if (np.einsum("ijk,ijk->ij", difference, difference) <= chord * chord).any():
+            return True
+    return False
 
-    # Convert decimal degrees to radians
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    delta_phi = math.radians(lat2 - lat1)
-    delta_lambda = math.radians(lon2 - lon1)
+def _connected_components(count: int, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    # Label of each node: the smallest node of its component. Each round hooks
+    # the root of every edge's larger label onto the smaller one, then flattens.
+    labels = np.arange(count)
+    while True:
+        smaller = np.minimum(labels[first], labels[second])
+        hooked = labels.copy()
+        np.minimum.at(hooked, labels[first], smaller)
+        np.minimum.at(hooked, labels[second], smaller)
+        hooked = _flatten_labels(hooked)
+        if np.array_equal(hooked, labels):
+            return labels
+        labels = hooked
 
-    # Haversine formula
-    a = math.sin(delta_phi / 2.0)**2 + \
-        math.cos(phi1) * math.cos(phi2) * \
-        math.sin(delta_lambda / 2.0)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+def _flatten_labels(labels: np.ndarray) -> np.ndarray:
+    # Point every node straight at its root (pointer jumping)
+    while True:
+        jumped = labels[labels]
+        if np.array_equal(jumped, labels):
+            return labels
+        labels = jumped
 
-    distance = R * c  # Output distance in meters
-    return distance
+def _root(labels: np.ndarray, node: int) -> int:
+    while labels[node] != node:
+        node = int(labels[node])
+    return node
@@ -0,0 +1,61 @@
+"""
+Microbenchmark: scalar haversine loop vs. the vectorized NumPy kernels in app.utils.
+
+Run from the backend directory:
+    python -m benchmarks.bench_haversine
+"""
+import math
+import random
+import time
+
+import numpy as np
+
+from app import utils
+
+
+def scalar_haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    # The previous pure-math implementation, kept here as the baseline
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    delta_phi = math.radians(lat2 - lat1)
+    delta_lambda = math.radians(lon2 - lon1)
+    a = math.sin(delta_phi / 2.0)**2 + \
+        math.cos(phi1) * math.cos(phi2) * \
+        math.sin(delta_lambda / 2.0)**2
+    return utils.EARTH_RADIUS_METERS * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def best_of(func, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    rng = random.Random(42)
+    source_lat, source_lon = 46.6, 1.9 # Centre of France
+
+    print(f"{'points':>10} {'scalar loop':>14} {'vectorized':>14} {'speedup':>9}")
+    for n in (10_000, 100_000, 1_000_000):
+        lats = [rng.uniform(41.0, 51.0) for _ in range(n)]
+        lons = [rng.uniform(-5.0, 9.0) for _ in range(n)]
+        lats_array = np.asarray(lats)
+        lons_array = np.asarray(lons)
+
+        scalar = best_of(lambda: [scalar_haversine(source_lat, source_lon, lat, lon) for lat, lon in zip(lats, lons)])
+        vectorized = best_of(lambda: utils.haversine_distances(source_lat, source_lon, lats_array, lons_array))
+        print(f"{n:>10} {scalar * 1000:>11.1f} ms {vectorized * 1000:>11.2f} ms {scalar / vectorized:>8.1f}x")
+
+    # Pairwise mode, e.g. for dedup jobs comparing two batches of reports
+    m = 2_000
+    batch_lats = np.asarray([rng.uniform(41.0, 51.0) for _ in range(m)])
+    batch_lons = np.asarray([rng.uniform(-5.0, 9.0) for _ in range(m)])
+    pairwise = best_of(lambda: utils.haversine_pairwise(batch_lats, batch_lons, batch_lats, batch_lons))
+    print(f"pairwise {m}x{m}: {pairwise * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: FastAPI's default response_model serialization vs. the fast JSON
+paths in app.fast_json, for pages of DataObjects.
+
+Each path is served by an endpoint of a throwaway app returning the same
+preloaded ORM objects, and timed end to end through TestClient (so the
+per-request overhead is included and identical for all paths).
+
+Run from the backend directory:
+    python -m benchmarks.bench_json
+"""
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import fast_json, models, schemas
+
+
+def make_data_objects(n: int, rng: random.Random) -> List[models.DataObject]:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        models.DataObject(
+            id=i,
+            questionnaire_id=rng.randint(1, 20),
+            submitter_name=f"Bénévole {rng.randint(1, 200)}",
+            submission_date=start + timedelta(minutes=i),
+            latitude=rng.uniform(41.0, 51.0),
+            longitude=rng.uniform(-5.0, 9.0),
+            data_values={"Type de déchet": rng.choice(["plastique", "verre", "métal"]), "Quantité (kg)": rng.randint(1, 50)},
+            additional_info=None,
+        )
+        for i in range(1, n + 1)
+    ]
+
+def make_app(objects: List[models.DataObject]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/default", response_model=List[schemas.DataObject])
+    def default_path():
+        return objects
+
+    @app.get("/{mode}")
+    def fast_path(mode: str):
+        fast_json.FAST_JSON = mode
+        return fast_json.list_response(schemas.DataObject, objects)
+
+    return app
+
+def best_of(func, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    rng = random.Random(42)
+    modes = ["default", "pydantic"] + (["orjson"] if fast_json.orjson is not None else [])
+
+    print(f"{'rows':>8}" + "".join(f"{mode:>14}" for mode in modes) + f"{'best speedup':>14}")
+    for n in (100, 1_000, 10_000):
+        client = TestClient(make_app(make_data_objects(n, rng)))
+        bodies = {mode: client.get(f"/{mode}").json() for mode in modes}
+        assert all(body == bodies["default"] for body in bodies.values()), "paths disagree"
+
+        timings = {mode: best_of(lambda: client.get(f"/{mode}")) for mode in modes}
+        best = min(timings[mode] for mode in modes[1:])
+        print(
+            f"{n:>8}"
+            + "".join(f"{timings[mode] * 1000:>11.1f} ms" for mode in modes)
+            + f"{timings['default'] / best:>13.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
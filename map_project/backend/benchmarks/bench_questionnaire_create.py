@@ -0,0 +1,79 @@
+"""
+Benchmark: questionnaire creation latency as a function of the number of
+elements, committing once per element (the previous implementation, kept
+here as the baseline) vs. crud.create_questionnaire (one bulk INSERT for the
+elements, one commit).
+
+Runs against a file-based SQLite database in a temporary directory, so that
+each commit pays for its fsync like in production.
+
+Run from the backend directory:
+    python -m benchmarks.bench_questionnaire_create
+"""
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, schemas
+from app.database import Base
+
+
+def create_questionnaire_per_element(db, questionnaire: schemas.QuestionnaireCreate, owner_id: int) -> models.Questionnaire:
+    # The previous implementation: a commit for the questionnaire, then a commit and a refresh per element
+    db_questionnaire = models.Questionnaire(**questionnaire.model_dump(exclude={"elements"}), owner_id=owner_id)
+    db.add(db_questionnaire)
+    db.commit()
+    for element_data in questionnaire.elements:
+        db_element = models.QuestionElement(**element_data.model_dump(), questionnaire_id=db_questionnaire.id)
+        db.add(db_element)
+        db.commit()
+        db.refresh(db_element)
+    return crud.get_questionnaire(db, db_questionnaire.id, for_response=True)
+
+def make_questionnaire(element_count: int) -> schemas.QuestionnaireCreate:
+    return schemas.QuestionnaireCreate(
+        title="Relevé de campement",
+        elements=[
+            {"label": f"Question {n}", "field_type": "number" if n % 3 == 0 else "text", "options": {"required": n % 2 == 0}}
+            for n in range(element_count)
+        ]
+    )
+
+def median_of(func, repeat: int = 15) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2]
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        paths = {"per element": create_questionnaire_per_element, "single commit": crud.create_questionnaire}
+        print(f"{'elements':>8}" + "".join(f"{name:>16}" for name in paths) + f"{'speedup':>10}")
+        for element_count in (1, 10, 40, 100):
+            questionnaire = make_questionnaire(element_count)
+            timings = {}
+            for name, create in paths.items():
+                def run():
+                    with SessionLocal() as db:
+                        created = create(db, questionnaire, owner_id=1)
+                        assert len(created.elements) == element_count
+                timings[name] = median_of(run)
+            print(
+                f"{element_count:>8}"
+                + "".join(f"{timings[name] * 1000:>13.1f} ms" for name in paths)
+                + f"{timings['per element'] / timings['single commit']:>9.1f}x"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
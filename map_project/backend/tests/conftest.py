@@ -1,6 +1,7 @@
 import pytest
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool # To ensure single connection for in-memory SQLite
 import os
@@ -8,6 +9,7 @@ import os
 # Import base for table creation, and the app an get_db for overriding
 from app.main import app
 from app.database import Base, get_db # The get_db from app.database
+from app import cache, spatial
 
 # --- Test Database Setup ---
 #SQLALCHEMY_DATABASE_URL_TEST = "sqlite:///:memory:" # In-memory SQLite
@@ -23,6 +25,8 @@ engine_test = create_engine(
     # For in-memory only, StaticPool can be useful:
     # poolclass=StaticPool,
 )
+# Exercise the SpatiaLite path when the extension is installed locally
+spatial.load_spatialite_on_connect(engine_test)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine_test)
 
 @pytest.fixture(scope="session", autouse=True)
@@ -32,12 +36,44 @@ def setup_test_db_session_wide():
         os.remove(TEST_DB_FILE)
 
     Base.metadata.create_all(bind=engine_test) # Create tables
+    spatial.setup_spatial_backend(engine_test)
     yield
     # Teardown: Remove test DB file after session, uncomment if needed
     # if SQLALCHEMY_DATABASE_URL_TEST.startswith("sqlite:///") and os.path.exists(TEST_DB_FILE):
     #     os.remove(TEST_DB_FILE)
 
 
+@pytest.fixture(autouse=True)
+def clear_app_caches():
+    # Rolled back test data can reuse ids, so in-process caches must not outlive a test
+    cache.clear_all()
+    yield
+    cache.clear_all()
+
+
+@pytest.fixture
+def count_queries():
+    """
+    Context manager collecting the SQL statements run on the test database,
+    to hold endpoints to a query budget:
+
+        with count_queries() as statements:
+            client.get(...)
+        assert len(statements) <= 3, statements
+    """
+    @contextmanager
+    def _count_queries():
+        statements = []
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine_test, "before_cursor_execute", _record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine_test, "before_cursor_execute", _record)
+    return _count_queries
+
+
 @pytest.fixture(scope="function")
 def db_session_test() -> Session: # Type hint for clarity
     """
@@ -102,5 +102,8 @@ def test_read_users_me_authenticated(client: TestClient):
     data = response.json()
     assert data["name"] == user_data["name"]
     assert data["is_active"] is True
-    assert "questionnaires" in data
-    assert "favorite_data_objects" in data
+    # Slim profile: counts only, no nested questionnaires or favorites
+    assert data["questionnaire_count"] == 0
+    assert data["favorite_count"] == 0
+    assert "questionnaires" not in data
+    assert "favorite_data_objects" not in data
@@ -0,0 +1,26 @@
+from app import cache
+from app.point_index import PointIndex
+
+
+def test_lru_cache_bounded_by_total_weight():
+    lru = cache.LRUCache(10, max_weight=5, weight=len)
+    lru.set(1, [0, 0])
+    lru.set(2, [0, 0])
+    lru.get(1)
+    lru.set(3, [0, 0]) # 6 > 5: evicts the least recently used
+    assert lru.get(2) is None
+    assert lru.get(1) is not None and lru.get(3) is not None
+
+    lru.set(4, [0] * 6) # Larger than the whole budget: not stored, nothing evicted
+    assert lru.get(4) is None
+    assert len(lru) == 2
+
+def test_lru_cache_weight_reread_after_growth():
+    lru = cache.LRUCache(10, max_weight=3, weight=len)
+    first = PointIndex([(1, 45.0, 5.0)])
+    lru.set(1, first)
+    first.add(2, 45.1, 5.0)
+    first.add(3, 45.2, 5.0) # Grown in place, as crud does on creation
+    lru.set(2, PointIndex([(4, 46.0, 6.0)]))
+    assert lru.get(1) is None
+    assert len(lru) == 1
@@ -0,0 +1,126 @@
+import gzip
+import json
+import zlib
+
+import anyio
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.compression import CompressionMiddleware, negotiate_encoding
+
+zstandard = pytest.importorskip("zstandard")
+
+ROWS = [{"id": n, "submitter_name": "Bénévole", "data_values": {"Type de déchet": "plastique"}} for n in range(200)]
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, deflate, br, zstd", "zstd"),
+    ("zstd;q=0.5, gzip", "gzip"),
+    ("zstd;q=0, gzip;q=0.1", "gzip"),
+    ("gzip;q=0", None),
+    ("*", "zstd"),
+    ("*;q=0.2, gzip;q=0", "zstd"),
+    ("ZSTD ; q=1", "zstd"),
+])
+def test_negotiate_encoding(accept_encoding, expected):
+    assert negotiate_encoding(accept_encoding) == expected
+
+def test_negotiate_encoding_without_zstandard():
+    assert negotiate_encoding("zstd, gzip;q=0.5", zstd_available=False) == "gzip"
+    assert negotiate_encoding("zstd", zstd_available=False) is None
+
+
+@pytest.fixture
+def compressed_client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/large")
+    def large():
+        return JSONResponse(ROWS)
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((json.dumps(row).encode() + b"\n" for row in ROWS[:3]), media_type="application/x-ndjson")
+
+    @app.get("/precompressed")
+    def precompressed():
+        return Response(gzip.compress(json.dumps(ROWS).encode()), media_type="application/json", headers={"Content-Encoding": "gzip"})
+
+    return TestClient(app)
+
+def raw_get(client, url, accept_encoding):
+    with client.stream("GET", url, headers={"Accept-Encoding": accept_encoding}) as response:
+        return response, list(response.iter_raw())
+
+def test_small_responses_are_not_compressed(compressed_client):
+    response, chunks = raw_get(compressed_client, "/small", "zstd, gzip")
+    assert "content-encoding" not in response.headers
+    assert json.loads(b"".join(chunks)) == {"ok": True}
+
+@pytest.mark.parametrize("accept_encoding, encoding, decompress", [
+    ("gzip", "gzip", gzip.decompress),
+    ("gzip, zstd", "zstd", lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data)),
+])
+def test_large_responses_are_compressed(compressed_client, accept_encoding, encoding, decompress):
+    response, chunks = raw_get(compressed_client, "/large", accept_encoding)
+    body = b"".join(chunks)
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["content-length"] == str(len(body))
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert json.loads(decompress(body)) == ROWS
+    assert len(body) * 10 < len(json.dumps(ROWS)) # Repeated keys compress well
+
+def test_streamed_chunks_decode_as_they_arrive():
+    # Drive the middleware directly to see each body message (TestClient buffers them)
+    async def streaming_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/x-ndjson")]})
+        for row in ROWS[:3]:
+            await send({"type": "http.response.body", "body": json.dumps(row).encode() + b"\n", "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    messages = []
+    async def send(message):
+        messages.append(message)
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", b"gzip")]}
+    anyio.run(CompressionMiddleware(streaming_app, minimum_size=500), scope, receive, send)
+
+    start, *bodies = messages
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    assert [body["more_body"] for body in bodies] == [True, True, True, False]
+    decompressor = zlib.decompressobj(31)
+    # Each chunk is flushed: every row is readable as soon as its chunk arrives
+    for row, body in zip(ROWS[:3], bodies):
+        assert json.loads(decompressor.decompress(body["body"])) == row
+    decompressor.decompress(bodies[-1]["body"])
+    assert decompressor.eof
+
+def test_existing_content_encoding_is_left_alone(compressed_client):
+    response, chunks = raw_get(compressed_client, "/precompressed", "zstd")
+    assert response.headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(b"".join(chunks))) == ROWS
+
+def test_export_is_streamed_compressed(client: TestClient):
+    client.post("/users/", json={"name": "compression_user", "password": "pw"})
+    token = client.post("/auth/token", data={"username": "compression_user", "password": "pw"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = client.post("/questionnaires/", headers=headers, json={"title": "Compression"}).json()["id"]
+    for n in range(20):
+        client.post(f"/questionnaires/{q_id}/submit", json={"data_values": {"n": n}})
+
+    response = client.get("/data/export", headers={**headers, "Accept-Encoding": "zstd"})
+    assert response.headers["content-encoding"] == "zstd"
+    assert len(response.text.splitlines()) == 20 # Decoded by the client
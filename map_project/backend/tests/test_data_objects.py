@@ -2,8 +2,9 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session # For type hinting if used directly
 from datetime import datetime, timedelta
+import json
 
-from app import schemas
+from app import cache, crud, models, schemas
 
 # Helper function (could be shared)
 def get_auth_token_for_data_tests(client: TestClient, username: str, password: str = "pw") -> str:
@@ -63,6 +64,172 @@ def test_list_data_objects_by_owner(client: TestClient):
     assert response_q2_by_u1.json() == []
 
 
+def test_list_data_objects_cursor_pagination(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_cursor_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Cursor_Q")
+    do_ids = [submit_data_for_data_tests(client, q_id, {"field1": n}) for n in range(5)]
+
+    # Walk the list two at a time by following X-Next-Cursor until it is absent
+    walked, pages, cursor = [], 0, None
+    while True:
+        url = "/data/?limit=2" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        walked += [item["id"] for item in response.json()]
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert walked == do_ids
+    assert pages == 3
+
+    # Keyset pages are not shifted by rows added in front of the cursor
+    first_page = client.get("/data/?limit=2", headers=headers)
+    submit_data_for_data_tests(client, q_id, {"field1": "late"})
+    second_page = client.get(f"/data/?limit=2&cursor={first_page.headers['X-Next-Cursor']}", headers=headers)
+    assert [item["id"] for item in second_page.json()] == do_ids[2:4]
+
+    assert client.get("/data/?cursor=not-a-cursor", headers=headers).status_code == 400
+
+
+def test_list_data_objects_viewport(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_viewport_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Viewport_Q")
+    paris_id = submit_data_for_data_tests(client, q_id, {}, lat=48.85, lon=2.35)
+    lyon_id = submit_data_for_data_tests(client, q_id, {}, lat=45.76, lon=4.83)
+    submit_data_for_data_tests(client, q_id, {}, lat=-33.9, lon=151.2) # Sydney
+    submit_data_for_data_tests(client, q_id, {}) # No coordinates
+
+    response = client.get("/data/?min_lat=41&min_lon=-5&max_lat=51&max_lon=9", headers=headers)
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [paris_id, lyon_id]
+
+    response_limited = client.get("/data/?min_lat=41&min_lon=-5&max_lat=51&max_lon=9&limit=1", headers=headers)
+    assert [item["id"] for item in response_limited.json()] == [paris_id]
+
+def test_list_data_objects_viewport_across_antimeridian(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_viewport_antimeridian_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Viewport_Antimeridian_Q")
+    fiji_id = submit_data_for_data_tests(client, q_id, {}, lat=-17.0, lon=179.5)
+    samoa_id = submit_data_for_data_tests(client, q_id, {}, lat=-13.8, lon=-172.0)
+    submit_data_for_data_tests(client, q_id, {}, lat=-17.0, lon=0.0)
+
+    response = client.get("/data/?min_lat=-20&min_lon=170&max_lat=-10&max_lon=-170", headers=headers)
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [fiji_id, samoa_id]
+
+def test_list_data_objects_viewport_requires_all_bounds(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_viewport_partial_user")
+    response = client.get("/data/?min_lat=41&min_lon=-5", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 400
+
+
+# --- Tests for POST /data/within/ ---
+def test_list_data_objects_within_area(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_within_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Within_Q")
+    inside_ids = [
+        submit_data_for_data_tests(client, q_id, {}, lat=48.85, lon=2.35),
+        submit_data_for_data_tests(client, q_id, {}, lat=48.86, lon=2.30),
+    ]
+    submit_data_for_data_tests(client, q_id, {}, lat=48.95, lon=2.45) # In the bounding box, outside the triangle
+    submit_data_for_data_tests(client, q_id, {}, lat=45.76, lon=4.83)
+    submit_data_for_data_tests(client, q_id, {})
+
+    triangle = {"type": "Polygon", "coordinates": [[[2.2, 48.8], [2.5, 48.8], [2.2, 49.0], [2.2, 48.8]]]}
+    response = client.post("/data/within/", headers=headers, json={"geometry": triangle})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == inside_ids
+
+    response_page = client.post("/data/within/?skip=1&limit=1", headers=headers, json={"geometry": triangle})
+    assert [item["id"] for item in response_page.json()] == inside_ids[1:]
+
+    response_other_q = client.post("/data/within/", headers=headers, json={"geometry": triangle, "questionnaire_id": q_id + 1000})
+    assert response_other_q.json() == []
+
+def test_list_data_objects_within_invalid_area(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_within_invalid_user")
+    response = client.post("/data/within/", headers={"Authorization": f"Bearer {token}"}, json={"geometry": {"type": "Point", "coordinates": [2.3, 48.8]}})
+    assert response.status_code == 400
+
+
+# --- Tests for GET /data/clusters/ ---
+def test_list_data_object_clusters(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_clusters_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Clusters_Q")
+    paris_ids = [
+        submit_data_for_data_tests(client, q_id, {}, lat=48.85, lon=2.35),
+        submit_data_for_data_tests(client, q_id, {}, lat=48.86, lon=2.34),
+        submit_data_for_data_tests(client, q_id, {}, lat=48.84, lon=2.36),
+    ]
+    marseille_id = submit_data_for_data_tests(client, q_id, {}, lat=43.30, lon=5.37)
+    submit_data_for_data_tests(client, q_id, {}, lat=-33.9, lon=151.2) # Outside the viewport
+
+    france = "min_lat=41&min_lon=-5&max_lat=51&max_lon=9"
+    response = client.get(f"/data/clusters/?{france}&zoom=5&sample_size=2", headers=headers)
+    assert response.status_code == 200
+    clusters = response.json()
+    assert len(clusters) == 2
+    paris, marseille = clusters # Largest cluster first
+    assert paris["count"] == 3
+    assert paris["sample_ids"] == paris_ids[:2]
+    assert paris["latitude"] == pytest.approx(48.85)
+    assert paris["longitude"] == pytest.approx(2.35)
+    assert marseille == {"latitude": 43.30, "longitude": 5.37, "count": 1, "sample_ids": [marseille_id]}
+
+    # Zoomed in, the Paris points fall into separate grid cells
+    paris_viewport = "min_lat=48.8&min_lon=2.3&max_lat=48.9&max_lon=2.4"
+    response_zoomed = client.get(f"/data/clusters/?{paris_viewport}&zoom=18", headers=headers)
+    assert len(response_zoomed.json()) == 3
+
+    # A zoom far too high for the viewport does not split it into millions of cells
+    response_world = client.get("/data/clusters/?min_lat=-90&min_lon=-180&max_lat=90&max_lon=180&zoom=22", headers=headers)
+    assert sum(cluster["count"] for cluster in response_world.json()) == 5
+    assert len(response_world.json()) == 3 # Paris, Marseille, Sydney
+
+def test_rows_without_grid_cells_are_not_dropped(client: TestClient, db_session_test: Session, monkeypatch):
+    # Rows written before the grid existed, and not backfilled yet (see app/migrations.py)
+    token = get_auth_token_for_data_tests(client, "do_no_grid_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_No_Grid_Q")
+    source_id = submit_data_for_data_tests(client, q_id, {}, lat=48.85, lon=2.35)
+    near_id = submit_data_for_data_tests(client, q_id, {}, lat=48.851, lon=2.35)
+    submit_data_for_data_tests(client, q_id, {}, lat=-33.9, lon=-151.2)
+    france = "min_lat=41&min_lon=-5&max_lat=51&max_lon=9"
+
+    def snapshot():
+        return (
+            client.get(f"/data/clusters/?{france}&zoom=18", headers=headers).json(),
+            client.get("/data/heatmap/?cell_size_deg=0.5", headers=headers).json(),
+            client.get(f"/data/nearby_suggestions/?source_data_object_id={source_id}&distance_m=500", headers=headers).json(),
+        )
+
+    monkeypatch.setattr(cache, "POINT_INDEX_CACHE_SIZE", 0) # Grid path of the radius query
+    expected = snapshot()
+    assert [item["id"] for item in expected[2]] == [near_id]
+    assert sum(cell["count"] for cell in expected[1]["cells"]) == 3
+
+    db_session_test.execute(
+        # Keeping updated_at as is, since the onupdate default would change it
+        models.DataObject.__table__.update().values(
+            grid_lat=None, grid_lon=None, updated_at=models.DataObject.updated_at
+        )
+    )
+    cache.clear_all()
+    assert snapshot() == expected
+
+def test_list_data_object_clusters_requires_viewport_and_zoom(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_clusters_invalid_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/data/clusters/?zoom=5", headers=headers).status_code == 422
+    assert client.get("/data/clusters/?min_lat=41&min_lon=-5&max_lat=51&max_lon=9", headers=headers).status_code == 422
+
+
 # --- Tests for GET /data/{id} ---
 def test_read_data_object_owner(client: TestClient):
     token = get_auth_token_for_data_tests(client, "do_reader_owner")
@@ -127,6 +294,59 @@ def test_merge_data_objects_success(client: TestClient):
     assert data["latitude"] == 11.0
     assert data["submitter_name"] == f"Merged by do_merger"
 
+def test_merge_data_objects_values_in_one_pass(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_merger_values")
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Merge_Values_Q")
+
+    do1_id = submit_data_for_data_tests(client, q_id, {"num": 1, "tags": ["a"], "note": None}, lat=10.0)
+    do2_id = submit_data_for_data_tests(client, q_id, {"num": "n/a", "note": "second", "tags": ["b"]})
+    do3_id = submit_data_for_data_tests(client, q_id, {"num": 5, "note": 3})
+
+    merge_payload = {"data_object_ids": [do1_id, do2_id, do3_id], "target_questionnaire_id": q_id, "new_additional_info": "Merged %IDS%"}
+    data = client.post("/data/merge/", headers={"Authorization": f"Bearer {token}"}, json=merge_payload).json()
+    assert data["data_values"] == {
+        "num": 3.0, # Average of the numeric values, the first non-null one being numeric
+        "tags": ["a"], # Other types: first non-null value
+        "note": "second | 3", # Strings: all non-null values joined
+    }
+    assert (data["latitude"], data["longitude"]) == (10.0, None)
+    assert data["additional_info"] == f"Merged {do1_id}, {do2_id}, {do3_id}"
+
+def test_merge_data_object_groups_batch(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_batch_merger")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Batch_Merge_Q")
+    ids = [submit_data_for_data_tests(client, q_id, {"num": n}, lat=45.0 + n, lon=5.0) for n in range(6)]
+
+    groups = [
+        {"data_object_ids": ids[0:2], "target_questionnaire_id": q_id},
+        {"data_object_ids": ids[2:5], "target_questionnaire_id": q_id, "new_submitter_name": "Tri"},
+    ]
+    response = client.post("/data/merge/batch", headers=headers, json=groups)
+    assert response.status_code == 201
+    merged = response.json()
+    assert [obj["data_values"]["num"] for obj in merged] == [0.5, 3.0]
+    assert [obj["latitude"] for obj in merged] == [45.5, 48.0]
+    assert [obj["submitter_name"] for obj in merged] == ["Merged by do_batch_merger", "Tri"]
+    assert len(client.get("/data/", params={"questionnaire_id": q_id}, headers=headers).json()) == 8 # Sources are kept
+
+    # One invalid group fails the whole batch, naming the group
+    other_token = get_auth_token_for_data_tests(client, "do_batch_merger_other")
+    other_q_id = create_questionnaire_for_data_tests(client, other_token, "DO_Batch_Merge_Other_Q")
+    foreign_id = submit_data_for_data_tests(client, other_q_id, {"num": 9})
+    response = client.post("/data/merge/batch", headers=headers, json=[
+        {"data_object_ids": [ids[4], ids[5]], "target_questionnaire_id": q_id},
+        {"data_object_ids": [ids[5], foreign_id], "target_questionnaire_id": q_id},
+    ])
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Group 1")
+    response = client.post("/data/merge/batch", headers=headers, json=[{"data_object_ids": ids[0:2], "target_questionnaire_id": other_q_id}])
+    assert response.status_code == 400
+    response = client.post("/data/merge/batch", headers=headers, json=[{"data_object_ids": ids[0:1], "target_questionnaire_id": q_id}])
+    assert response.status_code == 400
+    assert len(client.get("/data/", params={"questionnaire_id": q_id}, headers=headers).json()) == 8
+
+
 # --- Tests for GET /data/nearby_suggestions/ ---
 def test_get_nearby_suggestions(client: TestClient):
     token = get_auth_token_for_data_tests(client, "do_nearby_user")
@@ -142,6 +362,193 @@ def test_get_nearby_suggestions(client: TestClient):
     assert len(data) == 1
     assert data[0]["id"] == near1_id
 
+def test_get_nearby_suggestions_sorted_by_distance(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_nearby_sorted_user")
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Nearby_Sorted_Q")
+
+    source_id = submit_data_for_data_tests(client, q_id, {}, lat=45.0, lon=5.0)
+    farther_id = submit_data_for_data_tests(client, q_id, {}, lat=45.003, lon=5.0) # ~330m
+    closer_id = submit_data_for_data_tests(client, q_id, {}, lat=45.001, lon=5.0) # ~110m
+
+    response = client.get(f"/data/nearby_suggestions/?source_data_object_id={source_id}&distance_m=500", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [closer_id, farther_id]
+
+    response_page2 = client.get(f"/data/nearby_suggestions/?source_data_object_id={source_id}&distance_m=500&skip=1&limit=1", headers={"Authorization": f"Bearer {token}"})
+    assert [item["id"] for item in response_page2.json()] == [farther_id]
+
+def test_get_nearby_suggestions_across_antimeridian(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_nearby_antimeridian_user")
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Nearby_Antimeridian_Q")
+
+    source_id = submit_data_for_data_tests(client, q_id, {}, lat=-17.0, lon=179.999)
+    across_id = submit_data_for_data_tests(client, q_id, {}, lat=-17.0, lon=-179.999) # ~210m across the antimeridian
+
+    response = client.get(f"/data/nearby_suggestions/?source_data_object_id={source_id}&distance_m=500", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [across_id]
+
+# --- Tests for GET /data/nearest/ ---
+def test_get_nearest_data_objects(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_nearest_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Nearest_Q")
+    source_id = submit_data_for_data_tests(client, q_id, {}, lat=45.0, lon=5.0)
+    far_id = submit_data_for_data_tests(client, q_id, {}, lat=48.85, lon=2.35) # ~470km
+    near_id = submit_data_for_data_tests(client, q_id, {}, lat=45.001, lon=5.0) # ~110m
+    mid_id = submit_data_for_data_tests(client, q_id, {}, lat=45.1, lon=5.0) # ~11km
+    submit_data_for_data_tests(client, q_id, {}) # No coordinates
+
+    response = client.get(f"/data/nearest/?source_data_object_id={source_id}&k=2", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["id"] for item in data] == [near_id, mid_id]
+    assert data[0]["distance_m"] == pytest.approx(111.2, abs=0.5)
+
+    # Fewer objects than k: everything else is returned, sorted
+    response_all = client.get(f"/data/nearest/?source_data_object_id={source_id}&k=10", headers=headers)
+    assert [item["id"] for item in response_all.json()] == [near_id, mid_id, far_id]
+
+    response_point = client.get("/data/nearest/?latitude=48.8&longitude=2.3&k=1", headers=headers)
+    assert [item["id"] for item in response_point.json()] == [far_id]
+
+def test_get_nearest_data_objects_requires_a_source(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_nearest_no_source_user")
+    response = client.get("/data/nearest/?latitude=48.8", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 400
+
+# --- Tests for GET /data/heatmap/ ---
+def test_get_data_object_heatmap(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_heatmap_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Heatmap_Q")
+    other_q_id = create_questionnaire_for_data_tests(client, token, "DO_Heatmap_Other_Q")
+    submit_data_for_data_tests(client, q_id, {}, lat=48.85, lon=2.35)
+    submit_data_for_data_tests(client, q_id, {}, lat=48.86, lon=2.34)
+    submit_data_for_data_tests(client, q_id, {}, lat=-0.05, lon=-0.05)
+    submit_data_for_data_tests(client, other_q_id, {}, lat=48.87, lon=2.33)
+    submit_data_for_data_tests(client, q_id, {})
+
+    response = client.get(f"/data/heatmap/?cell_size_deg=1&questionnaire_id={q_id}", headers=headers)
+    assert response.status_code == 200
+    heatmap = response.json()
+    assert heatmap["cell_size_deg"] == pytest.approx(1.0)
+    assert heatmap["cells"] == [
+        {"latitude": -0.5, "longitude": -0.5, "count": 1},
+        {"latitude": 48.5, "longitude": 2.5, "count": 2},
+    ]
+
+    response_all = client.get("/data/heatmap/?cell_size_deg=1&min_lat=40&min_lon=0&max_lat=50&max_lon=5", headers=headers)
+    assert response_all.json()["cells"] == [{"latitude": 48.5, "longitude": 2.5, "count": 3}]
+
+# --- Tests for GET /data/duplicates/ ---
+def test_list_duplicate_candidates(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_duplicates_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Duplicates_Q")
+    camp_a = [
+        submit_data_for_data_tests(client, q_id, {}, lat=45.0, lon=5.0),
+        submit_data_for_data_tests(client, q_id, {}, lat=45.0002, lon=5.0), # ~22m
+    ]
+    submit_data_for_data_tests(client, q_id, {}, lat=45.01, lon=5.0) # ~1.1km, alone
+    camp_b = [
+        submit_data_for_data_tests(client, q_id, {}, lat=-17.0, lon=179.99999),
+        submit_data_for_data_tests(client, q_id, {}, lat=-17.0, lon=-179.99999), # across the antimeridian
+    ]
+    camp_a.append(submit_data_for_data_tests(client, q_id, {}, lat=45.0003, lon=5.0001)) # late duplicate
+    submit_data_for_data_tests(client, q_id, {}) # No coordinates
+
+    response = client.get("/data/duplicates/?distance_m=50", headers=headers)
+    assert response.status_code == 200
+    groups = response.json()
+    assert [group["data_object_ids"] for group in groups] == [camp_a, camp_b]
+    assert all(group["target_questionnaire_id"] == q_id for group in groups)
+
+    # Groups can be merged directly
+    merge_response = client.post("/data/merge/", headers=headers, json=groups[0])
+    assert merge_response.status_code == 201
+
+def test_get_nearby_suggestions_index_cache(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_nearby_cache_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Nearby_Cache_Q")
+    source_id = submit_data_for_data_tests(client, q_id, {}, lat=45.0, lon=5.0)
+    near1_id = submit_data_for_data_tests(client, q_id, {}, lat=45.001, lon=5.0)
+
+    url = f"/data/nearby_suggestions/?source_data_object_id={source_id}&distance_m=500"
+    assert [item["id"] for item in client.get(url, headers=headers).json()] == [near1_id]
+    assert len(cache.point_index_cache) == 1 # Built by the first query
+
+    # New submissions and merges are added to the cached index
+    near2_id = submit_data_for_data_tests(client, q_id, {}, lat=45.0005, lon=5.0)
+    merged = client.post("/data/merge/", headers=headers, json={"data_object_ids": [near1_id, near2_id], "target_questionnaire_id": q_id})
+    assert [item["id"] for item in client.get(url, headers=headers).json()] == [near2_id, merged.json()["id"], near1_id]
+
+    # Deleting a questionnaire drops the owner's index
+    assert client.delete(f"/questionnaires/{q_id}", headers=headers).status_code == 204
+    assert len(cache.point_index_cache) == 0
+
+def test_point_index_not_cached_when_data_changes_during_build(client: TestClient, monkeypatch):
+    token = get_auth_token_for_data_tests(client, "do_nearby_race_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Nearby_Race_Q")
+    source_id = submit_data_for_data_tests(client, q_id, {}, lat=45.0, lon=5.0)
+    near_id = submit_data_for_data_tests(client, q_id, {}, lat=45.001, lon=5.0)
+
+    owner_id = client.get("/users/me", headers=headers).json()["id"]
+
+    # Another worker thread commits a DataObject while the index is being built
+    build_index = crud.PointIndex
+    def build_index_during_write(points):
+        point_index = build_index(points)
+        cache.invalidate_owner(owner_id)
+        return point_index
+    monkeypatch.setattr(crud, "PointIndex", build_index_during_write)
+
+    url = f"/data/nearby_suggestions/?source_data_object_id={source_id}&distance_m=500"
+    assert [item["id"] for item in client.get(url, headers=headers).json()] == [near_id]
+    assert len(cache.point_index_cache) == 0 # Possibly missing the new object: not kept
+
+    monkeypatch.setattr(crud, "PointIndex", build_index)
+    client.get(url, headers=headers)
+    assert len(cache.point_index_cache) == 1
+
+def test_point_index_built_between_commit_and_cache_update(client: TestClient, monkeypatch):
+    token = get_auth_token_for_data_tests(client, "do_nearby_late_add_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Nearby_Late_Add_Q")
+    source_id = submit_data_for_data_tests(client, q_id, {}, lat=45.0, lon=5.0)
+
+    # A request commits a DataObject but has not updated the caches yet...
+    pending = []
+    update_caches = crud._owner_data_objects_created
+    monkeypatch.setattr(crud, "_owner_data_objects_created", lambda *args: pending.append(args))
+    near_id = submit_data_for_data_tests(client, q_id, {}, lat=45.0001, lon=5.0)
+    monkeypatch.setattr(crud, "_owner_data_objects_created", update_caches)
+
+    # ...when another one builds and caches the index, which already holds it
+    nearby_url = f"/data/nearby_suggestions/?source_data_object_id={source_id}&distance_m=500"
+    assert [item["id"] for item in client.get(nearby_url, headers=headers).json()] == [near_id]
+    assert len(cache.point_index_cache) == 1
+    for args in pending:
+        update_caches(*args)
+
+    assert [item["id"] for item in client.get(nearby_url, headers=headers).json()] == [near_id]
+    nearest = client.get(f"/data/nearest/?source_data_object_id={source_id}&k=5", headers=headers).json()
+    assert [item["id"] for item in nearest] == [near_id]
+
+def test_get_nearby_suggestions_without_index_cache(client: TestClient, monkeypatch):
+    monkeypatch.setattr(cache, "POINT_INDEX_CACHE_SIZE", 0)
+    token = get_auth_token_for_data_tests(client, "do_nearby_no_cache_user")
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Nearby_No_Cache_Q")
+    source_id = submit_data_for_data_tests(client, q_id, {}, lat=45.0, lon=5.0)
+    near_id = submit_data_for_data_tests(client, q_id, {}, lat=45.001, lon=5.0)
+    submit_data_for_data_tests(client, q_id, {}, lat=46.0, lon=6.0)
+
+    response = client.get(f"/data/nearby_suggestions/?source_data_object_id={source_id}&distance_m=200", headers={"Authorization": f"Bearer {token}"})
+    assert [item["id"] for item in response.json()] == [near_id]
+    assert len(cache.point_index_cache) == 0
+
 def test_get_nearby_suggestions_source_no_coords(client: TestClient):
     token = get_auth_token_for_data_tests(client, "do_nearby_no_coords_user")
     q_id = create_questionnaire_for_data_tests(client, token, "DO_Nearby_No_Coords_Q")
@@ -153,3 +560,135 @@ def test_get_nearby_suggestions_source_no_coords(client: TestClient):
 
 # Note: Date filtering tests for /data/ would require more complex setup to control submission_date
 # or mocking current time, so they are omitted for now but would be good additions.
+
+
+# --- Tests for GET /data/export ---
+def test_export_data_objects_ndjson(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_export_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Export_Q")
+    other_q_id = create_questionnaire_for_data_tests(client, token, "DO_Export_Other_Q")
+    paris_id = submit_data_for_data_tests(client, q_id, {"field1": "é"}, lat=48.85, lon=2.35)
+    no_point_id = submit_data_for_data_tests(client, q_id, {"field1": "b"})
+    other_id = submit_data_for_data_tests(client, other_q_id, {"field1": "c"}, lat=45.76, lon=4.83)
+    other_token = get_auth_token_for_data_tests(client, "do_export_other_user")
+    submit_data_for_data_tests(client, create_questionnaire_for_data_tests(client, other_token, "DO_Export_Not_Mine"), {})
+
+    response = client.get("/data/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["id"] for line in lines] == [paris_id, no_point_id, other_id]
+    # Same fields as the JSON API
+    assert lines == client.get("/data/", headers=headers).json()
+
+    # Same filters as GET /data/
+    filtered = client.get(f"/data/export?questionnaire_id={q_id}", headers=headers)
+    assert [json.loads(line)["id"] for line in filtered.text.splitlines()] == [paris_id, no_point_id]
+    in_viewport = client.get("/data/export?min_lat=48&min_lon=2&max_lat=49&max_lon=3", headers=headers)
+    assert [json.loads(line)["id"] for line in in_viewport.text.splitlines()] == [paris_id]
+    assert client.get("/data/export?min_lat=48", headers=headers).status_code == 400
+    assert client.get("/data/export?format=xml", headers=headers).status_code == 422
+
+def test_export_data_objects_geojson(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_export_geojson_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Export_GeoJSON_Q")
+    paris_id = submit_data_for_data_tests(client, q_id, {"field1": "a"}, lat=48.85, lon=2.35)
+    no_point_id = submit_data_for_data_tests(client, q_id, {"field1": "b"})
+
+    response = client.get("/data/export?format=geojson", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/geo+json")
+    collection = response.json()
+    assert collection["type"] == "FeatureCollection"
+    assert [feature["id"] for feature in collection["features"]] == [paris_id, no_point_id]
+    assert collection["features"][0]["geometry"] == {"type": "Point", "coordinates": [2.35, 48.85]}
+    assert collection["features"][0]["properties"]["data_values"] == {"field1": "a"}
+    assert collection["features"][1]["geometry"] is None
+
+    empty = client.get("/data/export?format=geojson&questionnaire_id=999999", headers=headers)
+    assert empty.json() == {"type": "FeatureCollection", "features": []}
+
+
+# --- Tests for GET /data/changes ---
+def get_changes(client: TestClient, headers: dict, since: str = None, limit: int = None) -> dict:
+    params = {key: value for key, value in (("since", since), ("limit", limit)) if value is not None}
+    response = client.get("/data/changes", headers=headers, params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_data_object_changes_since_token(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_changes_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Changes_Q")
+    kept_id = submit_data_for_data_tests(client, q_id, {"field1": "a"})
+    edited_id = submit_data_for_data_tests(client, q_id, {"field1": "b"})
+    other_token = get_auth_token_for_data_tests(client, "do_changes_other_user")
+    submit_data_for_data_tests(client, create_questionnaire_for_data_tests(client, other_token, "DO_Changes_Not_Mine"), {})
+
+    # Initial sync: everything the user owns
+    initial = get_changes(client, headers)
+    assert [obj["id"] for obj in initial["upserted"]] == [kept_id, edited_id]
+    assert initial["deleted"] == []
+    assert initial["has_more"] is False
+    assert get_changes(client, headers, since=initial["next_since"])["upserted"] == []
+
+    # Only what changed since then: an update, a new submission and a merge
+    client.put(f"/data/{edited_id}", headers=headers, json={"additional_info": "checked"})
+    new_id = submit_data_for_data_tests(client, q_id, {"field1": "c"})
+    merged_id = client.post(
+        "/data/merge/", headers=headers, json={"data_object_ids": [kept_id, new_id], "target_questionnaire_id": q_id}
+    ).json()["id"]
+    changes = get_changes(client, headers, since=initial["next_since"])
+    assert [obj["id"] for obj in changes["upserted"]] == [edited_id, new_id, merged_id]
+    assert changes["upserted"][0]["additional_info"] == "checked"
+    assert changes["upserted"][0]["updated_at"] is not None
+
+    # Objects deleted with their questionnaire come back as tombstones
+    client.delete(f"/questionnaires/{q_id}", headers=headers)
+    deletions = get_changes(client, headers, since=changes["next_since"])
+    assert deletions["upserted"] == []
+    assert sorted(deletions["deleted"]) == sorted([kept_id, edited_id, new_id, merged_id])
+
+    assert client.get("/data/changes?since=not-a-token", headers=headers).status_code == 400
+
+def test_data_object_changes_include_rows_without_sequence(client: TestClient, db_session_test: Session):
+    token = get_auth_token_for_data_tests(client, "do_changes_legacy_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Changes_Legacy_Q")
+    legacy_id = submit_data_for_data_tests(client, q_id, {"field1": "before sync existed"})
+    recent_id = submit_data_for_data_tests(client, q_id, {"field1": "recent"})
+    # As created before change tracking, and not backfilled yet
+    db_session_test.execute(
+        models.DataObject.__table__.update().where(models.DataObject.id == legacy_id).values(change_seq=None)
+    )
+
+    initial = get_changes(client, headers)
+    assert [obj["id"] for obj in initial["upserted"]] == [legacy_id, recent_id]
+
+    # Paging through them neither skips nor repeats the unsequenced row
+    first_page = get_changes(client, headers, limit=1)
+    assert [obj["id"] for obj in first_page["upserted"]] == [legacy_id]
+    second_page = get_changes(client, headers, since=first_page["next_since"], limit=1)
+    assert [obj["id"] for obj in second_page["upserted"]] == [recent_id]
+    assert get_changes(client, headers, since=second_page["next_since"])["upserted"] == []
+
+def test_data_object_changes_paged(client: TestClient):
+    token = get_auth_token_for_data_tests(client, "do_changes_paged_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_data_tests(client, token, "DO_Changes_Paged_Q")
+    do_ids = [submit_data_for_data_tests(client, q_id, {"field1": n}) for n in range(3)]
+    client.delete(f"/questionnaires/{q_id}", headers=headers) # Three tombstones sharing one change_seq
+
+    seen, since, calls = [], None, 0
+    while True:
+        page = get_changes(client, headers, since=since, limit=2)
+        seen += [("upsert", obj["id"]) for obj in page["upserted"]] + [("delete", obj_id) for obj_id in page["deleted"]]
+        since, calls = page["next_since"], calls + 1
+        if not page["has_more"]:
+            break
+    # The deleted objects' inserts are gone; a page may split the group of
+    # tombstones sharing a sequence value without losing any
+    assert seen == [("delete", obj_id) for obj_id in do_ids]
+    assert calls == 2
@@ -86,3 +86,57 @@ def test_submit_data_to_non_existent_questionnaire(client: TestClient):
     response = client.post("/questionnaires/99999/submit", json=submission_payload)
     assert response.status_code == 404
     assert response.json()["detail"] == "Questionnaire not found"
+
+def test_submit_batch_creates_all_items_in_order(client: TestClient):
+    owner_token = get_auth_token_for_submission(client, "submit_owner_batch", "pw")
+    q_id = create_questionnaire_for_submission(client, owner_token, "Batch Submit Q", password="pw")["id"]
+    items = [
+        {"data_values": {"Color": "Red"}, "latitude": 48.85, "longitude": 2.35, "idempotency_key": "a"},
+        {"data_values": {"Color": "Blue"}, "latitude": 45.76, "longitude": 4.83},
+        {"data_values": {"Color": "Green"}, "latitude": 100.0, "longitude": 2.35, "idempotency_key": "b"},
+    ]
+
+    response = client.post(f"/questionnaires/{q_id}/submit/batch", json=items, headers={"X-Questionnaire-Password": "pw"})
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert [r["status"] for r in results] == ["created", "created", "invalid"]
+    assert [r["data_object"]["data_values"]["Color"] for r in results[:2]] == ["Red", "Blue"]
+    assert all(r["data_object"]["questionnaire_id"] == q_id for r in results[:2])
+    assert results[2]["data_object"] is None and results[2]["error"]
+
+    # The created objects are visible to the owner
+    listing = client.get("/data/", params={"questionnaire_id": q_id}, headers={"Authorization": f"Bearer {owner_token}"})
+    assert sorted(obj["id"] for obj in listing.json()) == sorted(r["data_object"]["id"] for r in results[:2])
+
+def test_submit_batch_idempotency_keys(client: TestClient):
+    owner_token = get_auth_token_for_submission(client, "submit_owner_batch_retry", "pw")
+    q_id = create_questionnaire_for_submission(client, owner_token, "Batch Retry Q")["id"]
+    items = [
+        {"data_values": {"Color": "Red"}, "idempotency_key": "k1"},
+        {"data_values": {"Color": "Red again"}, "idempotency_key": "k1"},
+    ]
+    first = client.post(f"/questionnaires/{q_id}/submit/batch", json=items).json()
+    assert [r["status"] for r in first] == ["created", "duplicate"]
+    assert first[1]["id"] == first[0]["id"] == first[0]["data_object"]["id"]
+    # A duplicate only gives the id: the key may have been used by another submitter
+    assert first[1]["data_object"] is None
+
+    # Retrying after a lost response creates nothing new
+    retry = client.post(f"/questionnaires/{q_id}/submit/batch", json=items + [{"data_values": {"Color": "Blue"}, "idempotency_key": "k2"}]).json()
+    assert [r["status"] for r in retry] == ["duplicate", "duplicate", "created"]
+    assert retry[0]["id"] == first[0]["id"]
+    assert retry[0]["data_object"] is None and retry[1]["data_object"] is None
+    assert retry[2]["data_object"]["data_values"] == {"Color": "Blue"}
+
+    listing = client.get("/data/", params={"questionnaire_id": q_id}, headers={"Authorization": f"Bearer {owner_token}"})
+    assert len(listing.json()) == 2
+
+def test_submit_batch_checks_password_once(client: TestClient):
+    owner_token = get_auth_token_for_submission(client, "submit_owner_batch_pw", "pw")
+    q_id = create_questionnaire_for_submission(client, owner_token, "Batch Protected Q", password="secret")["id"]
+    items = [{"data_values": {"Color": "Red"}}]
+
+    assert client.post(f"/questionnaires/{q_id}/submit/batch", json=items).status_code == 401
+    assert client.post(f"/questionnaires/{q_id}/submit/batch", json=items, headers={"X-Questionnaire-Password": "wrong"}).status_code == 403
+    assert client.post("/questionnaires/99999/submit/batch", json=items).status_code == 404
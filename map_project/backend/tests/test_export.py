@@ -0,0 +1,67 @@
+import json
+from collections import namedtuple
+from datetime import datetime
+
+import pytest
+
+from app import export
+
+Row = namedtuple("Row", "id questionnaire_id submitter_name submission_date updated_at latitude longitude data_values additional_info")
+
+def make_rows(count):
+    return [
+        Row(n, 1, None, datetime(2024, 1, 1, 12, 0, n), None, 48.0 + n, 2.0, {"n": n}, None)
+        for n in range(1, count + 1)
+    ]
+
+
+def test_ndjson_chunks_by_batch():
+    chunks = list(export.iter_ndjson(make_rows(5), batch_size=2))
+    assert len(chunks) == 3
+    lines = b"".join(chunks).decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [1, 2, 3, 4, 5]
+    assert json.loads(lines[0])["submission_date"] == "2024-01-01T12:00:01"
+
+def test_geojson_is_valid_across_batches():
+    for count in (0, 1, 2, 5):
+        collection = json.loads(b"".join(export.iter_geojson(make_rows(count), batch_size=2)))
+        assert [feature["id"] for feature in collection["features"]] == list(range(1, count + 1))
+
+def test_export_consumes_rows_lazily():
+    consumed = []
+    def rows():
+        for row in make_rows(4):
+            consumed.append(row.id)
+            yield row
+    chunks = export.iter_ndjson(rows(), batch_size=2)
+    next(chunks)
+    assert consumed == [1, 2]
+
+
+Element = namedtuple("Element", "label field_type")
+ELEMENTS = [Element("n", "number"), Element("where", "map_coordinates"), Element("n", "text")]
+
+def test_columnar_layout_one_column_per_label():
+    layout = export.columnar_layout(ELEMENTS)
+    assert [name for name, _, _ in layout] == [name for name, _ in export.BASE_COLUMNS] + ["n"]
+    assert layout[-1] == ("n", export.NUMBER, "n")
+
+def test_csv_chunks_by_batch():
+    chunks = list(export.iter_csv(export.columnar_layout(ELEMENTS), make_rows(5), batch_size=2))
+    assert len(chunks) == 3
+    lines = b"".join(chunks).decode().splitlines()
+    assert len(lines) == 6 # Header + 5 rows
+    assert lines[1].split(",")[-1] == "1"
+
+def test_arrow_formats_across_batches():
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+    layout = export.columnar_layout(ELEMENTS)
+    parquet = b"".join(export.iter_arrow(layout, make_rows(5), format="parquet", batch_size=2))
+    table = pyarrow.parquet.read_table(pyarrow.BufferReader(parquet))
+    assert table.column("n").to_pylist() == [1, 2, 3, 4, 5]
+    assert pyarrow.parquet.ParquetFile(pyarrow.BufferReader(parquet)).num_row_groups == 3
+    stream = b"".join(export.iter_arrow(layout, make_rows(5), format="arrow", batch_size=2))
+    assert pyarrow.ipc.open_stream(stream).read_all().equals(table)
+    empty = b"".join(export.iter_arrow(layout, [], format="parquet"))
+    assert pyarrow.parquet.read_table(pyarrow.BufferReader(empty)).num_rows == 0
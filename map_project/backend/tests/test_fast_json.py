@@ -0,0 +1,62 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import fast_json, models, schemas
+
+MODES = ["off", "pydantic", pytest.param("orjson", marks=pytest.mark.skipif(fast_json.orjson is None, reason="orjson not installed"))]
+
+
+def make_data_objects():
+    return [
+        models.DataObject(
+            id=1, questionnaire_id=7, submitter_name="Équipe nord", latitude=48.8566, longitude=2.3522,
+            data_values={"n": 3, "tags": ["a", "b"], "nested": {"x": None}}, additional_info=None,
+            submission_date=datetime(2024, 5, 1, 12, 30, 15, 250000, tzinfo=timezone.utc)
+        ),
+        models.DataObject(
+            id=2, questionnaire_id=7, submitter_name=None, latitude=None, longitude=None,
+            data_values={}, additional_info="vu deux fois", submission_date=datetime(2024, 5, 2, 8, 0)
+        ),
+    ]
+
+@pytest.mark.parametrize("mode", ["pydantic", MODES[2]])
+def test_fast_paths_match_default_serialization(monkeypatch, mode):
+    objects = make_data_objects()
+    expected = [schemas.DataObject.model_validate(obj).model_dump(mode="json") for obj in objects]
+    monkeypatch.setattr(fast_json, "FAST_JSON", mode)
+    response = fast_json.list_response(schemas.DataObject, objects)
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == expected
+    # Byte-for-byte the same datetime format as Pydantic
+    assert b'"submission_date":"2024-05-01T12:30:15.250000Z"' in response.body
+
+def test_off_returns_objects_for_fastapi(monkeypatch):
+    objects = make_data_objects()
+    monkeypatch.setattr(fast_json, "FAST_JSON", "off")
+    assert fast_json.list_response(schemas.DataObject, objects) is objects
+
+@pytest.mark.parametrize("mode", MODES)
+def test_list_endpoints_same_body_in_every_mode(client: TestClient, monkeypatch, mode):
+    client.post("/users/", json={"name": "fast_json_user", "password": "pw"})
+    token = client.post("/auth/token", data={"username": "fast_json_user", "password": "pw"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = client.post("/questionnaires/", headers=headers, json={"title": "Fast JSON"}).json()["id"]
+    do_ids = [
+        client.post(f"/questionnaires/{q_id}/submit", json={"data_values": {"n": n}, "latitude": 48.85, "longitude": 2.35}).json()["id"]
+        for n in range(3)
+    ]
+    client.post(f"/users/me/favorites/{do_ids[0]}", headers=headers)
+
+    monkeypatch.setattr(fast_json, "FAST_JSON", mode)
+    listing = client.get("/data/?limit=2", headers=headers)
+    assert listing.headers["content-type"] == "application/json"
+    assert [item["id"] for item in listing.json()] == do_ids[:2]
+    assert set(listing.json()[0]) == set(schemas.DataObject.model_fields)
+    assert "X-Next-Cursor" in listing.headers # Headers set by the endpoint are kept
+    favorites = client.get("/users/me/favorites/", headers=headers)
+    assert [item["id"] for item in favorites.json()] == do_ids[:1]
+    nearby = client.get(f"/data/nearby_suggestions/?source_data_object_id={do_ids[0]}", headers=headers)
+    assert sorted(item["id"] for item in nearby.json()) == do_ids[1:]
@@ -42,9 +42,10 @@ def test_add_and_list_favorites(client: TestClient):
 
     # Add DO1 to favorites
     response_add_do1 = client.post(f"/users/me/favorites/{do1_id}", headers=headers_user1)
-    assert response_add_do1.status_code == 200 # Returns updated User model
+    assert response_add_do1.status_code == 200 # Returns the updated profile, with counts only
     user_data_do1 = response_add_do1.json()
-    assert any(fav_do["id"] == do1_id for fav_do in user_data_do1["favorite_data_objects"])
+    assert user_data_do1["favorite_count"] == 1
+    assert "favorite_data_objects" not in user_data_do1
 
     # List favorites, expect DO1
     response_list_fav1 = client.get("/users/me/favorites/", headers=headers_user1)
@@ -56,9 +57,12 @@ def test_add_and_list_favorites(client: TestClient):
     # Add DO2 to favorites
     response_add_do2 = client.post(f"/users/me/favorites/{do2_id}", headers=headers_user1)
     assert response_add_do2.status_code == 200
-    user_data_do2 = response_add_do2.json()
-    assert any(fav_do["id"] == do1_id for fav_do in user_data_do2["favorite_data_objects"]) # Previous should still be there
-    assert any(fav_do["id"] == do2_id for fav_do in user_data_do2["favorite_data_objects"])
+    assert response_add_do2.json()["favorite_count"] == 2 # Previous should still be there
+
+    # Adding again changes nothing
+    response_add_again = client.post(f"/users/me/favorites/{do2_id}", headers=headers_user1)
+    assert response_add_again.status_code == 200
+    assert response_add_again.json()["favorite_count"] == 2
 
 
     # List favorites, expect DO1 and DO2
@@ -112,3 +116,82 @@ def test_add_favorite_non_existent_data_object(client: TestClient):
     headers = {"Authorization": f"Bearer {token}"}
     response = client.post("/users/me/favorites/99999", headers=headers)
     assert response.status_code == 404
+
+def test_profile_counts_and_paginated_lists(client: TestClient):
+    token = get_auth_token_for_fav_tests(client, "fav_profile_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q1_id = create_questionnaire_for_fav_tests(client, token, "Fav_Profile_Q1")
+    q2_id = create_questionnaire_for_fav_tests(client, token, "Fav_Profile_Q2")
+    do_ids = [submit_data_for_fav_tests(client, q1_id, {"fav_field": f"data{n}"}) for n in range(3)]
+    for do_id in do_ids:
+        client.post(f"/users/me/favorites/{do_id}", headers=headers)
+
+    profile = client.get("/users/me", headers=headers).json()
+    assert profile["questionnaire_count"] == 2
+    assert profile["favorite_count"] == 3
+
+    favorites_page = client.get("/users/me/favorites/?skip=1&limit=1", headers=headers).json()
+    assert [item["id"] for item in favorites_page] == do_ids[1:2]
+
+    questionnaires = client.get("/users/me/questionnaires/", headers=headers).json()
+    assert [(q["id"], q["submission_count"]) for q in questionnaires] == [(q1_id, 3), (q2_id, 0)]
+    questionnaires_page = client.get("/users/me/questionnaires/?skip=1&limit=1", headers=headers).json()
+    assert [q["id"] for q in questionnaires_page] == [q2_id]
+
+def test_favorites_cursor_pagination(client: TestClient):
+    token = get_auth_token_for_fav_tests(client, "fav_cursor_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_fav_tests(client, token, "Fav_Cursor_Q")
+    do_ids = [submit_data_for_fav_tests(client, q_id, {"fav_field": f"data{n}"}) for n in range(5)]
+    for do_id in reversed(do_ids):
+        client.post(f"/users/me/favorites/{do_id}", headers=headers)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2} if cursor is None else {"limit": 2, "cursor": cursor}
+        response = client.get("/users/me/favorites/", headers=headers, params=params)
+        assert response.status_code == 200
+        seen += [item["id"] for item in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == do_ids
+
+    assert client.get("/users/me/favorites/", headers=headers, params={"cursor": "not-a-cursor"}).status_code == 400
+
+def test_bulk_favorites(client: TestClient):
+    token = get_auth_token_for_fav_tests(client, "fav_bulk_user")
+    other_token = get_auth_token_for_fav_tests(client, "fav_bulk_other")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_fav_tests(client, token, "Fav_Bulk_Q")
+    do_ids = [submit_data_for_fav_tests(client, q_id, {"fav_field": f"data{n}"}) for n in range(4)]
+    foreign_id = submit_data_for_fav_tests(client, create_questionnaire_for_fav_tests(client, other_token, "Fav_Bulk_Other_Q"), {})
+    client.post(f"/users/me/favorites/{do_ids[0]}", headers=headers)
+
+    response = client.post("/users/me/favorites/bulk", headers=headers, json={"add": do_ids[:3] + [foreign_id, 99999]})
+    assert response.status_code == 200
+    assert response.json() == {"added": do_ids[:3], "removed": [], "not_found": [foreign_id, 99999]}
+    assert client.get("/users/me", headers=headers).json()["favorite_count"] == 3
+
+    response = client.post("/users/me/favorites/bulk", headers=headers, json={"add": [do_ids[3]], "remove": [do_ids[0], do_ids[3] + 1000]})
+    assert response.status_code == 200
+    assert response.json() == {"added": [do_ids[3]], "removed": [do_ids[0]], "not_found": []}
+    assert [item["id"] for item in client.get("/users/me/favorites/", headers=headers).json()] == do_ids[1:]
+
+    response = client.post("/users/me/favorites/bulk", headers=headers, json={"add": [do_ids[1]], "remove": [do_ids[1]]})
+    assert response.status_code == 400
+
+def test_bulk_favorites_single_transaction(client: TestClient, db_session_test: Session, monkeypatch):
+    token = get_auth_token_for_fav_tests(client, "fav_bulk_tx_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_for_fav_tests(client, token, "Fav_Bulk_Tx_Q")
+    do_ids = [submit_data_for_fav_tests(client, q_id, {"fav_field": f"data{n}"}) for n in range(3)]
+    client.post(f"/users/me/favorites/{do_ids[0]}", headers=headers)
+
+    commits = []
+    commit = db_session_test.commit
+    monkeypatch.setattr(db_session_test, "commit", lambda: commits.append(1) or commit())
+    response = client.post("/users/me/favorites/bulk", headers=headers, json={"add": do_ids[1:], "remove": [do_ids[0]]})
+    assert response.status_code == 200
+    assert response.json() == {"added": do_ids[1:], "removed": [do_ids[0]], "not_found": []}
+    assert len(commits) == 1
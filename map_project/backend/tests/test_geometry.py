@@ -0,0 +1,44 @@
+import pytest
+
+from app import geometry
+
+SQUARE = {"type": "Polygon", "coordinates": [[[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]]]}
+SQUARE_WITH_HOLE = {
+    "type": "Polygon",
+    "coordinates": [
+        [[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]],
+        [[4, 4], [6, 4], [6, 6], [4, 6], [4, 4]],
+    ],
+}
+
+
+def test_polygon_contains():
+    polygon = geometry.prepare_polygon(SQUARE)
+    assert polygon.bounds == (0.0, 0.0, 10.0, 10.0)
+    # lats, lons
+    mask = polygon.contains([5, 5, 11, -1], [5, 11, 5, 5])
+    assert mask.tolist() == [True, False, False, False]
+
+def test_polygon_with_hole_and_multipolygon():
+    polygon = geometry.prepare_polygon(SQUARE_WITH_HOLE)
+    assert polygon.contains([5, 2], [5, 2]).tolist() == [False, True]
+
+    multi = geometry.prepare_polygon({
+        "type": "MultiPolygon",
+        "coordinates": [SQUARE["coordinates"], [[[20, 20], [30, 20], [25, 30], [20, 20]]]],
+    })
+    assert multi.contains([5, 22, 15], [5, 25, 15]).tolist() == [True, True, False]
+
+def test_prepared_polygons_are_cached():
+    feature = {"type": "Feature", "properties": {}, "geometry": SQUARE}
+    assert geometry.prepare_polygon(SQUARE) is geometry.prepare_polygon(feature)
+
+@pytest.mark.parametrize("bad_geometry", [
+    {"type": "Point", "coordinates": [0, 0]},
+    {"type": "Polygon", "coordinates": []},
+    {"type": "Polygon", "coordinates": [[[0, 0], [1, 1]]]},
+    {"type": "Polygon", "coordinates": [[["a", 0], [1, 1], [1, 0], [0, 0]]]},
+])
+def test_invalid_geometries(bad_geometry):
+    with pytest.raises(ValueError):
+        geometry.prepare_polygon(bad_geometry)
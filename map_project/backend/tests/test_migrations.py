@@ -0,0 +1,82 @@
+from sqlalchemy import create_engine, inspect, text
+
+from app import migrations, models, utils
+from app.database import Base
+
+# dataobjects as first released, before the columns added by later changes
+LEGACY_DATAOBJECTS = """
+CREATE TABLE dataobjects (
+    id INTEGER NOT NULL PRIMARY KEY,
+    questionnaire_id INTEGER REFERENCES questionnaires (id),
+    submitter_name VARCHAR,
+    submission_date DATETIME DEFAULT (CURRENT_TIMESTAMP),
+    latitude FLOAT,
+    longitude FLOAT,
+    data_values JSON NOT NULL,
+    additional_info VARCHAR
+)
+"""
+LEGACY_USERS = """
+CREATE TABLE users (
+    id INTEGER NOT NULL PRIMARY KEY,
+    name VARCHAR NOT NULL,
+    hashed_password VARCHAR NOT NULL,
+    is_active BOOLEAN
+)
+"""
+
+def make_legacy_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(LEGACY_DATAOBJECTS))
+        connection.execute(text(LEGACY_USERS))
+        connection.execute(text("INSERT INTO users (id, name, hashed_password) VALUES (1, 'owner', 'x'), (2, 'no_data', 'x')"))
+        connection.execute(text("CREATE TABLE questionnaires (id INTEGER NOT NULL PRIMARY KEY, title VARCHAR NOT NULL, owner_id INTEGER)"))
+        connection.execute(text("INSERT INTO questionnaires (id, title, owner_id) VALUES (1, 'legacy', 1)"))
+        connection.execute(text(
+            "INSERT INTO dataobjects (id, questionnaire_id, latitude, longitude, data_values, submission_date) VALUES "
+            "(1, 1, 48.85, 2.35, '{}', '2024-01-01 10:00:00'), "
+            "(2, 1, -33.9, -151.2, '{}', '2024-01-02 10:00:00'), "
+            "(3, 1, NULL, NULL, '{}', '2024-01-03 10:00:00')"
+        ))
+    # What the app runs at startup
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+def test_upgrade_schema_adds_columns_and_backfills(tmp_path):
+    engine = make_legacy_database(tmp_path)
+    migrations.upgrade_schema(engine)
+
+    columns = {column["name"] for column in inspect(engine).get_columns("dataobjects")}
+    assert set(migrations.ADDED_DATAOBJECT_COLUMNS) <= columns
+    user_columns = {column["name"] for column in inspect(engine).get_columns("users")}
+    assert set(migrations.ADDED_USER_COLUMNS) <= user_columns
+    indexes = {index["name"] for index in inspect(engine).get_indexes("dataobjects")}
+    assert {index.name for index in models.DataObject.__table__.indexes} <= indexes
+
+    with engine.connect() as connection:
+        rows = connection.execute(text(
+            "SELECT id, latitude, longitude, grid_lat, grid_lon, change_seq, updated_at, submission_date FROM dataobjects ORDER BY id"
+        )).all()
+        counter = connection.execute(text("SELECT value FROM change_sequence WHERE id = 1")).scalar_one()
+        data_versions = connection.execute(text("SELECT id, data_change_seq FROM users ORDER BY id")).all()
+    for row in rows:
+        assert (row.grid_lat, row.grid_lon) == utils.grid_cell(row.latitude, row.longitude)
+        assert row.updated_at == row.submission_date
+    # One sequence value for all existing rows, and the counter is past it
+    assert {row.change_seq for row in rows} == {1}
+    assert counter == 1
+    # Owners' data versions start at the last change of their data
+    assert [tuple(row) for row in data_versions] == [(1, 1), (2, 0)]
+    engine.dispose()
+
+def test_upgrade_schema_is_idempotent(tmp_path):
+    engine = make_legacy_database(tmp_path)
+    migrations.upgrade_schema(engine)
+    with engine.connect() as connection:
+        before = connection.execute(text("SELECT * FROM dataobjects ORDER BY id")).all()
+    migrations.upgrade_schema(engine)
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT * FROM dataobjects ORDER BY id")).all() == before
+        assert connection.execute(text("SELECT value FROM change_sequence WHERE id = 1")).scalar_one() == 1
+    engine.dispose()
@@ -0,0 +1,20 @@
+import pytest
+
+from app import pagination
+
+
+def test_cursor_round_trip():
+    for last_id in (0, 1, 42, 2**40):
+        cursor = pagination.encode_cursor(last_id)
+        assert "=" not in cursor # URL-safe without escaping
+        assert pagination.decode_cursor(cursor) == last_id
+
+def test_no_cursor_means_first_page():
+    assert pagination.decode_cursor(None) is None
+    assert pagination.decode_cursor("") is None
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "e30", "eyJpZCI6ImEifQ", "eyJpZCI6dHJ1ZX0", "W10"])
+def test_invalid_cursor_raises(cursor):
+    # Garbage, {}, {"id": "a"}, {"id": true}, []
+    with pytest.raises(ValueError):
+        pagination.decode_cursor(cursor)
@@ -0,0 +1,23 @@
+from app import utils
+from app.point_index import PointIndex
+
+
+def test_within_radius_sorted_and_excluding():
+    index = PointIndex([(1, 45.0, 5.0), (2, 45.003, 5.0), (3, 45.001, 5.0), (4, 46.0, 6.0)])
+    index.add(5, None, None) # Ignored
+    assert len(index) == 4
+
+    results = index.within_radius(45.0, 5.0, 500, exclude_id=1)
+    assert [obj_id for _, obj_id in results] == [3, 2]
+    assert results[0][0] == utils.haversine_distance(45.0, 5.0, 45.001, 5.0)
+
+def test_incremental_add_and_antimeridian():
+    index = PointIndex()
+    assert index.within_radius(-17.0, 179.999, 500) == []
+    index.add(1, -17.0, -179.999)
+    assert [obj_id for _, obj_id in index.within_radius(-17.0, 179.999, 500)] == [1]
+
+def test_huge_radius_walks_occupied_cells():
+    index = PointIndex([(1, 48.85, 2.35), (2, -33.9, 151.2)])
+    results = index.within_radius(45.0, 5.0, 20_000_000)
+    assert [obj_id for _, obj_id in results] == [1, 2]
@@ -0,0 +1,180 @@
+from fastapi.testclient import TestClient
+
+# Every endpoint runs a bounded number of queries whatever the number of rows it
+# returns: each budget is checked with one row and with several, so an N+1 lazy
+# load shows up as a failure here. Authenticated requests include the user lookup.
+
+
+def get_auth_headers(client: TestClient, username: str, password: str = "pw") -> dict:
+    client.post("/users/", json={"name": username, "password": password})
+    response = client.post(
+        "/auth/token",
+        data={"username": username, "password": password},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def create_questionnaire(client: TestClient, headers: dict, title: str, element_count: int = 2) -> int:
+    elements = [{"label": f"field_{n}", "field_type": "text"} for n in range(element_count)]
+    response = client.post("/questionnaires/", headers=headers, json={"title": title, "elements": elements})
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+def submit(client: TestClient, q_id: int, n: int) -> int:
+    payload = {"data_values": {"field_0": n}, "latitude": 48.85 + n * 0.001, "longitude": 2.35}
+    response = client.post(f"/questionnaires/{q_id}/submit", json=payload)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+def assert_query_budget(client: TestClient, count_queries, url: str, headers: dict, budget: int) -> list:
+    with count_queries() as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    assert len(statements) <= budget, "\n".join(statements)
+    return response.json()
+
+
+def test_questionnaire_reads_query_budget(client: TestClient, count_queries):
+    headers = get_auth_headers(client, "budget_q_user")
+    q_id = create_questionnaire(client, headers, "Budget Q 0", element_count=1)
+    submit(client, q_id, 0)
+
+    def check_budgets():
+        assert_query_budget(client, count_queries, "/questionnaires/", headers, budget=3)
+        assert_query_budget(client, count_queries, "/users/me/questionnaires/", headers, budget=3)
+        assert_query_budget(client, count_queries, f"/questionnaires/{q_id}", headers, budget=3)
+        assert_query_budget(client, count_queries, f"/questionnaires/{q_id}?include=data_objects", headers, budget=4)
+        assert_query_budget(client, count_queries, "/questionnaires/?include=data_objects&data_limit=2", headers, budget=4)
+
+    check_budgets()
+    for n in range(1, 4): # Several questionnaires, with more elements and submissions
+        create_questionnaire(client, headers, f"Budget Q {n}", element_count=3)
+        submit(client, q_id, n)
+    check_budgets()
+
+    listing = client.get("/questionnaires/", headers=headers).json()
+    assert [len(q["elements"]) for q in listing] == [1, 3, 3, 3]
+    pages = client.get("/questionnaires/?include=data_objects&data_skip=1&data_limit=2", headers=headers).json()
+    assert [len(q["data_objects"]) for q in pages] == [2, 0, 0, 0]
+    assert client.get("/questionnaires/?limit=5000", headers=headers).status_code == 422
+
+def test_data_object_reads_query_budget(client: TestClient, count_queries):
+    headers = get_auth_headers(client, "budget_do_user")
+    q_id = create_questionnaire(client, headers, "Budget DO")
+    do_ids = [submit(client, q_id, 0)]
+    client.post(f"/users/me/favorites/{do_ids[0]}", headers=headers)
+
+    def check_budgets():
+        assert_query_budget(client, count_queries, "/data/", headers, budget=2)
+        assert_query_budget(client, count_queries, "/data/?min_lat=48&min_lon=2&max_lat=49&max_lon=3", headers, budget=2)
+        assert_query_budget(client, count_queries, f"/data/{do_ids[0]}", headers, budget=2)
+        assert_query_budget(client, count_queries, "/users/me/favorites/", headers, budget=2)
+        assert_query_budget(client, count_queries, "/users/me", headers, budget=2)
+
+    check_budgets()
+    for n in range(1, 4): # Several data objects and favorites
+        do_ids.append(submit(client, q_id, n))
+        client.post(f"/users/me/favorites/{do_ids[-1]}", headers=headers)
+    check_budgets()
+
+    assert len(client.get("/users/me/favorites/", headers=headers).json()) == 4
+
+def test_batch_submit_query_budget(client: TestClient, count_queries):
+    headers = get_auth_headers(client, "budget_batch_user")
+    q_id = create_questionnaire(client, headers, "Budget Batch")
+
+    for size in (1, 25):
+        items = [
+            {"data_values": {"field_0": n}, "latitude": 48.85 + n * 0.001, "longitude": 2.35, "idempotency_key": f"{size}-{n}"}
+            for n in range(size)
+        ]
+        with count_queries() as statements:
+            response = client.post(f"/questionnaires/{q_id}/submit/batch", json=items)
+        assert response.status_code == 200, response.text
+        assert all(result["status"] == "created" for result in response.json())
+        # Ids must come back in item order: PostgreSQL sends one batched INSERT,
+        # SQLite one in-process INSERT per row, all in the same transaction
+        others = [statement for statement in statements if not statement.startswith("INSERT INTO dataobjects")]
+        # Questionnaire, existing keys, sequence (update + read), owner data version, reload, owner lookup
+        assert len(others) <= 7, "\n".join(others)
+
+def test_questionnaire_writes_query_budget(client: TestClient, count_queries):
+    headers = get_auth_headers(client, "budget_q_writer")
+    q_id = create_questionnaire(client, headers, "Budget Writes", element_count=1)
+
+    for element_count in (1, 40):
+        elements = [{"label": f"field_{n}", "field_type": "text"} for n in range(element_count)]
+        # User, questionnaire insert, elements bulk insert, reload (questionnaire + elements)
+        with count_queries() as statements:
+            response = client.post("/questionnaires/", headers=headers, json={"title": "Budget Create", "elements": elements})
+        assert response.status_code == 201, response.text
+        assert len(response.json()["elements"]) == element_count
+        assert len(statements) <= 5, "\n".join(statements)
+
+        # User, ownership check, questionnaire check, delete, bulk insert, reload
+        with count_queries() as statements:
+            response = client.put(f"/questionnaires/{q_id}/elements/", headers=headers, json=elements)
+        assert response.status_code == 200, response.text
+        assert len(response.json()["elements"]) == element_count
+        assert len(statements) <= 7, "\n".join(statements)
+
+def test_batch_merge_query_budget(client: TestClient, count_queries):
+    headers = get_auth_headers(client, "budget_merge_user")
+    q_id = create_questionnaire(client, headers, "Budget Merge")
+    ids = [submit(client, q_id, n) for n in range(40)]
+
+    for group_count in (1, 20):
+        groups = [
+            {"data_object_ids": ids[2 * n:2 * n + 2], "target_questionnaire_id": q_id}
+            for n in range(group_count)
+        ]
+        with count_queries() as statements:
+            response = client.post("/data/merge/batch", headers=headers, json=groups)
+        assert response.status_code == 201, response.text
+        assert len(response.json()) == group_count
+        # Sources and merged objects must not be loaded one by one: user, targets,
+        # sources, sequence (update + read), owner data version, reload. SQLite inserts
+        # row by row (see above).
+        others = [statement for statement in statements if not statement.startswith("INSERT INTO dataobjects")]
+        assert len(others) <= 7, "\n".join(others)
+
+def test_favorites_query_budget(client: TestClient, count_queries):
+    headers = get_auth_headers(client, "budget_fav_user")
+    q_id = create_questionnaire(client, headers, "Budget Favorites")
+    ids = [submit(client, q_id, n) for n in range(30)]
+
+    # A click costs the same with 1 or 29 favorites already there:
+    # user, owned ids, insert, profile
+    for data_object_id in (ids[0], ids[29]):
+        with count_queries() as statements:
+            response = client.post(f"/users/me/favorites/{data_object_id}", headers=headers)
+        assert response.status_code == 200, response.text
+        assert len(statements) <= 4, "\n".join(statements)
+        if data_object_id == ids[0]:
+            client.post("/users/me/favorites/bulk", headers=headers, json={"add": ids[1:29]})
+
+    # User, delete
+    with count_queries() as statements:
+        assert client.delete(f"/users/me/favorites/{ids[0]}", headers=headers).status_code == 204
+    assert len(statements) <= 2, "\n".join(statements)
+
+    # User, owned ids, insert, delete
+    with count_queries() as statements:
+        response = client.post("/users/me/favorites/bulk", headers=headers, json={"add": ids[:10], "remove": ids[10:20]})
+    assert response.status_code == 200, response.text
+    assert len(statements) <= 4, "\n".join(statements)
+
+def test_cached_tile_query_budget(client: TestClient, count_queries):
+    headers = get_auth_headers(client, "budget_tile_user")
+    q_id = create_questionnaire(client, headers, "Budget Tiles")
+    for n in range(30):
+        submit(client, q_id, n)
+    assert client.get("/data/tiles/1/1/0.mvt", headers=headers).status_code == 200
+
+    # A cache hit: user, owner data version (a primary key lookup, whatever the owner's row count)
+    with count_queries() as statements:
+        response = client.get("/data/tiles/1/1/0.mvt", headers=headers)
+    assert response.status_code == 200
+    assert len(statements) <= 2, "\n".join(statements)
+    assert not any("dataobject" in statement for statement in statements), "\n".join(statements)
@@ -148,6 +148,60 @@ def test_read_questionnaire_public_no_password(client: TestClient):
     data = response.json()
     assert data["title"] == "Public Q - No Password"
 
+def test_read_questionnaire_summary_and_include_data_objects(client: TestClient):
+    token = get_auth_token(client, "q_reader_include", "pw")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = create_questionnaire_util(client, token, "Q - Include Data Objects")["id"]
+    submitted_ids = [
+        client.post(f"/questionnaires/{q_id}/submit", json={"data_values": {"n": n}}).json()["id"]
+        for n in range(3)
+    ]
+
+    # Summary by default, for everyone: elements and a submission count, no submissions
+    public = client.get(f"/questionnaires/{q_id}").json()
+    assert public["submission_count"] == 3
+    assert "data_objects" not in public
+    listing = client.get("/questionnaires/", headers=headers).json()
+    assert [(q["id"], q["submission_count"]) for q in listing] == [(q_id, 3)]
+    assert "data_objects" not in listing[0]
+
+    # Paginated submissions on request, for the owner only
+    detailed = client.get(f"/questionnaires/{q_id}?include=data_objects&data_skip=1&data_limit=1", headers=headers).json()
+    assert [obj["id"] for obj in detailed["data_objects"]] == submitted_ids[1:2]
+    detailed_listing = client.get("/questionnaires/?include=data_objects", headers=headers).json()
+    assert [obj["id"] for obj in detailed_listing[0]["data_objects"]] == submitted_ids
+
+    assert client.get(f"/questionnaires/{q_id}?include=data_objects").status_code == 403
+    assert client.get(f"/questionnaires/{q_id}?include=everything", headers=headers).status_code == 400
+
+def test_list_questionnaires_include_pages_each_questionnaire(client: TestClient):
+    token = get_auth_token(client, "q_lister_include", "pw")
+    headers = {"Authorization": f"Bearer {token}"}
+    submitted = {}
+    for title in ("Q - Include A", "Q - Include B", "Q - Include C"):
+        q_id = create_questionnaire_util(client, token, title)["id"]
+        submitted[q_id] = [
+            client.post(f"/questionnaires/{q_id}/submit", json={"data_values": {"n": n}}).json()["id"]
+            for n in range(len(submitted) + 1)
+        ]
+
+    listing = client.get("/questionnaires/?include=data_objects&data_skip=1&data_limit=1", headers=headers).json()
+    assert {q["id"]: [obj["id"] for obj in q["data_objects"]] for q in listing} == {
+        q_id: ids[1:2] for q_id, ids in submitted.items()
+    }
+
+def test_list_questionnaires_cursor_pagination(client: TestClient):
+    token = get_auth_token(client, "q_cursor_user", "pw")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_ids = [create_questionnaire_util(client, token, f"Q - Cursor {n}")["id"] for n in range(3)]
+
+    for url in ("/questionnaires/", "/users/me/questionnaires/"):
+        first = client.get(f"{url}?limit=2", headers=headers)
+        assert [q["id"] for q in first.json()] == q_ids[:2]
+        last = client.get(f"{url}?limit=2&cursor={first.headers['X-Next-Cursor']}", headers=headers)
+        assert [q["id"] for q in last.json()] == q_ids[2:]
+        assert "X-Next-Cursor" not in last.headers
+
 def test_read_questionnaire_public_with_password_correct_header(client: TestClient):
     token = get_auth_token(client, "q_reader_pass_corr", "pw")
     owner_headers = {"Authorization": f"Bearer {token}"}
@@ -350,3 +404,106 @@ def test_delete_element_not_owner(client: TestClient):
     headers = {"Authorization": f"Bearer {other_user_token}"}
     response = client.delete(f"/questionnaires/{q_id}/elements/{el_id}", headers=headers)
     assert response.status_code == 403
+
+def test_replace_elements_owner(client: TestClient):
+    token = get_auth_token(client, "el_replacer_owner", "pw")
+    q_elements_init = [{"field_type": "text", "label": "Old 1"}, {"field_type": "text", "label": "Old 2"}]
+    q_id = create_questionnaire_util(client, token, "Q for Elements - Replace", elements=q_elements_init)["id"]
+
+    headers = {"Authorization": f"Bearer {token}"}
+    new_elements = [
+        {"field_type": "number", "label": "New 1"},
+        {"field_type": "text", "label": "New 2", "options": {"max_length": 20}},
+        {"field_type": "date", "label": "New 3"},
+    ]
+    response = client.put(f"/questionnaires/{q_id}/elements/", headers=headers, json=new_elements)
+    assert response.status_code == 200
+    data = response.json()
+    assert [(el["label"], el["field_type"]) for el in data["elements"]] == [("New 1", "number"), ("New 2", "text"), ("New 3", "date")]
+    assert data["elements"][1]["options"] == {"max_length": 20}
+    assert all(el["questionnaire_id"] == q_id for el in data["elements"])
+
+    # Emptying the form is a replacement too
+    response = client.put(f"/questionnaires/{q_id}/elements/", headers=headers, json=[])
+    assert response.status_code == 200
+    assert client.get(f"/questionnaires/{q_id}", headers=headers).json()["elements"] == []
+
+def test_replace_elements_not_owner(client: TestClient):
+    owner_token = get_auth_token(client, "el_replace_owner6", "pw")
+    other_user_token = get_auth_token(client, "el_replace_other6", "pw")
+    q_id = create_questionnaire_util(client, owner_token, "Q for Elements - Replace Not Owner", elements=[{"field_type": "text", "label": "Kept"}])["id"]
+
+    headers = {"Authorization": f"Bearer {other_user_token}"}
+    response = client.put(f"/questionnaires/{q_id}/elements/", headers=headers, json=[{"field_type": "text", "label": "Hijack"}])
+    assert response.status_code == 403
+    response = client.put("/questionnaires/99999/elements/", headers=headers, json=[])
+    assert response.status_code == 404
+
+    owner_headers = {"Authorization": f"Bearer {owner_token}"}
+    assert [el["label"] for el in client.get(f"/questionnaires/{q_id}", headers=owner_headers).json()["elements"]] == ["Kept"]
+
+
+# --- Columnar export ---
+EXPORT_ELEMENTS = [
+    {"label": "Espèce", "field_type": "text"},
+    {"label": "Nombre", "field_type": "number"},
+    {"label": "Vu le", "field_type": "date"},
+    {"label": "Position", "field_type": "map_coordinates"}, # Stored as latitude/longitude
+    {"label": "id", "field_type": "text"}, # Clashes with a base column
+]
+
+def create_export_questionnaire(client: TestClient, username: str):
+    token = get_auth_token(client, username, "pw")
+    q_id = create_questionnaire_util(client, token, "Q - Export", elements=EXPORT_ELEMENTS)["id"]
+    submissions = [
+        {"data_values": {"Espèce": "Héron", "Nombre": 3, "Vu le": "2024-05-01", "id": "A1"}, "latitude": 48.85, "longitude": 2.35},
+        {"data_values": {"Espèce": "Loutre", "Nombre": "pas sûr"}}, # Unparseable number, missing answers
+    ]
+    for payload in submissions:
+        assert client.post(f"/questionnaires/{q_id}/submit", json=payload).status_code == 201
+    return token, q_id
+
+def test_export_questionnaire_csv(client: TestClient):
+    import csv, io
+    token, q_id = create_export_questionnaire(client, "q_export_csv_user")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.get(f"/questionnaires/{q_id}/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    header, first, second = list(csv.reader(io.StringIO(response.text)))
+    assert header == ["id", "submitter_name", "submission_date", "latitude", "longitude", "additional_info",
+                      "Espèce", "Nombre", "Vu le", "data_id"]
+    assert first[3:] == ["48.85", "2.35", "", "Héron", "3", "2024-05-01", "A1"]
+    assert second[6:] == ["Loutre", "", "", ""]
+
+    other_token = get_auth_token(client, "q_export_csv_other", "pw")
+    assert client.get(f"/questionnaires/{q_id}/export", headers={"Authorization": f"Bearer {other_token}"}).status_code == 403
+    assert client.get("/questionnaires/999999/export", headers=headers).status_code == 404
+
+def test_export_questionnaire_parquet_and_arrow(client: TestClient):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+    token, q_id = create_export_questionnaire(client, "q_export_arrow_user")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    parquet = client.get(f"/questionnaires/{q_id}/export?format=parquet", headers=headers)
+    assert parquet.status_code == 200
+    table = pyarrow.parquet.read_table(pyarrow.BufferReader(parquet.content))
+    arrow = client.get(f"/questionnaires/{q_id}/export?format=arrow", headers=headers)
+    assert arrow.status_code == 200
+    assert pyarrow.ipc.open_stream(arrow.content).read_all().equals(table)
+
+    assert table.schema.field("Nombre").type == pyarrow.float64()
+    assert table.schema.field("Vu le").type == pyarrow.date32()
+    columns = table.to_pydict()
+    assert columns["Espèce"] == ["Héron", "Loutre"]
+    assert columns["Nombre"] == [3.0, None]
+    assert [str(value) if value else None for value in columns["Vu le"]] == ["2024-05-01", None]
+
+def test_export_questionnaire_arrow_formats_need_pyarrow(client: TestClient, monkeypatch):
+    from app import export
+    token, q_id = create_export_questionnaire(client, "q_export_no_arrow_user")
+    monkeypatch.setattr(export, "pyarrow", None)
+    response = client.get(f"/questionnaires/{q_id}/export?format=parquet", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 400
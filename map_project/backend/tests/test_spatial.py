@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, schemas, spatial
+from app.database import Base
+
+
+@pytest.fixture
+def spatialite_session(tmp_path):
+    """A session on a fresh SQLite database with SpatiaLite, or skip if it cannot be loaded."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'spatial.db'}", connect_args={"check_same_thread": False})
+    spatial.load_spatialite_on_connect(engine)
+    Base.metadata.create_all(bind=engine)
+    if spatial.setup_spatial_backend(engine) != spatial.SPATIALITE:
+        engine.dispose()
+        pytest.skip("SpatiaLite extension not available")
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_spatialite_queries(spatialite_session):
+    db = spatialite_session
+    assert spatial.backend_for(db) == spatial.SPATIALITE
+    user = crud.create_user(db, schemas.UserCreate(name="spatial_user", password="pw"))
+    questionnaire = crud.create_questionnaire(db, schemas.QuestionnaireCreate(title="Spatial_Q"), owner_id=user.id)
+
+    def submit(lat, lon):
+        data = schemas.DataObjectCreate(data_values={}, latitude=lat, longitude=lon)
+        return crud.create_data_object(db, data, questionnaire_id=questionnaire.id).id
+
+    source_id = submit(45.0, 5.0)
+    near_id = submit(45.001, 5.0)
+    mid_id = submit(45.1, 5.0)
+    fiji_id = submit(-17.0, 179.999)
+    across_id = submit(-17.0, -179.999)
+    submit(None, None)
+
+    # The geometry column is filled by the triggers
+    assert [obj.id for obj in crud.get_nearby_data_objects(db, user, source_id, 500)] == [near_id]
+    assert [obj.id for obj in crud.get_nearby_data_objects(db, user, fiji_id, 500)] == [across_id]
+
+    nearest = crud.get_nearest_data_objects(db, user, k=2, source_data_object_id=source_id)
+    assert [obj.id for obj, _ in nearest] == [near_id, mid_id]
+
+    viewport = crud.get_data_objects(db, user, viewport=(-20.0, 170.0, -10.0, -170.0))
+    assert [obj.id for obj in viewport] == [fiji_id, across_id]
@@ -0,0 +1,147 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app import crud, models, mvt
+
+
+# --- Minimal protobuf reader, enough to inspect the tiles we produce ---
+def read_varint(data: bytes, pos: int):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+def read_fields(data: bytes):
+    pos, fields = 0, []
+    while pos < len(data):
+        key, pos = read_varint(data, pos)
+        field_number, wire_type = key >> 3, key & 0x7
+        if wire_type == 0:
+            value, pos = read_varint(data, pos)
+        elif wire_type == 1:
+            value, pos = data[pos:pos + 8], pos + 8
+        else:
+            length, pos = read_varint(data, pos)
+            value, pos = data[pos:pos + length], pos + length
+        fields.append((field_number, value))
+    return fields
+
+def decode_point_layer(tile: bytes):
+    (field_number, layer), = read_fields(tile)
+    assert field_number == 3
+    layer_fields = read_fields(layer)
+    keys = [value.decode() for number, value in layer_fields if number == 3]
+    values = [read_fields(value)[0] for number, value in layer_fields if number == 4]
+    features = {}
+    for number, value in layer_fields:
+        if number != 2:
+            continue
+        feature = dict(read_fields(value))
+        tags = list(feature.get(2, b""))
+        properties = {keys[tags[i]]: values[tags[i + 1]][1] for i in range(0, len(tags), 2)}
+        features[feature[1]] = properties
+    return dict(layer_fields)[1].decode(), features
+
+
+def test_encode_tile_round_trip():
+    tile = mvt.encode_tile({"points": [(7, 10, 20, {"name": "camp", "count": 3, "none": None})]})
+    name, features = decode_point_layer(tile)
+    assert name == "points"
+    assert features == {7: {"name": b"camp", "count": 3}}
+
+def test_tile_pixel_and_bounds():
+    min_lat, min_lon, max_lat, max_lon = mvt.tile_bounds(1, 1, 0)
+    assert (min_lon, max_lon) == (0.0, 180.0)
+    assert min_lat == 0.0 and max_lat > 85
+    assert mvt.tile_pixel(0, 0, 0, 0.0, 0.0) == (2048, 2048)
+
+
+def get_token(client: TestClient, username: str) -> str:
+    client.post("/users/", json={"name": username, "password": "pw"})
+    response = client.post("/auth/token", data={"username": username, "password": "pw"})
+    return response.json()["access_token"]
+
+def submit(client: TestClient, q_id: int, lat: float, lon: float, submitter: str) -> int:
+    response = client.post(f"/questionnaires/{q_id}/submit", json={"data_values": {}, "latitude": lat, "longitude": lon, "submitter_name": submitter})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+def test_data_object_tile(client: TestClient):
+    token = get_token(client, "tile_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = client.post("/questionnaires/", headers=headers, json={"title": "Tile_Q"}).json()["id"]
+    paris_id = submit(client, q_id, 48.85, 2.35, "paris")
+    submit(client, q_id, -33.9, 151.2, "sydney")
+
+    # z=1, x=1, y=0 is the north-east quarter of the world
+    response = client.get("/data/tiles/1/1/0.mvt", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.mapbox-vector-tile"
+    name, features = decode_point_layer(response.content)
+    assert name == "data_objects"
+    assert list(features) == [paris_id]
+    assert features[paris_id]["submitter_name"] == b"paris"
+    assert features[paris_id]["questionnaire_id"] == q_id
+
+    # New submissions invalidate the cached tile
+    lyon_id = submit(client, q_id, 45.76, 4.83, "lyon")
+    _, features = decode_point_layer(client.get("/data/tiles/1/1/0.mvt", headers=headers).content)
+    assert set(features) == {paris_id, lyon_id}
+
+    # Filters are part of the cache key
+    response_other_q = client.get(f"/data/tiles/1/1/0.mvt?questionnaire_id={q_id + 1000}", headers=headers)
+    _, features = decode_point_layer(response_other_q.content)
+    assert features == {}
+
+def test_data_object_tile_out_of_range(client: TestClient):
+    token = get_token(client, "tile_out_of_range_user")
+    response = client.get("/data/tiles/1/2/0.mvt", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 404
+
+def test_data_object_tile_sees_writes_from_other_workers(client: TestClient, db_session_test: Session):
+    token = get_token(client, "tile_other_worker_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = client.post("/questionnaires/", headers=headers, json={"title": "Tile_Q"}).json()["id"]
+    paris_id = submit(client, q_id, 48.85, 2.35, "paris")
+    owner_id = client.get("/users/me", headers=headers).json()["id"]
+    client.get("/data/tiles/1/1/0.mvt", headers=headers)
+
+    # A write committed by another worker never reaches this process's caches
+    db_session_test.query(models.DataObject).filter(models.DataObject.id == paris_id)\
+        .update({"submitter_name": "lutetia", "change_seq": crud._next_change_seq(db_session_test, owner_id)})
+    _, features = decode_point_layer(client.get("/data/tiles/1/1/0.mvt", headers=headers).content)
+    assert features[paris_id]["submitter_name"] == b"lutetia"
+
+def test_data_object_tile_switches_to_clusters_when_dense(client: TestClient, monkeypatch):
+    monkeypatch.setattr(crud, "TILE_MAX_POINTS", 2)
+    token = get_token(client, "tile_dense_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = client.post("/questionnaires/", headers=headers, json={"title": "Tile_Q"}).json()["id"]
+    submit(client, q_id, 48.85, 2.35, "paris")
+    submit(client, q_id, 48.86, 2.34, "paris")
+    _, features = decode_point_layer(client.get("/data/tiles/1/1/0.mvt", headers=headers).content)
+    assert len(features) == 2
+
+    submit(client, q_id, 45.76, 4.83, "lyon")
+    name, features = decode_point_layer(client.get("/data/tiles/1/1/0.mvt", headers=headers).content)
+    assert name == "clusters"
+    # At z=1, France fits in one cluster
+    assert [properties["count"] for properties in features.values()] == [3]
+
+def test_data_object_on_tile_edge_is_in_one_tile(client: TestClient):
+    token = get_token(client, "tile_edge_user")
+    headers = {"Authorization": f"Bearer {token}"}
+    q_id = client.post("/questionnaires/", headers=headers, json={"title": "Tile_Q"}).json()["id"]
+    # On the z=1 edges: the prime meridian (x=0 | x=1) and the equator (y=0 | y=1)
+    meridian_id = submit(client, q_id, 10.0, 0.0, "meridian")
+    equator_id = submit(client, q_id, 0.0, 10.0, "equator")
+
+    tiles = {
+        (x, y): set(decode_point_layer(client.get(f"/data/tiles/1/{x}/{y}.mvt", headers=headers).content)[1])
+        for x in (0, 1) for y in (0, 1)
+    }
+    assert tiles == {(0, 0): set(), (1, 0): {meridian_id}, (0, 1): set(), (1, 1): {equator_id}}
@@ -0,0 +1,124 @@
+import math
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from app import utils
+
+
+def test_haversine_distance_known_value():
+    # One degree of latitude is ~111.2 km
+    assert utils.haversine_distance(45.0, 5.0, 46.0, 5.0) == pytest.approx(111195, rel=1e-3)
+    assert utils.haversine_distance(45.0, 5.0, 45.0, 5.0) == 0.0
+
+def reference_haversine(lat1, lon1, lat2, lon2):
+    # The textbook formula with the math module, independent of utils' kernel
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(a))
+
+def test_haversine_distances_known_values():
+    # Paris -> Lyon, Paris -> Paris + 1 degree of latitude, Paris -> Sydney, Paris -> Paris
+    lats = [45.764, 49.8566, -33.8688, 48.8566]
+    lons = [4.8357, 2.3522, 151.2093, 2.3522]
+    distances = utils.haversine_distances(48.8566, 2.3522, lats, lons)
+    assert distances.shape == (4,)
+    assert distances[0] == pytest.approx(392_000, rel=5e-3)
+    assert distances[1] == pytest.approx(111_195, rel=1e-3)
+    assert distances[2] == pytest.approx(16_960_000, rel=5e-3)
+    assert distances[3] == 0.0
+    for distance, lat, lon in zip(distances, lats, lons):
+        assert distance == pytest.approx(reference_haversine(48.8566, 2.3522, lat, lon), rel=1e-9, abs=1e-6)
+
+def test_haversine_pairwise_shape_and_values():
+    lats1, lons1 = [45.0, 48.85], [5.0, 2.35]
+    lats2, lons2 = [45.001, 43.3, 48.85], [5.001, 5.37, 2.35]
+    matrix = utils.haversine_pairwise(lats1, lons1, lats2, lons2)
+    assert matrix.shape == (2, 3)
+    for i in range(2):
+        np.testing.assert_allclose(matrix[i], utils.haversine_distances(lats1[i], lons1[i], lats2, lons2))
+    assert matrix[1, 2] == 0.0
+
+def test_haversine_antipodal_points_do_not_overflow():
+    assert utils.haversine_distance(0.0, 0.0, 0.0, 180.0) == pytest.approx(math.pi * utils.EARTH_RADIUS_METERS)
+
+def test_bounding_box_simple():
+    min_lat, max_lat, lon_ranges = utils.bounding_box(45.0, 5.0, 1000)
+    assert min_lat < 45.0 < max_lat
+    assert len(lon_ranges) == 1
+    west, east = lon_ranges[0]
+    assert west < 5.0 < east
+    # Points on the circle are inside the box
+    assert utils.haversine_distance(45.0, 5.0, 45.0, east) >= 1000
+
+def test_bounding_box_across_antimeridian():
+    _, _, lon_ranges = utils.bounding_box(-17.0, 179.999, 1000)
+    assert len(lon_ranges) == 2
+    (west1, east1), (west2, east2) = lon_ranges
+    assert east1 == 180.0 and west2 == -180.0
+    assert west1 < 179.999 and east2 > -180.0
+
+def test_bounding_box_near_pole_spans_all_longitudes():
+    min_lat, max_lat, lon_ranges = utils.bounding_box(89.999, 10.0, 1000)
+    assert max_lat == 90.0
+    assert lon_ranges == [(-180.0, 180.0)]
+
+def test_cluster_grid_factor_shrinks_with_zoom():
+    factors = [utils.cluster_grid_factor(zoom) for zoom in range(0, 23)]
+    assert factors == sorted(factors, reverse=True)
+    assert factors[0] > 1000
+    assert factors[-1] == 1
+
+def test_viewport_cluster_grid_factor_bounds_cluster_count():
+    paris = (48.8, 2.3, 48.9, 2.4)
+    assert utils.viewport_cluster_grid_factor(18, paris) == utils.cluster_grid_factor(18)
+    for viewport in [(-90.0, -180.0, 90.0, 180.0), (41.0, -5.0, 51.0, 9.0), (-10.0, 170.0, 10.0, -170.0)]:
+        min_lat, min_lon, max_lat, max_lon = viewport
+        lon_span = (max_lon - min_lon) % 360 or 360
+        for zoom in (0, 10, 22):
+            factor = utils.viewport_cluster_grid_factor(zoom, viewport)
+            assert factor >= utils.cluster_grid_factor(zoom)
+            cluster_degrees = factor * utils.GRID_CELL_DEGREES
+            assert (math.floor((max_lat - min_lat) / cluster_degrees) + 2) * (math.floor(lon_span / cluster_degrees) + 3) <= utils.MAX_VIEWPORT_CLUSTERS
+
+@pytest.mark.parametrize("chunk_pairs", [utils.GROUPING_CHUNK_PAIRS, 7])
+def test_group_close_points_matches_brute_force(monkeypatch, chunk_pairs):
+    monkeypatch.setattr(utils, "GROUPING_CHUNK_PAIRS", chunk_pairs)
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(45.0, 45.05, 300)
+    lons = rng.uniform(5.0, 5.05, 300)
+    # Crowded cells: a few stacks of identical points
+    for stack in rng.integers(0, 300, (3, 40)):
+        lats[stack], lons[stack] = lats[stack[0]], lons[stack[0]]
+    groups = utils.group_close_points(lats, lons, 150)
+
+    # Brute force single linkage
+    close = utils.haversine_pairwise(lats, lons, lats, lons) <= 150
+    labels = list(range(len(lats)))
+    changed = True
+    while changed:
+        changed = False
+        for i, j in zip(*np.nonzero(close)):
+            if labels[i] != labels[j]:
+                labels[i] = labels[j] = min(labels[i], labels[j])
+                changed = True
+    expected = {}
+    for i, label in enumerate(labels):
+        expected.setdefault(label, []).append(i)
+    assert sorted(groups) == sorted(group for group in expected.values() if len(group) > 1)
+
+def test_group_close_points_stacked_points_stay_linear():
+    # Two stacks 30 m apart (connected) and a third 500 m away: a pairwise
+    # comparison would need 10^10 distances and gigabytes of memory
+    stacks = [(45.0, 5.0), (45.0 + 30 / utils.METERS_PER_DEGREE_LAT, 5.0), (45.0 + 500 / utils.METERS_PER_DEGREE_LAT, 5.0)]
+    lats = np.repeat([lat for lat, _ in stacks], 50_000)
+    lons = np.repeat([lon for _, lon in stacks], 50_000)
+    tracemalloc.start()
+    try:
+        groups = utils.group_close_points(lats, lons, 50)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert groups == [list(range(100_000)), list(range(100_000, 150_000))]
+    assert peak < 64 * 2**20
@@ -1,10 +1,10 @@
 // frontend/components/MapComponent.js
 'use client';
 
-import { MapContainer, TileLayer, Marker, Popup } from 'react-leaflet';
+import { MapContainer, TileLayer, Marker, Popup, CircleMarker, Tooltip, useMap, useMapEvents } from 'react-leaflet';
 import 'leaflet/dist/leaflet.css';
 import L from 'leaflet';
-import { useEffect, useState } from 'react';
+import { useCallback, useEffect, useRef, useState } from 'react';
 import { fetchApi } from '@/lib/api'; // Importer fetchApi
 
 // Correction pour l'icône par défaut de Leaflet
@@ -17,51 +17,126 @@ if (typeof window !== "undefined") {
     });
 }
 
+// En dessous de ce zoom, la carte affiche les regroupements calculés par le serveur
+const CLUSTER_MAX_ZOOM = 12;
+// Nombre maximal de points demandés : au-delà, on affiche aussi les regroupements
+const POINTS_LIMIT = 1000;
+// Délai après le dernier déplacement avant de recharger (ms)
+const MOVE_DEBOUNCE_MS = 300;
+
+// Recharge les DataObjects visibles quand la carte s'arrête de bouger
+function ViewportLoader({ onViewportChange }) {
+  const timeout = useRef(null);
+  const map = useMapEvents({
+    moveend: () => {
+      // Un déplacement rapide déclenche plusieurs moveend : seul le dernier recharge
+      clearTimeout(timeout.current);
+      timeout.current = setTimeout(() => onViewportChange(map.getBounds(), map.getZoom()), MOVE_DEBOUNCE_MS);
+    },
+  });
+  useEffect(() => {
+    onViewportChange(map.getBounds(), map.getZoom()); // Chargement initial
+    return () => clearTimeout(timeout.current);
+  }, [map, onViewportChange]);
+  return null;
+}
+
+// Un regroupement : un cercle avec le nombre de points, un clic zoome dessus
+function ClusterMarker({ cluster }) {
+  const map = useMap();
+  const radius = Math.min(10 + 4 * Math.log10(cluster.count), 30);
+  return (
+    <CircleMarker
+      center={[cluster.latitude, cluster.longitude]}
+      radius={radius}
+      pathOptions={{ color: '#2563eb', fillOpacity: 0.5 }}
+      eventHandlers={{ click: () => map.setView([cluster.latitude, cluster.longitude], Math.min(map.getZoom() + 2, map.getMaxZoom())) }}
+    >
+      <Tooltip direction="center" permanent>{cluster.count}</Tooltip>
+    </CircleMarker>
+  );
+}
+
+function viewportParams(bounds) {
+  // Ne demander au serveur que la zone affichée
+  const west = bounds.getWest();
+  const east = bounds.getEast();
+  return {
+    min_lat: Math.max(bounds.getSouth(), -90),
+    max_lat: Math.min(bounds.getNorth(), 90),
+    // Au-delà d'un tour complet, on demande toutes les longitudes
+    min_lon: east - west >= 360 ? -180 : L.Util.wrapNum(west, [-180, 180], true),
+    max_lon: east - west >= 360 ? 180 : L.Util.wrapNum(east, [-180, 180], true),
+  };
+}
 
 export default function MapComponent() {
   const position = [46.603354, 1.888334]; // Centre de la France
   const [dataObjects, setDataObjects] = useState([]);
+  const [clusters, setClusters] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const pendingRequest = useRef(null);
 
-  useEffect(() => {
-    const fetchDataObjects = async () => {
-      setLoading(true);
-      setError(null);
-      try {
-        const data = await fetchApi('/data/'); // Token géré par fetchApi
-        // Filtrer pour ne garder que les objets avec des coordonnées valides
-        const validDataObjects = data.filter(obj => obj.latitude != null && obj.longitude != null);
-        setDataObjects(validDataObjects);
-      } catch (err) {
-        console.error("Erreur récupération DataObjects:", err);
-        setError(err.data?.detail || err.message || "Impossible de charger les données géographiques.");
-      } finally {
+  const fetchDataObjects = useCallback(async (bounds, zoom) => {
+    // Une réponse lente pour une vue précédente ne doit pas écraser la vue courante
+    pendingRequest.current?.abort();
+    const controller = new AbortController();
+    pendingRequest.current = controller;
+    setLoading(true);
+    setError(null);
+    try {
+      const viewport = viewportParams(bounds);
+      let points = [];
+      if (zoom > CLUSTER_MAX_ZOOM) {
+        points = await fetchApi(`/data/?${new URLSearchParams({ ...viewport, limit: POINTS_LIMIT })}`, { signal: controller.signal });
+      }
+      // Petit zoom, ou trop de points pour les afficher tous : regroupements du serveur
+      let groups = [];
+      if (zoom <= CLUSTER_MAX_ZOOM || points.length >= POINTS_LIMIT) {
+        points = [];
+        groups = await fetchApi(`/data/clusters/?${new URLSearchParams({ ...viewport, zoom, sample_size: 0 })}`, { signal: controller.signal });
+      }
+      if (controller.signal.aborted) return;
+      setDataObjects(points);
+      setClusters(groups);
+    } catch (err) {
+      if (err.name === 'AbortError') return; // Remplacée par une requête plus récente
+      console.error("Erreur récupération DataObjects:", err);
+      setError(err.data?.detail || err.message || "Impossible de charger les données géographiques.");
+    } finally {
+      if (pendingRequest.current === controller) {
+        pendingRequest.current = null;
         setLoading(false);
       }
-    };
-    fetchDataObjects();
-  }, []); // Empty dependency array means this runs once on mount
+    }
+  }, []);
+
+  // Annuler la requête en cours si la carte est démontée
+  useEffect(() => () => pendingRequest.current?.abort(), []);
 
   if (typeof window === "undefined") {
     // Should not happen due to dynamic import with ssr:false, but good practice
     return null;
   }
 
-  if (loading) {
-    return <p className="text-center p-4">Chargement des données cartographiques...</p>;
-  }
-
-  if (error) {
-    return <p className="text-center text-red-500 p-4">Erreur: {error}</p>;
-  }
-
   return (
     <MapContainer center={position} zoom={6} scrollWheelZoom={true} style={{ height: '100%', width: '100%' }}>
       <TileLayer
         attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
         url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
       />
+      <ViewportLoader onViewportChange={fetchDataObjects} />
+      {(loading || error) && (
+        <div className="leaflet-top leaflet-right">
+          <div className={`leaflet-control bg-white rounded px-2 py-1 text-xs ${error ? 'text-red-500' : ''}`}>
+            {error ? `Erreur: ${error}` : 'Chargement des données cartographiques...'}
+          </div>
+        </div>
+      )}
+      {clusters.map(cluster => (
+        <ClusterMarker key={`${cluster.latitude},${cluster.longitude}`} cluster={cluster} />
+      ))}
       {dataObjects.map(obj => (
         <Marker key={obj.id} position={[obj.latitude, obj.longitude]}>
           <Popup>
@@ -65,8 +65,8 @@ export async function fetchApi(endpoint, options = {}) {
     return response; // Fallback, could be response.text()
 
   } catch (error) {
-    // Log generic error only if it's not an HTTP error we already processed
-    if (!error.status) {
+    // Log generic error only if it's not an HTTP error we already processed, nor a cancelled request
+    if (!error.status && error.name !== 'AbortError') {
         console.error('API call failed (network or other error):', error);
     }
     throw error; // Rethrow for the calling component to handle